@@ -0,0 +1,63 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Microbenchmark of coder.decode_posit_binary and coder.encode_posit_binary per nbits.
+# Run: PYTHONPATH=../src python bench_coder.py
+
+
+from __future__ import print_function
+
+import random
+import timeit
+
+from sgposit import coder
+
+
+def bench_coder(bits, nbits, es, repeat=5):
+    reps = [ coder.decode_posit_binary(v, nbits, es) for v in bits ]
+
+    decode = lambda: [ coder.decode_posit_binary(v, nbits, es) for v in bits ]
+    encode = lambda: [ coder.encode_posit_binary(rep) for rep in reps ]
+
+    decode_us = min(timeit.repeat(decode, number=1, repeat=repeat)) / len(bits) * 1e6
+    encode_us = min(timeit.repeat(encode, number=1, repeat=repeat)) / len(bits) * 1e6
+
+    return (decode_us, encode_us)
+
+
+# Random bit patterns mostly have short regimes. Long regimes are near maxpos and minpos.
+def sample_bits(nbits, count=2000):
+    rng = random.Random(nbits)
+    random_bits = [ rng.getrandbits(nbits) for i in range(count) ]
+    long_regime_bits = [ rng.choice([(1 << (nbits-1)) - 1 - rng.getrandbits(2), 1 + rng.getrandbits(2)]) for i in range(count) ]
+    return (random_bits, long_regime_bits)
+
+
+if __name__ == '__main__':
+    print('{:>6} {:>4} {:>12} {:>12} {:>14} {:>14}'.format('nbits', 'es', 'decode(us)', 'encode(us)', 'decode-lr(us)', 'encode-lr(us)'))
+    for (nbits, es) in [(8, 0), (16, 1), (32, 2), (64, 3), (128, 4), (256, 5)]:
+        (random_bits, long_regime_bits) = sample_bits(nbits)
+        (decode_us, encode_us) = bench_coder(random_bits, nbits, es)
+        (decode_lr_us, encode_lr_us) = bench_coder(long_regime_bits, nbits, es)
+        print('{:>6} {:>4} {:>12.2f} {:>12.2f} {:>14.2f} {:>14.2f}'.format(nbits, es, decode_us, encode_us, decode_lr_us, encode_lr_us))
@@ -0,0 +1,102 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Allocations and throughput of fused against unfused PCPosit kernels.
+# Run: PYTHONPATH=../src python bench_fused.py
+
+
+from __future__ import print_function
+
+import random
+import timeit
+
+from sgposit         import coder
+from sgposit.pcposit import PCPosit
+
+
+# Count PCPosit and PositRep objects created by kernel().
+def allocations(kernel):
+    counts = {'PCPosit': 0, 'PositRep': 0}
+    pcposit_init = PCPosit.__init__
+    positrep_new = coder.PositRep.__new__
+
+    def counting_init(self, *args, **kwargs):
+        counts['PCPosit'] += 1
+        pcposit_init(self, *args, **kwargs)
+
+    def counting_new(cls, *args, **kwargs):
+        counts['PositRep'] += 1
+        return positrep_new(cls, *args, **kwargs)
+
+    PCPosit.__init__ = counting_init
+    coder.PositRep.__new__ = staticmethod(counting_new)
+    try:
+        kernel()
+    finally:
+        PCPosit.__init__ = pcposit_init
+        coder.PositRep.__new__ = staticmethod(positrep_new)
+
+    return (counts['PCPosit'], counts['PositRep'])
+
+
+def us_per_call(kernel, count=2000, repeat=5):
+    return min(timeit.repeat(kernel, number=count, repeat=repeat)) / count * 1e6
+
+
+def report(name, kernel, nops):
+    (nposits, nreps) = allocations(kernel)
+    us = us_per_call(kernel)
+    print('  {:<22} {:>10.2f} {:>10.2f} {:>10.2f}'.format(name, nposits / float(nops), nreps / float(nops), us / nops))
+
+
+if __name__ == '__main__':
+    nbits = 32
+    es = 2
+    n = 16
+    rng = random.Random(1)
+    rand_posit = lambda: PCPosit(rng.getrandbits(nbits-1), mode='bits', nbits=nbits, es=es)
+    (a, b, c) = (rand_posit(), rand_posit(), rand_posit())
+    xs = [ rand_posit() for i in range(n) ]
+    ys = [ rand_posit() for i in range(n) ]
+
+    def dot_unfused():
+        acc = PCPosit('0', nbits=nbits, es=es)
+        for (x, y) in zip(xs, ys):
+            acc = acc + x*y
+        return acc
+
+    def dot_fma():
+        acc = PCPosit('0', nbits=nbits, es=es)
+        for (x, y) in zip(xs, ys):
+            acc = x.fma(y, acc)
+        return acc
+
+    print('posit<{},{}>, per multiply-add'.format(nbits, es))
+    print('  {:<22} {:>10} {:>10} {:>10}'.format('kernel', 'PCPosit', 'PositRep', 'us'))
+    report('a*b + c', lambda: a*b + c, 1)
+    report('a.fma(b, c)', lambda: a.fma(b, c), 1)
+    report('dot{} unfused'.format(n), dot_unfused, n)
+    report('dot{} fma'.format(n), dot_fma, n)
+    report('dot{} fdp'.format(n), lambda: PCPosit.fdp(xs, ys), n)
+    report('sum{} fsum'.format(n), lambda: PCPosit.fsum(xs), n)
@@ -0,0 +1,73 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Memory and throughput of the posit representation behind PCPosit.
+# Run: PYTHONPATH=../src python bench_positrep.py
+
+
+from __future__ import print_function
+
+import random
+import timeit
+import tracemalloc
+
+from sgposit         import coder
+from sgposit.pcposit import PCPosit
+
+
+def bytes_per_item(create, count=100000):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [ create(i) for i in range(count) ]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / float(count) - 8     # Exclude the list slot.
+
+
+def us_per_call(stmt, count=20000, repeat=5):
+    return min(timeit.repeat(stmt, number=count, repeat=repeat)) / count * 1e6
+
+
+if __name__ == '__main__':
+    nbits = 32
+    es = 2
+    rng = random.Random(1)
+    bits = [ rng.getrandbits(nbits) for i in range(1000) ]
+    dict_rep = dict((key, coder.decode_posit_binary(bits[0], nbits, es)[key]) for key in ['s', 'k', 'e', 'f', 'h', 'nbits', 'es', 't'])
+
+    print('memory (bytes/item, posit<{},{}>)'.format(nbits, es))
+    print('  dict rep          {:8.1f}'.format(bytes_per_item(lambda i: dict(dict_rep, f=i))))
+    print('  decoded rep       {:8.1f}'.format(bytes_per_item(lambda i: coder.decode_posit_binary(bits[i % 1000], nbits, es))))
+    print('  PCPosit           {:8.1f}'.format(bytes_per_item(lambda i: PCPosit(bits[i % 1000], mode='bits', nbits=nbits, es=es))))
+
+    a = PCPosit(bits[1], mode='bits', nbits=nbits, es=es)
+    b = PCPosit(bits[2], mode='bits', nbits=nbits, es=es)
+    print('throughput (us/op, posit<{},{}>)'.format(nbits, es))
+    print('  copy  PCPosit(a)  {:8.2f}'.format(us_per_call(lambda: PCPosit(a))))
+    print('  neg   -a          {:8.2f}'.format(us_per_call(lambda: -a)))
+    print('  add   a + b       {:8.2f}'.format(us_per_call(lambda: a + b)))
+    print('  sub   a - b       {:8.2f}'.format(us_per_call(lambda: a - b)))
+    print('  mul   a * b       {:8.2f}'.format(us_per_call(lambda: a * b)))
+    print('  div   a / b       {:8.2f}'.format(us_per_call(lambda: a / b)))
+    print('  cmp   a < b       {:8.2f}'.format(us_per_call(lambda: a < b)))
@@ -0,0 +1,240 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Benchmark suite of the posit coder and arithmetic engines over (nbits, es).
+# Results are written as JSON with ops/sec and per-op time percentiles, and two
+# result files can be compared to flag slowdowns.
+#
+# Run: PYTHONPATH=../src python bench_suite.py run -o results.json
+#      PYTHONPATH=../src python bench_suite.py compare base.json results.json
+
+
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import random
+import re
+import sys
+import time
+import timeit
+
+from sgposit         import coder
+from sgposit.pcposit import PCPosit
+from sgposit.posit   import Posit
+
+try:
+    import numpy as np
+    from sgposit            import npquire
+    from sgposit.npcoder    import MAX_ARRAY_NBITS
+    from sgposit.positarray import PositArray
+except ImportError:
+    np = None
+
+
+CONFIGS = [(8, 0), (16, 1), (32, 2), (64, 3)]
+
+BATCH = 256
+
+
+# Return the p-th percentile of values, linearly interpolated.
+def percentile(values, p):
+    values = sorted(values)
+    if len(values) == 1:
+        return values[0]
+    pos = (len(values) - 1) * p / 100.0
+    i = int(pos)
+    if i + 1 >= len(values):
+        return values[-1]
+    return values[i] + (values[i+1] - values[i]) * (pos - i)
+
+
+# Time samples of fn(), which runs nops operations. Return the result dict.
+def measure(fn, nops, samples):
+    fn()    # Warm up caches and tables.
+    timer = timeit.default_timer
+    times = []
+    for i in range(samples):
+        start = timer()
+        fn()
+        times.append((timer() - start) / nops * 1e9)
+
+    p50 = percentile(times, 50)
+    return {
+        'ops_per_sec': 1e9 / p50 if p50 > 0 else 0.0,
+        'min_ns': min(times),
+        'p50_ns': p50,
+        'p90_ns': percentile(times, 90),
+        'p99_ns': percentile(times, 99),
+        'samples': samples,
+    }
+
+
+# Return n uniformly random nbits-bit patterns, sign bit and cinf included,
+# from two 32-bit draws each.
+def random_bits(arng, nbits, n):
+    hi = arng.randint(0, 1 << 32, n, dtype=np.uint64)
+    lo = arng.randint(0, 1 << 32, n, dtype=np.uint64)
+    return ((hi << np.uint64(32)) | lo) & np.uint64((1 << nbits) - 1)
+
+
+# Return a list of (name, fn, nops) benchmarks for one posit configuration.
+def make_benchmarks(nbits, es):
+    rng = random.Random(nbits * 100 + es)
+    abits = [ rng.getrandbits(nbits) for i in range(BATCH) ]
+    bbits = [ rng.getrandbits(nbits) for i in range(BATCH) ]
+    config = '[{},{}]'.format(nbits, es)
+    benchmarks = []
+
+    def add(name, fn, nops=BATCH):
+        benchmarks.append((name + config, fn, nops))
+
+    reps = [ coder.decode_posit_binary(v, nbits, es) for v in abits ]
+    add('coder.decode', lambda: [ coder.decode_posit_binary(v, nbits, es) for v in abits ])
+    add('coder.encode', lambda: [ coder.encode_posit_binary(rep) for rep in reps ])
+
+    pa = [ PCPosit(v, mode='bits', nbits=nbits, es=es) for v in abits ]
+    pb = [ PCPosit(v, mode='bits', nbits=nbits, es=es) for v in bbits ]
+    pairs = list(zip(pa, pb))
+    add('pcposit.add', lambda: [ a + b for (a, b) in pairs ])
+    add('pcposit.sub', lambda: [ a - b for (a, b) in pairs ])
+    add('pcposit.mul', lambda: [ a * b for (a, b) in pairs ])
+    add('pcposit.div', lambda: [ a / b for (a, b) in pairs ])
+    add('pcposit.lt', lambda: [ a < b for (a, b) in pairs ])
+    add('pcposit.str', lambda: [ str(a) for a in pa ])
+
+    qa = [ Posit(v, mode='bits', nbits=nbits, es=es) for v in abits ]
+    qb = [ Posit(v, mode='bits', nbits=nbits, es=es) for v in bbits ]
+    qpairs = list(zip(qa, qb))
+    add('posit.add', lambda: [ a + b for (a, b) in qpairs ])
+    add('posit.sub', lambda: [ a - b for (a, b) in qpairs ])
+    add('posit.mul', lambda: [ a * b for (a, b) in qpairs ])
+    add('posit.div', lambda: [ a / b for (a, b) in qpairs ])
+    add('posit.lt', lambda: [ a < b for (a, b) in qpairs ])
+    add('posit.str', lambda: [ str(a) for a in qa ])
+
+    if np is not None and nbits <= MAX_ARRAY_NBITS:
+        n = 64 * BATCH
+        arng = np.random.RandomState(nbits)
+        xa = PositArray(random_bits(arng, nbits, n), nbits=nbits, es=es)
+        xb = PositArray(random_bits(arng, nbits, n), nbits=nbits, es=es)
+        add('positarray.add', lambda: xa + xb, n)
+        add('positarray.sub', lambda: xa - xb, n)
+        add('positarray.mul', lambda: xa * xb, n)
+        add('positarray.div', lambda: xa / xb, n)
+        add('positarray.lt', lambda: xa < xb, n)
+
+        # Multiply-accumulates per second of a square quire matmul.
+        size = 64 if nbits <= npquire.MAX_LIMB_NBITS else 8
+        ma = xa[:size*size].reshape(size, size)
+        mb = xb[:size*size].reshape(size, size)
+        add('positarray.matmul', lambda: ma.matmul(mb), size**3)
+
+    return benchmarks
+
+
+def run(args):
+    pattern = re.compile(args.filter) if args.filter else None
+    results = {}
+    for (nbits, es) in CONFIGS:
+        for (name, fn, nops) in make_benchmarks(nbits, es):
+            if pattern is not None and not pattern.search(name):
+                continue
+            results[name] = measure(fn, nops, args.samples)
+            r = results[name]
+            print('{:<28} {:>14.0f} ops/s  p50 {:>10.1f}ns  p90 {:>10.1f}ns  p99 {:>10.1f}ns'.format(
+                name, r['ops_per_sec'], r['p50_ns'], r['p90_ns'], r['p99_ns']))
+            sys.stdout.flush()
+
+    doc = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'samples': args.samples,
+            'batch': BATCH,
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(doc, fp, indent=2, sort_keys=True)
+    return 0
+
+
+# Compare p50 per-op times, flagging ratios above 1 + threshold as slowdowns.
+def compare(args):
+    with open(args.base) as fp:
+        base = json.load(fp)['results']
+    with open(args.new) as fp:
+        new = json.load(fp)['results']
+
+    slowdowns = 0
+    print('{:<28} {:>12} {:>12} {:>8}'.format('benchmark', 'base p50ns', 'new p50ns', 'ratio'))
+    for name in sorted(set(base) | set(new)):
+        if name not in new or name not in base:
+            print('{:<28} {}'.format(name, 'only in base' if name in base else 'only in new'))
+            continue
+        ratio = new[name]['p50_ns'] / base[name]['p50_ns']
+        flag = ''
+        if ratio > 1 + args.threshold:
+            flag = 'SLOWER'
+            slowdowns += 1
+        elif ratio < 1 - args.threshold:
+            flag = 'faster'
+        print('{:<28} {:>12.1f} {:>12.1f} {:>8.2f} {}'.format(name, base[name]['p50_ns'], new[name]['p50_ns'], ratio, flag))
+
+    print('{} slowdowns beyond {:.0%}'.format(slowdowns, args.threshold))
+    return 1 if slowdowns else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='sgposit benchmark suite.')
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help='run benchmarks')
+    run_parser.add_argument('-o', '--output', default=None, help='JSON result file')
+    run_parser.add_argument('-k', '--filter', default=None, help='regex on benchmark names')
+    run_parser.add_argument('-n', '--samples', type=int, default=30)
+
+    compare_parser = subparsers.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        return run(args)
+    elif args.command == 'compare':
+        return compare(args)
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,10 +12,11 @@ setup(
     license='MIT',
     install_requires=[],
     extras_require={
-        'dev' : [],
-        'test': ['nose'],
+        'dev'  : [],
+        'numpy': ['numpy'],
+        'test' : ['nose'],
     },
-    tests_require=['mpmath'],
+    tests_require=['mpmath', 'numpy'],
     test_suite="tests",
     packages=find_packages('src'),
     package_dir={'': 'src'},
@@ -40,11 +40,29 @@ def get_int_bits(v, ifirst, ilast=None):
 
     assert ifirst >= 0 and ifirst <= ilast
 
-    mask = create_mask(ilast-ifirst+1)
-    v >>= ifirst
-    v &= mask
+    return (v >> ifirst) & ((1 << (ilast-ifirst+1)) - 1)
 
-    return v
+
+"""
+Extract the n-bit field of integer v starting from bit ifirst.
+The bit position is 0-based and starts from the least significant bit.
+"""
+def extract_bits(v, ifirst, n):
+    return (v >> ifirst) & ((1 << n) - 1)
+
+
+"""
+Count the number of leading zeros in the n-bit integer v, 0 <= v < 2^n.
+"""
+def count_leading_zeros(v, n):
+    return n - v.bit_length()
+
+
+"""
+Count the number of leading ones in the n-bit integer v, 0 <= v < 2^n.
+"""
+def count_leading_ones(v, n):
+    return n - (~v & ((1 << n) - 1)).bit_length()
 
 
 """
@@ -55,11 +73,24 @@ The bit position is 0-based and starts from the least significant bit.
 def count_leading_bits(bits, b, ilast):
     assert ilast >= 0
 
-    count = 0
-    for i in range(ilast, -1, -1):
-        if get_int_bits(bits, i) == b:
-            count += 1
-        else:
-            break
+    v = bits & ((1 << (ilast+1)) - 1)
+    if b:
+        return count_leading_ones(v, ilast+1)
+    else:
+        return count_leading_zeros(v, ilast+1)
+
+
+"""
+Shift the non-negative integer v right by n bits, rounding to nearest with ties to even.
+"""
+def round_shift_right_even(v, n):
+    if n <= 0:
+        return v << -n
+
+    r = v >> n
+    truncation = v & ((1 << n) - 1)
+    tie = 1 << (n-1)
+    if truncation > tie or (truncation == tie and r & 1):
+        r += 1
 
-    return count
+    return r
@@ -21,8 +21,12 @@
 # SOFTWARE.
 
 
+import collections
 import copy
+import fractions
+import math
 import numbers
+import operator
 import sys
 
 if sys.version_info.major >= 3:
@@ -33,186 +37,340 @@ else:
 from sgposit import bitops
 
 
+if hasattr(math, 'isqrt'):
+    _isqrt = math.isqrt
+else:
+    # Newton iteration on ints, floor(sqrt(n)) for n >= 0.
+    def _isqrt(n):
+        if n == 0:
+            return 0
+        x = 1 << ((n.bit_length() + 1) >> 1)
+        while True:
+            y = (x + n // x) >> 1
+            if y >= x:
+                return x
+            x = y
+
+
+if hasattr(sys, 'hash_info') and sys.hash_info.modulus == (1 << sys.hash_info.modulus.bit_length()) - 1:
+    _HASH_MODULUS = sys.hash_info.modulus
+    _HASH_BITS = _HASH_MODULUS.bit_length()
+else:
+    _HASH_MODULUS = None
+
+
+# Fast path of isinstance(v, numbers.Integral) for the common int type.
+def _is_integral(v):
+    return type(v) is int or isinstance(v, numbers.Integral)
+
+
+_POSITREP_FIELDS = ('s', 'k', 'e', 'f', 'h', 'nbits', 'es', 't')
+
+_POSITREP_INDEX = dict((key, i) for (i, key) in enumerate(_POSITREP_FIELDS))
+
+_POSITREP_FIELDS_SLICE = slice(0, len(_POSITREP_FIELDS))
+
+_PositRepTuple = collections.namedtuple('_PositRepTuple', _POSITREP_FIELDS + ('x', 'm'))
+
+
+"""
+Immutable posit representation, a tuple of the fields
+(s, k, e, f, h, nbits, es, t) followed by the derived fixed-point (x, m)
+where number = x * 2^m. Fields are read as attributes, rep.s, or by key,
+rep['s'], the same as the dict positrep.
+"""
+class PositRep(_PositRepTuple):
+
+    __slots__ = ()
+
+
+    def __new__(cls, nbits=32, es=2, s=0, k=0, e=0, f=0, h=0, t='n'):
+        if t == 'n':
+            x = (1 << h) + f
+            if s == 1: x = -x
+            m = (k << es) + e - h
+        else:
+            x = 0
+            m = 0
+        return tuple.__new__(cls, (s, k, e, f, h, nbits, es, t, x, m))
+
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, _POSITREP_INDEX[key])
+        return tuple.__getitem__(self, key)
+
+
+    def __eq__(self, other):
+        if isinstance(other, PositRep):
+            return tuple.__eq__(self, other)
+        elif isinstance(other, dict):
+            return len(other) == len(_POSITREP_FIELDS) and all(key in other and other[key] == self[i] for (i, key) in enumerate(_POSITREP_FIELDS))
+        return NotImplemented
+
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+
+    __hash__ = tuple.__hash__
+
+
+    def __repr__(self):
+        return 'PositRep({})'.format(', '.join('{}={!r}'.format(key, self[i]) for (i, key) in enumerate(_POSITREP_FIELDS)))
+
+
+    def keys(self):
+        return list(_POSITREP_FIELDS)
+
+
+    # Return a new PositRep with the given fields replaced.
+    def replace(self, **fields):
+        values = list(tuple.__getitem__(self, _POSITREP_FIELDS_SLICE))
+        for (key, v) in fields.items():
+            values[_POSITREP_INDEX[key]] = v
+        (s, k, e, f, h, nbits, es, t) = values
+        return PositRep(nbits, es, s, k, e, f, h, t)
+
+
+# Return the fields (s, k, e, f, h, nbits, es, t) of a PositRep or a dict positrep.
+def _positrep_fields(rep):
+    if isinstance(rep, PositRep):
+        return tuple.__getitem__(rep, _POSITREP_FIELDS_SLICE)
+    return tuple(rep[key] for key in _POSITREP_FIELDS)
+
+
 def create_positrep(nbits=32, es=2, s=0, k=0, e=0, f=0, h=0, t='n'):
-    return { 's': s, 'k': k, 'e': e, 'f': f, 'h': h, 'nbits': nbits, 'es': es, 't': t }
+    return PositRep(nbits=nbits, es=es, s=s, k=k, e=e, f=f, h=h, t=t)
+
+
+_special_positreps = {}
+
+
+def _create_special_positrep(nbits, es, t):
+    key = (nbits, es, t)
+    rep = _special_positreps.get(key)
+    if rep is None:
+        rep = PositRep(nbits=nbits, es=es, t=t)
+        _special_positreps[key] = rep
+    return rep
 
 
 def create_zero_positrep(nbits=32, es=2):
-    return create_positrep(nbits=nbits, es=es, s=0, k=0, e=0, f=0, h=0, t='z')
+    return _create_special_positrep(nbits, es, 'z')
 
 
 def create_cinf_positrep(nbits=32, es=2):
-    return create_positrep(nbits=nbits, es=es, s=0, k=0, e=0, f=0, h=0, t='c')
+    return _create_special_positrep(nbits, es, 'c')
 
 
+# A PositRep is immutable and can be shared, the copy is for dict positreps
+# and callers that need a distinct object.
 def copy_positrep(rep):
+    if isinstance(rep, PositRep):
+        return tuple.__new__(PositRep, rep)
     return copy.deepcopy(rep)
 
 
 def decode_posit_binary(bits, nbits, es):
     assert nbits >= 2 and es >= 0
 
-    rep = create_positrep(nbits=nbits, es=es)
-
     if bits == 0:
-        rep['t'] = 'z'
-        return rep
+        return create_zero_positrep(nbits=nbits, es=es)
     elif bits == (1 << (nbits-1)):
-        rep['t'] = 'c'
-        return rep
-
-    assert rep['t'] == 'n'
+        return create_cinf_positrep(nbits=nbits, es=es)
 
-    rep['s'] = bitops.get_int_bits(bits, nbits-1)
+    n = nbits - 1   # Remaining number of bits after the sign bit.
 
-    if rep['s'] == 1: bits = -bits
+    s = bits >> n
 
-    regime = bitops.get_int_bits(bits, nbits-2)
-    nleads = bitops.count_leading_bits(bits, regime, nbits-2)
+    if s == 1: bits = -bits & bitops.create_mask(nbits)
 
-    if regime == 0:
-        assert 1 <= nleads and nleads <= nbits-2
-        rep['k'] = -nleads
-    else:
+    if bits >> (n-1):
+        nleads = bitops.count_leading_ones(bits, n)
         assert 1 <= nleads and nleads <= nbits-1
-        rep['k'] = nleads - 1
+        k = nleads - 1
+    else:
+        nleads = bitops.count_leading_zeros(bits, n)
+        assert 1 <= nleads and nleads <= nbits-2
+        k = -nleads
 
-    i = nbits - 1 - nleads - 1 - 1      # n - signbit - rs - rbar - nextbit
+    nrem = max(0, n - nleads - 1)   # Remaining bits after the regime terminating bit.
 
-    e = 0
-    nebits = 0
-    while i >= 0 and nebits < es:
-        e = 2*e | bitops.get_int_bits(bits, i)
-        i -= 1
-        nebits += 1
-    e <<= es - nebits
-    rep['e'] = e
+    if nrem >= es:
+        h = nrem - es
+        e = bitops.extract_bits(bits, h, es)
+        f = bitops.extract_bits(bits, 0, h)
+    else:
+        h = 0
+        e = bitops.extract_bits(bits, 0, nrem) << (es - nrem)
+        f = 0
 
-    rep['h'] = max(0, i+1)      # Remaining bits, and +1 since i is 0-based.
-    if rep['h'] > 0:
-        rep['f'] = bitops.get_int_bits(bits, 0, i)
-
-    return rep
+    return PositRep(nbits, es, s, k, e, f, h, 'n')
 
 
 def encode_posit_binary(rep):
-    assert isinstance(rep['nbits'], numbers.Integral) and rep['nbits'] >= 2
-    assert isinstance(rep['es'   ], numbers.Integral) and rep['es'] >= 0
-    assert isinstance(rep['s'    ], numbers.Integral) and (rep['s'] == 0 or rep['s'] == 1)
-    assert isinstance(rep['e'    ], numbers.Integral) and rep['e'] >= 0 and rep['e'] <= 2**rep['es'] - 1
-    assert isinstance(rep['h'    ], numbers.Integral) and rep['h'] >= 0
-    assert isinstance(rep['f'    ], numbers.Integral) and rep['f'] >= 0 and rep['f'] <= 2**rep['h'] - 1
-    assert rep['t'] in ['c', 'n', 'z']
+    (s, k, e, f, h, nbits, es, t) = _positrep_fields(rep)
 
-    if rep['t'] == 'z':
+    assert _is_integral(nbits) and nbits >= 2
+    assert _is_integral(es) and es >= 0
+    assert _is_integral(s) and (s == 0 or s == 1)
+    assert _is_integral(e) and e >= 0 and e >> es == 0
+    assert _is_integral(h) and h >= 0
+    assert _is_integral(f) and f >= 0 and f >> h == 0
+    assert t in ['c', 'n', 'z']
+
+    if t == 'z':
         return 0
-    elif rep['t'] == 'c':
-        return 1 << (rep['nbits']-1)
+    elif t == 'c':
+        return 1 << (nbits-1)
 
-    assert rep['t'] == 'n'
+    assert t == 'n'
 
-    maxpos_bits = 2**(rep['nbits']-1) - 1
+    n = nbits - 1   # Remaining number of bits after reserving 1 for sign bit.
 
-    n = rep['nbits'] - 1    # Remaining number of bits after reserving 1 for sign bit.
-    bits = 0
-    rounded = False
+    if k >= n - 1:
+        bits = bitops.create_mask(n)        # maxpos, no rounding beyond maxpos.
+    elif k < 1 - n:
+        bits = 1                            # minpos, no rounding to zero.
+    else:
+        if k >= 0:
+            regime = bitops.create_mask(k + 1) << 1
+            rlen = k + 2
+        else:
+            regime = 1
+            rlen = -k + 1
 
-    if rep['k'] >= 0:
-        if n >= rep['k'] + 1:
-            bits = bitops.create_mask(rep['k'] + 1)
-            n -= rep['k'] + 1
+        # Regime, exponent and fraction bits, rounded to nearest even into n bits.
+        # The regime fits in n bits, so rounding never carries beyond maxpos.
+        v = (((regime << es) | e) << h) | f
+        bits = bitops.round_shift_right_even(v, rlen + es + h - n)
 
-            assert n >= 0
+    if s == 1:
+        bits = -bits & bitops.create_mask(nbits)
 
-            if n > 0:
-                bits <<= 1
-                n -= 1
-        else:
-            bits = bitops.create_mask(n)
-            n = 0
-            rounded = True
-    else:
+    assert _is_integral(bits) and bits >= 0 and bits <= bitops.create_mask(nbits)
+
+    return bits
+
+
+# Return (x, m) approximating a / b = x * 2^m for a, b > 0. x holds at least
+# nbits+1 quotient bits and a sticky bit for the remainder, so posit<nbits>
+# rounding of x * 2^m equals the rounding of the exact quotient.
+def fixedpoint_quotient(a, b, nbits):
+    g = max(0, nbits + 1 + b.bit_length() - a.bit_length())
+    (q, r) = divmod(a << g, b)
+
+    return ((q << 1) | (r != 0), -g-1)
+
+
+# Return (x, m) approximating sqrt(a * 2^e) = x * 2^m for a > 0, with at least
+# nbits+1 root bits and a sticky bit for the remainder, as fixedpoint_quotient.
+def fixedpoint_sqrt(a, e, nbits):
+    if e & 1:
+        a <<= 1
+        e -= 1
+
+    g = max(0, nbits + 1 - (a.bit_length() >> 1))
+    a <<= 2*g
+    r = _isqrt(a)
+
+    return ((r << 1) | (r*r != a), (e >> 1) - g - 1)
+
+
+# Round number = x * 2^m to the nearest posit<nbits,es> bit pattern, ties to even,
+# straight from the bit length of x without building a positrep.
+# Posit never rounds to 0 or cinf, i.e. saturated to minpos and maxpos.
+def fixedpoint_to_posit_binary(x, m, nbits, es):
+    if x == 0:
+        return 0
+
+    s = 0
+    if x < 0:
+        s = 1
+        x = -x
+
+    n = nbits - 1
+    h = x.bit_length() - 1
+    scale = m + h
+    k = scale >> es
+
+    if k >= n - 1:
+        bits = (1 << n) - 1
+    elif k < 1 - n:
         bits = 1
-        if n < -rep['k'] + 1:
-            rounded = True
-        n -= min(n, -rep['k'] + 1)
-
-    assert n >= 0
-
-    if n >= rep['es']:
-        bits <<= rep['es']
-        bits |= rep['e']
-        n -= rep['es']
-    elif rounded == False:
-        assert rep['es'] > 0
-
-        m = rep['es'] - n       # Number of exponent bits to truncate.
-        te = rep['e'] >> m
-        te <<= m                # Rounded down exponent bits.
-
-        value = rep['e'] * 2**rep['h'] + rep['f']
-        represented_value = te * 2**rep['h']
-        truncation = value - represented_value
-        tie = 2**(m + rep['h'] - 1)
-
-        te >>= m        # Truncated exponent bits.
-        bits <<= n
-        bits |= te
-        n = 0
-
-        if truncation == tie:
-            if bits & 0x01 and bits < maxpos_bits:
-                bits += 1
-        elif truncation > tie:
-            if bits < maxpos_bits:
+    else:
+        if k >= 0:
+            regime = (1 << (k+2)) - 2
+            rlen = k + 2
+        else:
+            regime = 1
+            rlen = 1 - k
+
+        body = (((regime << es) | (scale & ((1 << es) - 1))) << h) | (x ^ (1 << h))
+        d = rlen + es + h - n
+
+        if d <= 0:
+            bits = body << -d
+        else:
+            bits = body >> d
+            truncation = body & ((1 << d) - 1)
+            tie = 1 << (d-1)
+            if truncation > tie or (truncation == tie and bits & 1):
                 bits += 1
 
-        rounded = True
+    if s == 1:
+        bits = (-bits) & ((1 << nbits) - 1)
 
-    assert n >= 0
+    return bits
 
-    if n > rep['h']:
-        bits <<= rep['h']
-        bits |= rep['f']
-        n -= rep['h']
 
-        bits <<= n
-        n = 0
+# Return float(x * 2^m) correctly rounded to nearest even, and +-inf beyond
+# the float range as for posit arrays.
+def fixedpoint_to_float(x, m):
+    nx = x.bit_length()
+    if nx + m < -1075:
+        return -0.0 if x < 0 else 0.0
+    elif nx + m <= 1024:
+        try:
+            if m >= 0:
+                return float(x << m)
+            return operator.truediv(x, 1 << -m)     # Correctly rounded int division.
+        except OverflowError:
+            pass                                    # Rounded up to 2^1024.
 
-    elif rounded == False:
-        m = rep['h'] - n    # Number of fractional bits to truncate.
-        tf = rep['f'] >> m
-        tf <<= m            # Rounded down fractional bits.
+    return float('-inf') if x < 0 else float('inf')
 
-        value = rep['f']
-        represented_value = tf
-        truncation = value - represented_value
-        tie = 2**(m-1)
 
-        tf >>= m    # Truncated fractional bits.
-        bits <<= n
-        bits |= tf
-        n = 0
+# Return int(x * 2^m) truncated toward zero.
+def fixedpoint_to_int(x, m):
+    if m >= 0:
+        return x << m
+    elif x < 0:
+        return -(-x >> -m)
 
-        if truncation == tie:
-            if bits & 0x01 and bits < maxpos_bits:
-                bits += 1
-        elif truncation > tie:
-            if bits < maxpos_bits:
-                bits += 1
+    return x >> -m
 
-        rounded = True
 
-    assert n == 0
+# Return hash(x * 2^m) equal to the hash of an int, float or Fraction of the same value.
+def fixedpoint_hash(x, m):
+    if _HASH_MODULUS is None:
+        return hash(fixedpoint_to_fraction(x, m))
 
-    if rep['s'] == 1:
-        bits = -bits
-        mask = bitops.create_mask(rep['nbits'])
-        bits &= mask
+    # The modulus is the Mersenne prime 2^b - 1, so 2^m = 2^(m mod b) modulo it.
+    v = ((abs(x) % _HASH_MODULUS) << (m % _HASH_BITS)) % _HASH_MODULUS
+    if x < 0:
+        v = -v
+    return -2 if v == -1 else v
 
-    assert isinstance(bits, numbers.Integral) and bits >= 0 and bits <= bitops.create_mask(rep['nbits'])
 
-    return bits
+# Return x * 2^m as fractions.Fraction.
+def fixedpoint_to_fraction(x, m):
+    if m >= 0:
+        return fractions.Fraction(x << m)
+
+    return fractions.Fraction(x, 1 << -m)
 
 
 # rep: normal posit representation,
@@ -0,0 +1,462 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Correctly rounded elementary functions of posits.
+#
+# A function value is approximated on Python ints at a working precision q,
+# as y * 2^e with an error bound err, i.e. the exact value lies within
+# [(y - err) * 2^e, (y + err) * 2^e]. When both ends round to the same posit,
+# that posit is the correctly rounded result. Otherwise q doubles and the
+# approximation is repeated (Ziv's strategy). The exact values that could
+# land on a rounding boundary, e.g. exp2 of an integer, are handled directly.
+#
+# Posits up to TABLE_NBITS bits use a per-configuration table of every
+# result, built once from the scalar evaluation, so array functions are lookups.
+
+
+from sgposit         import coder
+from sgposit         import posit
+from sgposit.pcposit import PCPosit
+
+try:
+    import numpy as np
+    from sgposit.npcoder    import dtype_for_nbits
+    from sgposit.positarray import PositArray
+except ImportError:
+    np = None
+    PositArray = None
+
+
+FUNCTIONS = ('exp', 'exp2', 'log', 'log2', 'sin', 'cos', 'tanh', 'sigmoid')
+
+# Posits up to this size evaluate the functions by table lookup.
+TABLE_NBITS = 16
+
+# Ziv escalation stops beyond this working precision.
+MAX_PRECISION = 1 << 16
+
+_tables = {}
+
+_constants = {}     # name -> (precision, value), the most precise constant computed.
+
+
+# Return (x, m) of the posit bit pattern, number = x * 2^m.
+def _fixedpoint(bits, nbits, es):
+    return posit.decode_fixedpoint(bits, nbits, es)
+
+
+# Number of integer bits of |x * 2^m|, i.e. 2^(mag-1) <= |x * 2^m| < 2^mag.
+def _magnitude(x, m):
+    return m + abs(x).bit_length()
+
+
+# x * 2^m in fixed point with w fraction bits, floored.
+def _to_fixed(x, m, w):
+    if m + w >= 0:
+        return x << (m + w)
+    return x >> -(m + w)
+
+
+# Largest scale of the configuration, maxpos = 2^maxscale.
+def _maxscale(nbits, es):
+    return (nbits - 2) << es
+
+
+# sum z^(2i+1) / (2i+1) for |z| < 1, in fixed point with w fraction bits.
+# Each term adds at most one ulp of truncation error.
+def _atanh_fixed(z, w):
+    if z < 0:
+        return -_atanh_fixed(-z, w)
+
+    z2 = (z * z) >> w
+    term = z
+    total = 0
+    i = 1
+    while term != 0:
+        total += term // i
+        term = (term * z2) >> w
+        i += 2
+    return total
+
+
+def _atan_inv_fixed(n, w):
+    total = 0
+    term = (1 << w) // n
+    n2 = n * n
+    i = 1
+    sign = 1
+    while term != 0:
+        total += sign * (term // i)
+        term //= n2
+        i += 2
+        sign = -sign
+    return total
+
+
+def _ln2_compute(w):
+    return 2 * _atanh_fixed((1 << w) // 3, w)
+
+
+def _pi_compute(w):
+    return 16 * _atan_inv_fixed(5, w) - 4 * _atan_inv_fixed(239, w)
+
+
+_CONSTANT_FUNCS = {
+    'ln2': _ln2_compute,
+    'pi': _pi_compute,
+}
+
+
+# Constant with w fraction bits, within 2 ulps.
+def _constant(name, w):
+    cached = _constants.get(name)
+    if cached is None or cached[0] < w:
+        prec = max(w, 2 * cached[0] if cached else 0)
+        value = _CONSTANT_FUNCS[name](prec + 32) >> 32
+        cached = _constants[name] = (prec, value)
+    (prec, value) = cached
+    return value >> (prec - w)
+
+
+# exp(r) for fixed point r with w fraction bits and |r| <= 1, within 2 ulps.
+# r is scaled down by 2^s, summed as a Taylor series and squared s times back.
+def _exp_fixed(r, w):
+    s = max(4, int((w ** 0.5) / 2))
+    g = s + 16
+    wg = w + g
+    one = 1 << wg
+
+    rs = (abs(r) << g) >> s
+    total = one
+    term = one
+    n = 1
+    while term != 0:
+        term = ((term * rs) >> wg) // n
+        total += -term if r < 0 and n & 1 else term
+        n += 1
+
+    for i in range(s):
+        total = (total * total) >> wg
+
+    return total >> g
+
+
+# (sin(r), cos(r)) for fixed point r with w fraction bits and |r| <= 1, within 2 ulps each.
+def _sin_cos_fixed(r, w):
+    g = 16 + w.bit_length()
+    wg = w + g
+    rg = r << g
+    r2 = (rg * rg) >> wg
+
+    sin = 0
+    term = rg
+    n = 1
+    while term != 0:
+        sin += term
+        term = -((term * r2) >> wg) // ((n + 1) * (n + 2))
+        n += 2
+
+    cos = 0
+    term = 1 << wg
+    n = 0
+    while term != 0:
+        cos += term
+        term = -((term * r2) >> wg) // ((n + 1) * (n + 2))
+        n += 2
+
+    return (sin >> g, cos >> g)
+
+
+# exp(x * 2^m) as (y, e, err), number = y * 2^e within err * 2^e.
+# The argument is reduced as k*ln2 + r, |r| <= ln2/2, exp = 2^k * exp(r).
+def _exp_approx(x, m, q):
+    w = q + 8 + max(0, _magnitude(x, m))
+    ln2 = _constant('ln2', w)
+    v = _to_fixed(x, m, w)
+    k = (v + (ln2 >> 1)) // ln2
+    r = v - k * ln2
+    err = 2 * (abs(k) + 2) + 2
+    return (_exp_fixed(r, w), k - w, 2 * err)
+
+
+def _exp2_approx(x, m, q):
+    w = q + 8
+    k = x >> -m             # floor, m < 0 for non-integers.
+    r = ((x - (k << -m)) * _constant('ln2', w)) >> -m
+    return (_exp_fixed(r, w), k - w, 8)
+
+
+# log(x * 2^m) for a positive number, the mantissa M in [sqrt(1/2), sqrt(2)),
+# log = E*ln2 + 2*atanh((M-1)/(M+1)).
+def _log_parts(x, m, w):
+    t = x.bit_length() - 1
+    d = 1 << t
+    E = m + t
+    if x * x > 2 * d * d:           # M > sqrt(2)
+        d <<= 1
+        E += 1
+    z = ((x - d) << w) // (x + d)
+    return (E, 2 * _atanh_fixed(z, w))
+
+
+# |log(M)| >= 2^-(t+2) for M != 1, the bits to add for its relative precision.
+def _log_extra(x):
+    return x.bit_length() + 2
+
+
+def _log_approx(x, m, q):
+    w = q + 8 + _log_extra(x)
+    (E, L) = _log_parts(x, m, w)
+    return (E * _constant('ln2', w) + L, -w, 2 * abs(E) + 8 + w)
+
+
+def _log2_approx(x, m, q):
+    w = q + 8 + _log_extra(x)
+    (E, L) = _log_parts(x, m, w)
+    return ((E << w) + (L << w) // _constant('ln2', w), -w, 16 + 2 * w)
+
+
+# (k mod 4, r) with x * 2^m = k*pi/2 + r, |r| <= pi/4, r with w fraction bits.
+def _reduce_half_pi(x, m, w):
+    sc = max(0, _magnitude(x, m)) + 2
+    W = w + sc
+    half_pi = _constant('pi', W - 1)       # pi/2 with W fraction bits.
+    v = _to_fixed(x, m, W)
+    k = (v + (half_pi >> 1)) // half_pi
+    r = (v - k * half_pi) >> sc
+    return (k % 4, r)
+
+
+def _trig_approx(x, m, q, cosine):
+    w = q + 8 + max(0, -_magnitude(x, m))
+    (k, r) = _reduce_half_pi(x, m, w)
+    (s, c) = _sin_cos_fixed(r, w)
+    if cosine:
+        k = (k + 1) % 4
+    y = (s, c, -s, -c)[k]
+    return (y, -w, 8)
+
+
+def _sin_approx(x, m, q):
+    return _trig_approx(x, m, q, False)
+
+
+def _cos_approx(x, m, q):
+    return _trig_approx(x, m, q, True)
+
+
+# tanh(v) for v > 0 from t = exp(-2v) as (1 - t)/(1 + t).
+def _tanh_approx(x, m, q):
+    w = q + 8 + max(0, -_magnitude(x, m))
+    (y, e, err) = _exp_approx(-x, m + 1, w)
+    n = 1 << -e
+    return (((n - y) << w) // (n + y), -w, ((2 * err) << w) // n + 2)
+
+
+# sigmoid(v) = 1/(1 + t) with t = exp(-v) for v >= 0,
+# and t/(1 + t) with t = exp(v) for v < 0, kept relative to t for tiny results.
+def _sigmoid_approx(x, m, q):
+    w = q + 8
+    if x >= 0:
+        (y, e, err) = _exp_approx(-x, m, w)
+    else:
+        (y, e, err) = _exp_approx(x, m, w)
+    tw = _to_fixed(y, e, w)
+    d = (1 << w) + tw
+    derr = ((err << w) >> -e) + 2 if -e >= w else (err << (w + e)) + 2
+    if x >= 0:
+        return ((1 << (2*w)) // d, -w, derr + 2)
+    return ((y << w) // d, e, err + ((y * derr) >> w) + 2)
+
+
+_APPROX = {
+    'exp': _exp_approx,
+    'exp2': _exp2_approx,
+    'log': _log_approx,
+    'log2': _log2_approx,
+    'sin': _sin_approx,
+    'cos': _cos_approx,
+    'tanh': _tanh_approx,
+    'sigmoid': _sigmoid_approx,
+}
+
+
+# Round approx(x, m, q) with increasing working precision until the error
+# interval rounds to a single posit.
+def _ziv(approx, x, m, nbits, es):
+    q = nbits + 16
+    while q <= MAX_PRECISION:
+        (y, e, err) = approx(x, m, q)
+        lo = coder.fixedpoint_to_posit_binary(y - err, e, nbits, es)
+        hi = coder.fixedpoint_to_posit_binary(y + err, e, nbits, es)
+        if lo == hi:
+            return lo
+        q *= 2
+    raise ArithmeticError('Precision limit reached, the result is too close to a rounding boundary.')
+
+
+# Results that are exact, saturated or NaR, or None when the function value
+# must be approximated.
+def _special(name, bits, nbits, es):
+    cinf_bits = 1 << (nbits-1)
+    one_bits = 1 << (nbits-2)
+    maxpos_bits = cinf_bits - 1
+    minpos_bits = 1
+    mask = (1 << nbits) - 1
+
+    if bits == cinf_bits:
+        return cinf_bits
+
+    if bits == 0:
+        return {
+            'exp': one_bits, 'exp2': one_bits, 'log': cinf_bits, 'log2': cinf_bits,
+            'sin': 0, 'cos': one_bits, 'tanh': 0,
+            'sigmoid': coder.fixedpoint_to_posit_binary(1, -1, nbits, es),
+        }[name]
+
+    (x, m) = _fixedpoint(bits, nbits, es)
+    mag = _magnitude(x, m)
+    big = 1 << max(0, mag - 1)          # |v| >= big when mag >= 1.
+    limit = _maxscale(nbits, es) + 1
+
+    if name == 'exp' or (name == 'sigmoid' and x < 0):
+        # exp(v) > 2^limit for v >= 0.7*limit, ln2 < 0.7, and 1/exp(v) alike.
+        if mag >= 1 and 10 * big >= 7 * limit:
+            return maxpos_bits if x > 0 else minpos_bits
+    elif name == 'exp2':
+        if m >= 0 or x & ((1 << -m) - 1) == 0:        # Integers.
+            return coder.fixedpoint_to_posit_binary(1, _to_fixed(x, m, 0), nbits, es)
+        if mag >= 1 and big >= limit:
+            return maxpos_bits if x > 0 else minpos_bits
+    elif name == 'log' or name == 'log2':
+        if x < 0:
+            return cinf_bits
+        if x & (x - 1) == 0:            # Powers of 2.
+            k = m + x.bit_length() - 1
+            if name == 'log2':
+                return coder.fixedpoint_to_posit_binary(k, 0, nbits, es)
+            if k == 0:
+                return 0
+    elif name == 'tanh':
+        # |1 - tanh(v)| < 2*exp(-2|v|) <= 2^-(nbits+1), under half an ulp of 1.
+        if mag >= 1 and 20 * big >= 7 * (nbits + 2):
+            return one_bits if x > 0 else (-one_bits) & mask
+    if name == 'sigmoid' and x > 0:
+        if mag >= 1 and 10 * big >= 7 * (nbits + 2):
+            return one_bits
+
+    return None
+
+
+# Return the correctly rounded function name of the posit<nbits,es> bit pattern.
+# The first call of a configuration up to TABLE_NBITS builds its whole table.
+def function_posit_binary(name, bits, nbits, es):
+    if name not in _APPROX:
+        raise ValueError('Unknown posit function {}.'.format(name))
+
+    if nbits <= TABLE_NBITS and np is not None:
+        return int(_table(name, nbits, es)[bits])
+
+    return _evaluate(name, bits, nbits, es)
+
+
+def _evaluate(name, bits, nbits, es):
+    result = _special(name, bits, nbits, es)
+    if result is not None:
+        return result
+
+    (x, m) = _fixedpoint(bits, nbits, es)
+    if name == 'tanh' and x < 0:
+        return (-_ziv(_tanh_approx, -x, m, nbits, es)) & ((1 << nbits) - 1)
+
+    return _ziv(_APPROX[name], x, m, nbits, es)
+
+
+def _table(name, nbits, es):
+    key = (name, nbits, es)
+    table = _tables.get(key)
+    if table is None:
+        values = [ _evaluate(name, bits, nbits, es) for bits in range(1 << nbits) ]
+        table = np.array(values, dtype=dtype_for_nbits(nbits))
+        table.flags.writeable = False
+        _tables[key] = table
+    return table
+
+
+# Apply function name elementwise to an array of posit<nbits,es> bit patterns.
+def function_posit_array(name, bits, nbits, es):
+    if name not in _APPROX:
+        raise ValueError('Unknown posit function {}.'.format(name))
+
+    bits = np.asarray(bits)
+    if nbits <= TABLE_NBITS:
+        return _table(name, nbits, es)[bits.astype(np.intp)]
+
+    kernel = np.frompyfunc(lambda v: _evaluate(name, int(v), nbits, es), 1, 1)
+    return kernel(bits).astype(dtype_for_nbits(nbits))
+
+
+def _apply(name, v):
+    if isinstance(v, PCPosit):
+        (nbits, es) = (v.rep.nbits, v.rep.es)
+        bits = v.order_key() & ((1 << nbits) - 1)
+        return PCPosit(function_posit_binary(name, bits, nbits, es), mode='bits', nbits=nbits, es=es)
+    elif isinstance(v, posit.Posit):
+        return posit.Posit._from_bits(function_posit_binary(name, v.bits, v.nbits, v.es), v.nbits, v.es)
+    elif PositArray is not None and isinstance(v, PositArray):
+        return PositArray._wrap(function_posit_array(name, v.bits, v.nbits, v.es), v.nbits, v.es)
+
+    raise ValueError('Input is not supported.')
+
+
+def exp(v):
+    return _apply('exp', v)
+
+
+def exp2(v):
+    return _apply('exp2', v)
+
+
+def log(v):
+    return _apply('log', v)
+
+
+def log2(v):
+    return _apply('log2', v)
+
+
+def sin(v):
+    return _apply('sin', v)
+
+
+def cos(v):
+    return _apply('cos', v)
+
+
+def tanh(v):
+    return _apply('tanh', v)
+
+
+def sigmoid(v):
+    return _apply('sigmoid', v)
@@ -0,0 +1,279 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Opt-in instrumentation of posit arithmetic.
+#
+# Collection installs counting wrappers over the arithmetic operators and the
+# rounding and coder functions, and removes them when it stops, so there is no
+# cost at all while disabled. Only the outermost operator of a call is counted,
+# e.g. PCPosit subtraction counts as one sub and not also as an add.
+#
+#   with instrument.collect(timing=True) as stats:
+#       c = a * b + d
+#   print(stats.to_json())
+
+
+import json
+import timeit
+
+from sgposit         import coder
+from sgposit         import posit
+from sgposit.pcposit import PCPosit
+
+
+ROUNDING_EVENTS = ('exact', 'down', 'up', 'tie', 'saturate_max', 'saturate_min')
+
+
+# Classify rounding number = x * 2^m to posit<nbits,es>, as one of ROUNDING_EVENTS.
+# Mirrors the round to nearest even of the regime, exponent and fraction bits.
+def classify_rounding(x, m, nbits, es):
+    if x == 0:
+        return 'exact'
+    if x < 0:
+        x = -x
+
+    n = nbits - 1
+    h = x.bit_length() - 1
+    f = x ^ (1 << h)
+    scale = m + h
+    k = scale >> es
+    e = scale & ((1 << es) - 1)
+
+    if k > n - 1 or (k == n - 1 and (e != 0 or f != 0)):
+        return 'saturate_max'
+    elif k < 1 - n:
+        return 'saturate_min'
+    elif k == n - 1:
+        return 'exact'
+
+    if k >= 0:
+        (regime, rlen) = ((1 << (k+2)) - 2, k + 2)
+    else:
+        (regime, rlen) = (1, 1 - k)
+
+    body = (((regime << es) | e) << h) | f
+    d = rlen + es + h - n
+    if d <= 0:
+        return 'exact'
+
+    truncation = body & ((1 << d) - 1)
+    tie = 1 << (d-1)
+    if truncation == 0:
+        return 'exact'
+    elif truncation == tie:
+        return 'tie'
+    elif truncation > tie:
+        return 'up'
+
+    return 'down'
+
+
+"""
+Counters of one collection: ops per (nbits, es, op), rounding events per
+(nbits, es), and optionally calls and seconds per timed function.
+"""
+class Instrumentation(object):
+
+    def __init__(self, timing=False):
+        self.timing = timing
+        self.reset()
+
+
+    def reset(self):
+        self.ops = {}
+        self.rounding = {}
+        self.timings = {}
+        self._depth = 0
+
+
+    def count_op(self, nbits, es, op, n=1):
+        key = (nbits, es, op)
+        self.ops[key] = self.ops.get(key, 0) + n
+
+
+    def count_rounding(self, nbits, es, event):
+        key = (nbits, es, event)
+        self.rounding[key] = self.rounding.get(key, 0) + 1
+
+
+    def add_time(self, name, seconds):
+        (calls, total) = self.timings.get(name, (0, 0.0))
+        self.timings[name] = (calls + 1, total + seconds)
+
+
+    # Return the counters as a JSON friendly dict keyed by 'posit<nbits,es>'.
+    def to_dict(self):
+        config = lambda nbits, es: 'posit<{},{}>'.format(nbits, es)
+
+        ops = {}
+        for ((nbits, es, op), count) in self.ops.items():
+            ops.setdefault(config(nbits, es), {})[op] = count
+
+        rounding = {}
+        for ((nbits, es, event), count) in self.rounding.items():
+            rounding.setdefault(config(nbits, es), dict((e, 0) for e in ROUNDING_EVENTS))[event] = count
+
+        timings = dict((name, {'calls': calls, 'seconds': seconds}) for (name, (calls, seconds)) in self.timings.items())
+
+        return {'ops': ops, 'rounding': rounding, 'timings': timings}
+
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), sort_keys=True, **kwargs)
+
+
+    def __enter__(self):
+        start(self)
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        stop(self)
+
+
+_active = []        # Stack of collecting Instrumentation, the last one counts.
+
+_originals = {}     # (owner, name) -> original attribute while installed.
+
+
+def _config(obj):
+    return (obj.nbits, obj.es)
+
+
+def _op_wrapper(func, op, size=None):
+    def wrapper(self, *args, **kwargs):
+        stats = _active[-1]
+        if stats._depth == 0:
+            (nbits, es) = _config(self)
+            stats.count_op(nbits, es, op, 1 if size is None else size(self))
+        stats._depth += 1
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            stats._depth -= 1
+    return wrapper
+
+
+def _rounding_wrapper(func, name, x_m_config):
+    def wrapper(*args, **kwargs):
+        stats = _active[-1]
+        (x, m, nbits, es) = x_m_config(*args, **kwargs)
+        stats.count_rounding(nbits, es, classify_rounding(x, m, nbits, es))
+        if not stats.timing:
+            return func(*args, **kwargs)
+        begin = timeit.default_timer()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.add_time(name, timeit.default_timer() - begin)
+    return wrapper
+
+
+def _timing_wrapper(func, name):
+    def wrapper(*args, **kwargs):
+        stats = _active[-1]
+        if not stats.timing:
+            return func(*args, **kwargs)
+        begin = timeit.default_timer()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.add_time(name, timeit.default_timer() - begin)
+    return wrapper
+
+
+def _round_args(x, m, nbits, es):
+    return (x, m, nbits, es)
+
+
+def _targets():
+    targets = []
+    for (name, op) in [('__add__', 'add'), ('__sub__', 'sub'), ('__mul__', 'mul'),
+                       ('__truediv__', 'div'), ('sqrt', 'sqrt'), ('fma', 'fma'), ('fms', 'fms')]:
+        targets.append((PCPosit, name, lambda f, op=op: _op_wrapper(f, op)))
+    for (name, op) in [('__add__', 'add'), ('__sub__', 'sub'), ('__mul__', 'mul'), ('__truediv__', 'div'), ('sqrt', 'sqrt')]:
+        targets.append((posit.Posit, name, lambda f, op=op: _op_wrapper(f, op)))
+
+    try:
+        from sgposit.positarray import PositArray
+    except ImportError:
+        PositArray = None
+    if PositArray is not None:
+        for op in ('add', 'sub', 'mul', 'div', 'sqrt'):
+            targets.append((PositArray, op, lambda f, op=op: _op_wrapper(f, op, lambda a: a.size)))
+
+    # PCPosit and Posit both round through coder.fixedpoint_to_posit_binary.
+    targets.append((coder, 'fixedpoint_to_posit_binary',
+                    lambda f: _rounding_wrapper(f, 'coder.fixedpoint_to_posit_binary', _round_args)))
+    targets.append((PCPosit, '_fixedpoint_to_posit',
+                    lambda f: classmethod(_timing_wrapper(f.__func__, 'PCPosit._fixedpoint_to_posit'))))
+    targets.append((posit, 'decode_fixedpoint', lambda f: _timing_wrapper(f, 'posit.decode_fixedpoint')))
+    targets.append((coder, 'encode_posit_binary', lambda f: _timing_wrapper(f, 'coder.encode_posit_binary')))
+    targets.append((coder, 'decode_posit_binary', lambda f: _timing_wrapper(f, 'coder.decode_posit_binary')))
+
+    return targets
+
+
+def _install():
+    for (owner, name, make_wrapper) in _targets():
+        original = owner.__dict__[name]
+        _originals[(owner, name)] = original
+        setattr(owner, name, make_wrapper(original))
+
+
+def _uninstall():
+    for ((owner, name), original) in _originals.items():
+        setattr(owner, name, original)
+    _originals.clear()
+
+
+# Start collecting into stats, a new Instrumentation by default. Return stats.
+def start(stats=None, timing=False):
+    if stats is None:
+        stats = Instrumentation(timing=timing)
+    if not _active:
+        _install()
+    _active.append(stats)
+    return stats
+
+
+# Stop collecting into stats, the innermost collection by default.
+def stop(stats=None):
+    if not _active:
+        raise ValueError('Instrumentation is not collecting.')
+    if stats is None:
+        stats = _active[-1]
+    _active.remove(stats)
+    if not _active:
+        _uninstall()
+    return stats
+
+
+def is_enabled():
+    return len(_active) > 0
+
+
+# Context manager scoping a collection, as in: with collect() as stats: ...
+def collect(timing=False):
+    return Instrumentation(timing=timing)
@@ -0,0 +1,344 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import fractions
+import math
+
+from sgposit         import coder
+from sgposit         import posit
+from sgposit.pcposit import PCPosit, SCALAR_TYPES, scalar_to_fixedpoint
+
+
+# The standard posit configurations swept by default.
+CONFIGS = ((8, 0), (16, 1), (32, 2), (64, 3))
+
+# Default significant bits of the reference value.
+PRECISION = 256
+
+# Bound on the cached decodings kept per configuration.
+DECODE_CACHE_SIZE = 1 << 16
+
+_decode_caches = {}
+
+_CONSTANT_CACHE_SIZE = 256
+
+_constant_cache = {}
+
+
+# Return (x,m) with x odd, or (0,0).
+def _normalize(x, m):
+    if x == 0:
+        return (0, 0)
+    tz = (x & -x).bit_length() - 1
+    return (x >> tz, m + tz)
+
+
+# Return the normalized (x,m) of a posit bit pattern, None for cinf.
+def _decode(bits, nbits, es):
+    cache = _decode_caches.get((nbits, es))
+    if cache is None:
+        cache = _decode_caches[(nbits, es)] = {}
+
+    fp = cache.get(bits, False)
+    if fp is False:
+        if bits == 0:
+            fp = (0, 0)
+        elif bits == 1 << (nbits-1):
+            fp = None
+        else:
+            fp = _normalize(*posit.decode_fixedpoint(bits, nbits, es))
+        if len(cache) >= DECODE_CACHE_SIZE:
+            cache.clear()
+        cache[bits] = fp
+
+    return fp
+
+
+# Round x * 2^m to p significant bits, to nearest even. A sticky lowest bit
+# of x rounds correctly as long as x keeps at least p+2 bits.
+def _round_binary(x, m, p):
+    n = abs(x).bit_length() - p
+    if n <= 0:
+        return _normalize(x, m)
+
+    a = abs(x)
+    (q, r) = (a >> n, a & ((1 << n) - 1))
+    half = 1 << (n-1)
+    if r > half or (r == half and q & 1):
+        q += 1
+
+    return _normalize(-q if x < 0 else q, m + n)
+
+
+# Return the unrounded (x,m) of a op b, None for cinf. Unary ops ignore fb.
+# The division and square root quotients keep more than nbits bits and a
+# sticky bit.
+def _exact(op, fa, fb, nbits):
+    if fa is None or fb is None:
+        return None
+
+    (xa, ma) = fa
+    if op == 'neg':
+        return (-xa, ma)
+    elif op == 'sqrt':
+        if xa < 0:
+            return None
+        elif xa == 0:
+            return (0, 0)
+        return coder.fixedpoint_sqrt(xa, ma, nbits)
+
+    (xb, mb) = fb
+    if op == 'mul':
+        return (xa*xb, ma + mb)
+    elif op == 'div':
+        if xb == 0:
+            return None
+        elif xa == 0:
+            return (0, 0)
+        sign = -1 if (xa < 0) != (xb < 0) else 1
+        (xc, mc) = coder.fixedpoint_quotient(abs(xa), abs(xb), nbits)
+        return (sign*xc, ma - mb + mc)
+
+    if op == 'sub':
+        xb = -xb
+    m = min(ma, mb)
+    return ((xa << (ma - m)) + (xb << (mb - m)), m)
+
+
+"""
+A posit value evaluated in several (nbits, es) configurations at once,
+alongside a reference value of precision significant bits.
+
+Every configuration rounds its own inputs and results, exactly as PCPosit
+would, so one run of an application on MultiPosit values gives the result of
+every configuration and its error. The unrounded result of an operation is
+computed once per distinct pair of rounded inputs and then rounded to each
+configuration that sees those inputs. Control flow must not depend on the
+values, since they differ between configurations.
+"""
+class MultiPosit(object):
+
+    def __init__(self, v=None, configs=None, precision=None):
+        if configs is None:
+            configs = CONFIGS
+        if precision is None:
+            precision = PRECISION
+
+        self.configs = tuple((int(nbits), int(es)) for (nbits, es) in configs)
+        self.precision = precision
+        if len(self.configs) == 0:
+            raise ValueError('Expect at least one posit configuration.')
+        for (nbits, es) in self.configs:
+            if nbits < 2 or es < 0:
+                raise ValueError('Expect nbits >= 2 and es >= 0.')
+
+        if v is None:
+            v = 0
+        elif not isinstance(v, SCALAR_TYPES):
+            raise ValueError('Input is not supported.')
+
+        # Int and float constants are cached, as PCPosit does.
+        cached = type(v) is int or type(v) is float
+        if cached:
+            key = (v, self.configs, precision)
+            value = _constant_cache.get(key)
+            if value is not None:
+                (self._bits, self._fixed, self._ref) = value
+                return
+
+        wide = max([ nbits for (nbits, es) in self.configs ] + [ precision ])
+        fp = scalar_to_fixedpoint(v, wide)
+        self._set_results({ fp: list(range(len(self.configs))) })
+        self._ref = None if fp is None else _round_binary(fp[0], fp[1], precision)
+
+        if cached:
+            if len(_constant_cache) >= _CONSTANT_CACHE_SIZE:
+                _constant_cache.clear()
+            _constant_cache[key] = (self._bits, self._fixed, self._ref)
+
+
+    # Round each unrounded result (x,m) to the configurations indexed by it.
+    def _set_results(self, groups):
+        bits = [0] * len(self.configs)
+        fixed = [None] * len(self.configs)
+        for (fp, indexes) in groups.items():
+            for i in indexes:
+                (nb, es) = self.configs[i]
+                if fp is None:
+                    bits[i] = 1 << (nb-1)
+                else:
+                    bits[i] = coder.fixedpoint_to_posit_binary(fp[0], fp[1], nb, es)
+                    fixed[i] = _decode(bits[i], nb, es)
+        # Shared with the constant cache, so never modified in place.
+        self._bits = tuple(bits)
+        self._fixed = tuple(fixed)
+
+
+    # Return other as a MultiPosit of the same configurations, or NotImplemented.
+    def _coerce(self, other):
+        if isinstance(other, MultiPosit):
+            if other.configs != self.configs:
+                raise NotImplementedError('Mismatched posit configuration arithmetic is not implemented.')
+            return other
+        elif isinstance(other, SCALAR_TYPES):
+            return MultiPosit(other, self.configs, self.precision)
+        return NotImplemented
+
+
+    # Compute op once per distinct pair of rounded operands, with the widest
+    # quotient any configuration of the pair needs, then round per configuration.
+    def _op(self, op, other):
+        if other is None:
+            other = self
+        else:
+            other = self._coerce(other)
+            if other is NotImplemented:
+                return NotImplemented
+
+        groups = {}
+        for (i, key) in enumerate(zip(self._fixed, other._fixed)):
+            indexes = groups.get(key)
+            if indexes is None:
+                groups[key] = [i]
+            else:
+                indexes.append(i)
+
+        results = {}
+        for ((fa, fb), indexes) in groups.items():
+            fp = _exact(op, fa, fb, max([ self.configs[i][0] for i in indexes ]))
+            if fp in results:
+                results[fp].extend(indexes)
+            else:
+                results[fp] = indexes
+
+        p = object.__new__(MultiPosit)
+        p.configs = self.configs
+        p.precision = max(self.precision, other.precision)
+        p._set_results(results)
+        fp = _exact(op, self._ref, other._ref, p.precision + 2)
+        p._ref = None if fp is None else _round_binary(fp[0], fp[1], p.precision)
+        return p
+
+
+    def __add__(self, other):
+        return self._op('add', other)
+
+
+    def __radd__(self, other):
+        return self._coerce(other)._op('add', self)
+
+
+    def __sub__(self, other):
+        return self._op('sub', other)
+
+
+    def __rsub__(self, other):
+        return self._coerce(other)._op('sub', self)
+
+
+    def __mul__(self, other):
+        return self._op('mul', other)
+
+
+    def __rmul__(self, other):
+        return self._coerce(other)._op('mul', self)
+
+
+    def __truediv__(self, other):
+        return self._op('div', other)
+
+
+    def __rtruediv__(self, other):
+        return self._coerce(other)._op('div', self)
+
+
+    def __div__(self, other):
+        return self.__truediv__(other)
+
+
+    def __rdiv__(self, other):
+        return self.__rtruediv__(other)
+
+
+    def __neg__(self):
+        return self._op('neg', None)
+
+
+    def sqrt(self):
+        return self._op('sqrt', None)
+
+
+    # Return the posit bit patterns, one per configuration.
+    def bits(self):
+        return list(self._bits)
+
+
+    # Return the posits as PCPosit, one per configuration.
+    def posits(self):
+        return [ PCPosit(bits, mode='bits', nbits=nbits, es=es) for (bits, (nbits, es)) in zip(self._bits, self.configs) ]
+
+
+    def posit(self, nbits, es):
+        i = self.configs.index((nbits, es))
+        return PCPosit(self._bits[i], mode='bits', nbits=nbits, es=es)
+
+
+    # Return the reference value as a Fraction, or None for cinf.
+    def reference(self):
+        if self._ref is None:
+            return None
+        (x, m) = self._ref
+        return fractions.Fraction(x) * fractions.Fraction(2)**m
+
+
+    # Return the error relative to the reference, one float per configuration.
+    # A zero reference gives the absolute error; cinf against a number gives
+    # inf, and cinf against a cinf reference gives 0.
+    def errors(self):
+        ref = self.reference()
+        errors = []
+        for fp in self._fixed:
+            if fp is None or ref is None:
+                errors.append(0.0 if fp is None and ref is None else float('inf'))
+                continue
+            err = abs(fractions.Fraction(fp[0]) * fractions.Fraction(2)**fp[1] - ref)
+            errors.append(float(err / abs(ref) if ref != 0 else err))
+        return errors
+
+
+    # Return the configuration of fewest bits, then smallest es, whose error
+    # is at most max_error, or None.
+    def smallest(self, max_error):
+        fits = [ c for (c, err) in zip(self.configs, self.errors()) if err <= max_error ]
+        return min(fits) if fits else None
+
+
+    def __str__(self):
+        return ', '.join('<{},{}> {}'.format(nbits, es, p) for (p, (nbits, es)) in zip(self.posits(), self.configs))
+
+
+# Call fn with the scalar args as MultiPosit values and return its result, so
+# one run evaluates fn in every configuration.
+def sweep(fn, args, configs=None, precision=None):
+    return fn(*[ MultiPosit(v, configs, precision) for v in args ])
@@ -0,0 +1,409 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import numpy as np
+
+
+MAX_ARRAY_NBITS = 64
+
+MAX_ARRAY_ES = 32
+
+# Posits up to this size convert to float64 by table lookup.
+FLOAT64_TABLE_NBITS = 16
+
+_float64_tables = {}
+
+# Posits up to this size convert between configurations by table lookup.
+CONVERT_TABLE_NBITS = 16
+
+_convert_tables = {}
+
+# Posits up to this size take square roots by table lookup.
+SQRT_TABLE_NBITS = 16
+
+_sqrt_tables = {}
+
+# Root bits, including a guard bit, of the int64 square root path.
+_SQRT_MAX_ROOT_BITS = 31
+
+# Posits up to this size add, sub, mul and div in int64 fixed point, their
+# significands of at most 30 bits leaving room for guard and sticky bits.
+ARITH_MAX_NBITS = 32
+
+
+# Return the smallest unsigned integer dtype holding nbits bit patterns.
+def dtype_for_nbits(nbits):
+    if nbits < 2:
+        raise ValueError('Expect nbits >= 2.')
+    elif nbits <= 8:
+        return np.dtype(np.uint8)
+    elif nbits <= 16:
+        return np.dtype(np.uint16)
+    elif nbits <= 32:
+        return np.dtype(np.uint32)
+    elif nbits <= MAX_ARRAY_NBITS:
+        return np.dtype(np.uint64)
+
+    raise ValueError('Posit arrays support nbits up to {}.'.format(MAX_ARRAY_NBITS))
+
+
+# Raise ValueError unless posit arrays support posit<nbits,es>.
+def check_config(nbits, es):
+    dtype_for_nbits(nbits)
+    if es < 0 or es > MAX_ARRAY_ES:
+        raise ValueError('Posit arrays support 0 <= es <= {}.'.format(MAX_ARRAY_ES))
+
+
+_U64_ONE = np.uint64(1)
+_U64_ALL = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+# Mask of n ones for n in [0, 64], elementwise.
+def _mask(n):
+    n = np.asarray(n, dtype=np.int64)
+    m = (_U64_ONE << np.minimum(n, 63).astype(np.uint64)) - _U64_ONE
+    return np.where(n >= 64, _U64_ALL, m)
+
+
+# v << n and v >> n for uint64 v and n in [0, 64], with shifts of 64 giving 0.
+def lshift(v, n):
+    n = np.asarray(n, dtype=np.int64)
+    return np.where(n >= 64, np.uint64(0), v << np.minimum(n, 63).astype(np.uint64))
+
+
+def rshift(v, n):
+    n = np.asarray(n, dtype=np.int64)
+    return np.where(n >= 64, np.uint64(0), v >> np.minimum(n, 63).astype(np.uint64))
+
+
+# Number of bits of uint64 v excluding leading zeros, elementwise. The float64
+# exponent is exact or, when rounding carries into the next power of 2, one more.
+def bit_length(v):
+    v = np.array(v, dtype=np.uint64)
+    n = np.minimum(np.frexp(v.astype(np.float64))[1], 64).astype(np.int64)
+    n -= ((v >> np.maximum(n - 1, 0).astype(np.uint64)) == 0) & (n > 0)
+    return n
+
+
+# Decode an array of posit bit patterns into the struct-of-arrays fields
+# (s, k, e, f, h, t) of coder.decode_posit_binary, one array per field.
+def decode_posit_array(bits, nbits, es):
+    check_config(nbits, es)
+
+    bits = np.asarray(bits).astype(np.uint64)
+    n = nbits - 1
+    mask = np.uint64((1 << nbits) - 1)
+    cinf_bits = np.uint64(1 << n)
+
+    t = np.full(bits.shape, 'n', dtype='<U1')
+    t[bits == 0] = 'z'
+    t[bits == cinf_bits] = 'c'
+    normal = t == 'n'
+
+    s = (bits >> np.uint64(n)).astype(np.int64)
+    v = np.where(s == 1, (np.uint64(0) - bits) & mask, bits)
+
+    ones = ((v >> np.uint64(max(n-1, 0))) & _U64_ONE) == 1
+    nleads = np.where(ones, n - bit_length(~v & np.uint64((1 << n) - 1)), n - bit_length(v))
+    k = np.where(ones, nleads - 1, -nleads)
+
+    nrem = np.maximum(0, n - nleads - 1)
+    low = v & _mask(nrem)
+    h = np.maximum(0, nrem - es)
+    e = np.where(nrem >= es, rshift(low, h), lshift(low, es - nrem)).astype(np.int64)
+    f = np.where(nrem >= es, low & _mask(h), np.uint64(0))
+
+    zero = np.int64(0)
+    s = np.where(normal, s, zero)
+    k = np.where(normal, k, zero)
+    e = np.where(normal, e, zero)
+    f = np.where(normal, f, np.uint64(0))
+    h = np.where(normal, h, zero)
+
+    return (s, k, e, f, h, t)
+
+
+# Encode struct-of-arrays fields (s, k, e, f, h, t) into posit bit patterns,
+# rounding to nearest even when the fields carry more bits than nbits holds.
+# Fraction f has h bits, h <= 64. t is 'n', 'z' or 'c', or None for all normal.
+def encode_posit_array(s, k, e, f, h, t, nbits, es):
+    check_config(nbits, es)
+
+    n = nbits - 1
+    s = np.asarray(s, dtype=np.int64)
+    k = np.asarray(k, dtype=np.int64)
+    e = np.asarray(e, dtype=np.int64).astype(np.uint64)
+    f = np.asarray(f).astype(np.uint64)
+    h = np.asarray(h, dtype=np.int64)
+    maxpos_bits = np.uint64((1 << n) - 1)
+
+    # Regime bits and length, for k within [1-n, n-2].
+    kc = np.clip(k, 1-n, max(n-2, 1-n))
+    rlen = np.where(kc >= 0, kc + 2, 1 - kc)
+    regime = np.where(kc >= 0, _mask(kc + 2) - _U64_ONE, _U64_ONE)
+
+    avail = n - rlen
+    bits = lshift(regime, avail)
+
+    # Exponent bits, dropping the least significant ones when they do not fit.
+    de = np.maximum(0, es - avail)
+    bits |= lshift(rshift(e, de), np.maximum(0, avail - es))
+    avail = np.maximum(0, avail - es)
+
+    # Fraction bits.
+    df = np.maximum(0, h - avail)
+    bits |= lshift(rshift(f, df), np.maximum(0, avail - h))
+
+    # Round to nearest even on the dropped bits, e bits first then f bits.
+    dropped_e = e & _mask(de)
+    round_bit = np.where(de > 0, rshift(dropped_e, de - 1) & _U64_ONE, rshift(f, df - 1) & _U64_ONE)
+    round_bit = np.where((de > 0) | (df > 0), round_bit, np.uint64(0))
+    sticky = np.where(de > 0, ((dropped_e & _mask(de - 1)) != 0) | (f != 0), (f & _mask(df - 1)) != 0)
+    sticky &= (de > 0) | (df > 0)
+    bits += round_bit & (sticky | ((bits & _U64_ONE) == 1))
+
+    bits = np.where(k >= n - 1, maxpos_bits, bits)
+    bits = np.where(k < 1 - n, _U64_ONE, bits)
+
+    mask = np.uint64((1 << nbits) - 1)
+    bits = np.where(s == 1, (np.uint64(0) - bits) & mask, bits)
+
+    if t is not None:
+        t = np.asarray(t)
+        bits = np.where(t == 'z', np.uint64(0), bits)
+        bits = np.where(t == 'c', np.uint64(1 << n), bits)
+
+    return bits.astype(dtype_for_nbits(nbits))
+
+
+# Return int64 arrays (x,m) representing numbers = x * 2^m.
+# Zero and cinf both give x = 0.
+def decode_fixedpoint_array(bits, nbits, es):
+    (s, k, e, f, h, t) = decode_posit_array(bits, nbits, es)
+    x = ((_U64_ONE << h.astype(np.uint64)) | f).astype(np.int64)
+    x = np.where(t == 'n', np.where(s == 1, -x, x), np.int64(0))
+    m = np.where(t == 'n', (k << es) + e - h, np.int64(0))
+    return (x, m)
+
+
+# Round numbers = x * 2^m to posit bit patterns, elementwise.
+# x is a signed int64 array, or uint64 magnitudes with a separate sign s.
+def round_fixedpoint_array(x, m, nbits, es, s=None):
+    check_config(nbits, es)
+
+    x = np.asarray(x)
+    m = np.asarray(m, dtype=np.int64)
+    if s is None:
+        s = (x < 0).astype(np.int64)
+        x = np.abs(x.astype(np.int64)).astype(np.uint64)
+    else:
+        x = x.astype(np.uint64)
+
+    h = np.maximum(bit_length(x) - 1, 0)
+    f = x & _mask(h)
+    scale = m + h
+    k = scale >> es
+    e = scale & ((1 << es) - 1)
+
+    t = np.where(x == 0, 'z', 'n')
+
+    return encode_posit_array(s, k, e, f, h, t, nbits, es)
+
+
+# Convert posit bit patterns to float64 elementwise, cinf to nan.
+# Uses a per-configuration lookup table for nbits <= FLOAT64_TABLE_NBITS.
+def to_float64(bits, nbits, es):
+    check_config(nbits, es)
+
+    if nbits <= FLOAT64_TABLE_NBITS:
+        table = _float64_tables.get((nbits, es))
+        if table is None:
+            table = _to_float64_ldexp(np.arange(1 << nbits, dtype=np.uint64), nbits, es)
+            table.flags.writeable = False
+            _float64_tables[(nbits, es)] = table
+        return table[np.asarray(bits).astype(np.intp)]
+
+    return _to_float64_ldexp(bits, nbits, es)
+
+
+# The significand has at most nbits-2 fraction bits. When it exceeds the 53
+# bits of float64, the scale is far from the subnormal range for nbits <= 64,
+# so the conversion to float64 is the only rounding and ldexp is exact.
+def _to_float64_ldexp(bits, nbits, es):
+    (s, k, e, f, h, t) = decode_posit_array(bits, nbits, es)
+    x = ((_U64_ONE << h.astype(np.uint64)) | f).astype(np.float64)
+    scale = np.clip((k << es) + e - h, -2200, 2200).astype(np.int32)
+
+    with np.errstate(over='ignore', under='ignore'):
+        v = np.ldexp(x, scale)          # Out of range values become inf and 0.
+    v = np.where(s == 1, -v, v)
+    v = np.where(t == 'z', 0.0, v)
+    v = np.where(t == 'c', np.nan, v)
+
+    return v
+
+
+# Convert posit<nbits,es> bit patterns to the nearest posit<to_nbits,to_es>, elementwise.
+# Uses a per-configuration pair lookup table for nbits <= CONVERT_TABLE_NBITS.
+def convert_posit_array(bits, nbits, es, to_nbits, to_es):
+    check_config(nbits, es)
+    check_config(to_nbits, to_es)
+
+    if nbits <= CONVERT_TABLE_NBITS:
+        key = (nbits, es, to_nbits, to_es)
+        table = _convert_tables.get(key)
+        if table is None:
+            table = _convert_rounding(np.arange(1 << nbits, dtype=np.uint64), nbits, es, to_nbits, to_es)
+            table.flags.writeable = False
+            _convert_tables[key] = table
+        return table[np.asarray(bits).astype(np.intp)]
+
+    return _convert_rounding(bits, nbits, es, to_nbits, to_es)
+
+
+def _convert_rounding(bits, nbits, es, to_nbits, to_es):
+    bits = np.asarray(bits).astype(np.uint64)
+    (x, m) = decode_fixedpoint_array(bits, nbits, es)
+    out = round_fixedpoint_array(x, m, to_nbits, to_es)
+    out[bits == np.uint64(1 << (nbits-1))] = 1 << (to_nbits-1)
+    return out
+
+
+# Number of root bits for round to nearest even of a posit<nbits,es> square
+# root: the most significand bits of the configuration and a guard bit.
+def _sqrt_root_bits(nbits, es):
+    return max(2, nbits - 1 - es)
+
+
+def sqrt_array_supported(nbits, es):
+    return _sqrt_root_bits(nbits, es) <= _SQRT_MAX_ROOT_BITS
+
+
+# Square roots of posit bit patterns elementwise, cinf for cinf and negative numbers.
+# Uses a per-configuration lookup table for nbits <= SQRT_TABLE_NBITS.
+def sqrt_posit_array(bits, nbits, es):
+    check_config(nbits, es)
+    if not sqrt_array_supported(nbits, es):
+        raise ValueError('Square root arrays support nbits - es up to {}.'.format(_SQRT_MAX_ROOT_BITS + 1))
+
+    if nbits <= SQRT_TABLE_NBITS:
+        table = _sqrt_tables.get((nbits, es))
+        if table is None:
+            table = _sqrt_isqrt(np.arange(1 << nbits, dtype=np.uint64), nbits, es)
+            table.flags.writeable = False
+            _sqrt_tables[(nbits, es)] = table
+        return table[np.asarray(bits).astype(np.intp)]
+
+    return _sqrt_isqrt(bits, nbits, es)
+
+
+# The root r = isqrt(X) is taken from a float64 estimate, corrected to the exact
+# integer root in uint64, then rounded with a sticky bit for the remainder.
+def _sqrt_isqrt(bits, nbits, es):
+    bits = np.asarray(bits).astype(np.uint64)
+    (x, m) = decode_fixedpoint_array(bits, nbits, es)
+    positive = x > 0
+
+    x = np.where(positive, x, 1).astype(np.uint64)
+    odd = m & 1
+    x <<= odd.astype(np.uint64)
+    m -= odd
+
+    q = _sqrt_root_bits(nbits, es)
+    g = np.maximum(0, (2*q - bit_length(x)) >> 1)
+    X = x << (2*g).astype(np.uint64)
+
+    r = np.floor(np.sqrt(X.astype(np.float64))).astype(np.uint64)
+    for i in range(2):
+        r -= (r*r > X).astype(np.uint64)
+        r += ((r + _U64_ONE)*(r + _U64_ONE) <= X).astype(np.uint64)
+    sticky = (r*r != X).astype(np.uint64)
+
+    out = round_fixedpoint_array((r << _U64_ONE) | sticky, (m >> 1) - g - 1, nbits, es, s=np.zeros(r.shape, dtype=np.int64))
+    out = np.where(positive, out, np.uint64(1 << (nbits-1)))
+    out = np.where(bits == 0, np.uint64(0), out)
+
+    return out.astype(np.uint64)
+
+
+# Align uint64 magnitudes u * 2^m to units of 2^base, one extra bit below
+# holding the sticky bit of the bits shifted out.
+def _align_sticky(u, m, base):
+    d = m - base
+    left = lshift(u, np.maximum(d, 0))
+    right = rshift(u, np.maximum(-d, 0))
+    sticky = (u & _mask(np.maximum(-d, 0))) != 0
+    return (np.where(d >= 0, left, right) << _U64_ONE) | sticky.astype(np.uint64)
+
+
+# Add, sub, mul or div posit bit patterns elementwise, correctly rounded, for
+# nbits <= ARITH_MAX_NBITS. Products are exact in int64, sums align to a
+# 62-bit window with a sticky bit, and quotients keep at least 31 bits and a
+# sticky bit.
+def arith_posit_array(op, abits, bbits, nbits, es):
+    check_config(nbits, es)
+    if nbits > ARITH_MAX_NBITS:
+        raise ValueError('Fixed-point array arithmetic supports nbits up to {}.'.format(ARITH_MAX_NBITS))
+
+    (abits, bbits) = np.broadcast_arrays(np.asarray(abits), np.asarray(bbits))
+    (xa, ma) = decode_fixedpoint_array(abits, nbits, es)
+    (xb, mb) = decode_fixedpoint_array(bbits, nbits, es)
+    (sa, sb) = (xa < 0, xb < 0)
+    (ua, ub) = (np.abs(xa).astype(np.uint64), np.abs(xb).astype(np.uint64))
+
+    if op == 'mul':
+        (u, m, s) = (ua * ub, ma + mb, sa ^ sb)
+    elif op == 'div':
+        shift = 62 - bit_length(ua)
+        a = lshift(ua, shift)
+        b = np.where(ub == 0, _U64_ONE, ub)
+        q = a // b
+        sticky = (a - q*b) != 0
+        (u, m, s) = ((q << _U64_ONE) | sticky.astype(np.uint64), ma - mb - shift - 1, sa ^ sb)
+    elif op in ('add', 'sub'):
+        if op == 'sub':
+            sb = ~sb
+        # The larger operand fills 61 bits exactly, the other keeps a sticky bit.
+        none = np.int64(-(1 << 40))
+        ta = np.where(ua == 0, none, ma + bit_length(ua))
+        tb = np.where(ub == 0, none, mb + bit_length(ub))
+        base = np.maximum(ta, tb) - 61
+        a = _align_sticky(ua, ma, base).astype(np.int64)
+        b = _align_sticky(ub, mb, base).astype(np.int64)
+        x = np.where(sa, -a, a) + np.where(sb, -b, b)
+        (u, m, s) = (np.abs(x).astype(np.uint64), base - 1, x < 0)
+    else:
+        raise ValueError('Unknown posit operation {}.'.format(op))
+
+    out = round_fixedpoint_array(u, m, nbits, es, s=s.astype(np.int64))
+
+    # As posit.div_posit_binary, a number divided by cinf is 0.
+    cinf_bits = 1 << (nbits-1)
+    if op == 'div':
+        out = np.where(bbits == cinf_bits, out.dtype.type(0), out)
+        nar = (abits == cinf_bits) | (bbits == 0)
+    else:
+        nar = (abits == cinf_bits) | (bbits == cinf_bits)
+    return np.where(nar, out.dtype.type(cinf_bits), out)
+
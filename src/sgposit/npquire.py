@@ -0,0 +1,325 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+
+# Matrix products of posit bit pattern arrays with exact quire accumulation.
+#
+# Every operand is an integer multiple of minpos, so it is split into signed
+# LIMB_BITS-bit limbs of value / minpos held as float64. A limb product is
+# below 2^32 in magnitude and a block of at most 2^20 of them sums exactly in
+# float64, so each pair of limb matrices is multiplied by the BLAS matmul and
+# the exact partial sums are carried into int64 quire limbs. Each element is
+# rounded once from its quire limbs.
+
+
+import numpy as np
+
+from sgposit         import coder
+from sgposit         import posit
+from sgposit         import npcoder
+
+
+LIMB_BITS = 16
+
+# Largest nbits and maxscale taking the limb path; other posits accumulate in
+# Python ints. Limb planes per element grow with maxscale = (nbits-2) << es.
+MAX_LIMB_NBITS = 32
+
+MAX_LIMB_MAXSCALE = 512
+
+_BLOCK_K = 1 << 20
+
+_LIMB_MASK = (1 << LIMB_BITS) - 1
+
+
+def _maxscale(nbits, es):
+    return (nbits - 2) << es
+
+
+def _use_limbs(nbits, es):
+    return nbits <= MAX_LIMB_NBITS and _maxscale(nbits, es) <= MAX_LIMB_MAXSCALE
+
+
+# Return the float64 signed limbs of value * 2^shift / minpos of the posit bit
+# patterns, stacked on a new leading axis of nlimbs limbs.
+def _limbs(bits, nbits, es, shift, nlimbs):
+    (x, m) = npcoder.decode_fixedpoint_array(bits, nbits, es)
+    neg = x < 0
+    mag = np.abs(x).astype(np.uint64)
+    sh = m + _maxscale(nbits, es) + shift
+
+    out = np.empty((nlimbs,) + x.shape, dtype=np.float64)
+    for i in range(nlimbs):
+        n = sh - LIMB_BITS*i
+        limb = np.where(n >= 0, npcoder.lshift(mag, np.maximum(n, 0)), npcoder.rshift(mag, np.maximum(-n, 0)))
+        limb = (limb & np.uint64(_LIMB_MASK)).astype(np.float64)
+        out[i] = np.where(neg, -limb, limb)
+    return out
+
+
+# Carry the int64 limbs d in place so all but the top limb are in [0, 2^LIMB_BITS).
+def _carry(d):
+    for i in range(len(d) - 1):
+        c = d[i] >> LIMB_BITS
+        d[i] -= c << LIMB_BITS
+        d[i+1] += c
+
+
+# Round quire limbs d, in units of 2^lsb, to posit bit patterns.
+def _round_limbs(d, lsb, nbits, es):
+    _carry(d)
+    s = d[-1] < 0
+    d = np.where(s, -d, d)
+    _carry(d)
+
+    # Two zero limbs below the quire keep the top three limbs in range.
+    d = np.concatenate((np.zeros((2,) + d.shape[1:], dtype=np.int64), d))
+    nz = d != 0
+    h = len(d) - 1 - np.argmax(nz[::-1], axis=0)
+    h = np.where(np.any(nz, axis=0), h, 2)[np.newaxis]
+
+    x = np.zeros(h.shape, dtype=np.uint64)
+    for i in (0, 1, 2):
+        x = (x << np.uint64(LIMB_BITS)) | np.take_along_axis(d, h-i, axis=0).astype(np.uint64)
+    sticky = np.take_along_axis(np.logical_or.accumulate(nz, axis=0), np.maximum(h-3, 0), axis=0) & (h >= 3)
+    x = (x << np.uint64(1)) | sticky.astype(np.uint64)
+    m = lsb + LIMB_BITS*(h-4) - 1
+
+    out = npcoder.round_fixedpoint_array(x.ravel(), m.ravel(), nbits, es, s=s.astype(np.int64).ravel())
+    return out.reshape(s.shape)
+
+
+def _matmul_limbs(abits, bbits, nbits, es, cbits):
+    maxscale = _maxscale(nbits, es)
+    nlimbs = 2*maxscale // LIMB_BITS + 1
+    (rows, depth) = abits.shape
+    cols = bbits.shape[1]
+
+    # Four spare limbs take the carries out of 2^48 blocks.
+    d = np.zeros((2*nlimbs + 3, rows, cols), dtype=np.int64)
+    if cbits is not None:
+        d[...] = _limbs(cbits, nbits, es, maxscale, len(d)).astype(np.int64)
+
+    for k in range(0, depth, _BLOCK_K):
+        al = _limbs(abits[:, k:k+_BLOCK_K], nbits, es, 0, nlimbs)
+        bl = _limbs(bbits[k:k+_BLOCK_K], nbits, es, 0, nlimbs)
+        ai = [ i for i in range(nlimbs) if al[i].any() ]
+        bj = [ j for j in range(nlimbs) if bl[j].any() ]
+        for i in ai:
+            for j in bj:
+                d[i+j] += np.matmul(al[i], bl[j]).astype(np.int64)
+        _carry(d)
+
+    return _round_limbs(d, -2*maxscale, nbits, es)
+
+
+# Return (x,m) of a posit bit pattern, with x = 0 for zero and cinf.
+def _fixedpoint(v, nbits, es):
+    v = int(v)
+    if v == 0 or v == 1 << (nbits-1):
+        return (0, 0)
+    return posit.decode_fixedpoint(v, nbits, es)
+
+
+def _matmul_python(abits, bbits, nbits, es, cbits):
+    (rows, depth) = abits.shape
+    cols = bbits.shape[1]
+    lsb = -2*_maxscale(nbits, es)
+
+    a = [ [ _fixedpoint(v, nbits, es) for v in row ] for row in abits ]
+    b = [ [ _fixedpoint(v, nbits, es) for v in row ] for row in bbits.T ]
+
+    out = np.zeros((rows, cols), dtype=abits.dtype)
+    for r in range(rows):
+        for c in range(cols):
+            acc = 0
+            if cbits is not None:
+                (x, m) = _fixedpoint(cbits[r, c], nbits, es)
+                acc = x << (m - lsb)
+            for ((xa, ma), (xb, mb)) in zip(a[r], b[c]):
+                acc += (xa*xb) << (ma + mb - lsb)
+            out[r, c] = coder.fixedpoint_to_posit_binary(acc, lsb, nbits, es)
+    return out
+
+
+# Return c + a @ b for 2-D posit bit pattern arrays a, b and optional c,
+# accumulated exactly in a quire per element and rounded once.
+def matmul_posit_array(abits, bbits, nbits, es, cbits=None):
+    npcoder.check_config(nbits, es)
+
+    abits = np.asarray(abits)
+    bbits = np.asarray(bbits)
+    if abits.ndim != 2 or bbits.ndim != 2 or abits.shape[1] != bbits.shape[0]:
+        raise ValueError('Matrix shapes {} and {} do not match.'.format(abits.shape, bbits.shape))
+    shape = (abits.shape[0], bbits.shape[1])
+    if cbits is not None:
+        cbits = np.asarray(cbits)
+        if cbits.shape != shape:
+            raise ValueError('Matrix shapes {} and {} do not match.'.format(cbits.shape, shape))
+
+    dtype = npcoder.dtype_for_nbits(nbits)
+    cinf_bits = dtype.type(1 << (nbits-1))
+    nar = np.any(abits == cinf_bits, axis=1)[:, np.newaxis] | np.any(bbits == cinf_bits, axis=0)
+    if cbits is not None:
+        nar = nar | (cbits == cinf_bits)
+
+    if _use_limbs(nbits, es):
+        out = _matmul_limbs(abits, bbits, nbits, es, cbits)
+    else:
+        out = _matmul_python(abits, bbits, nbits, es, cbits)
+
+    return np.where(nar, cinf_bits, out).astype(dtype)
+
+
+def _sum_python(bits, nbits, es, cumulative):
+    lsb = -_maxscale(nbits, es)
+    rows = bits.reshape(int(np.prod(bits.shape[:-1])), bits.shape[-1])
+    out = np.zeros(rows.shape if cumulative else rows.shape[:1], dtype=bits.dtype)
+    for (r, row) in enumerate(rows):
+        acc = 0
+        for (j, v) in enumerate(row):
+            (x, m) = _fixedpoint(v, nbits, es)
+            acc += x << (m - lsb)
+            if cumulative:
+                out[r, j] = coder.fixedpoint_to_posit_binary(acc, lsb, nbits, es)
+        if not cumulative:
+            out[r] = coder.fixedpoint_to_posit_binary(acc, lsb, nbits, es)
+    return out.reshape(bits.shape if cumulative else bits.shape[:-1])
+
+
+# Return the sums of posit bit patterns along axis, accumulated exactly in a
+# quire and rounded once, or the rounded running sums if cumulative.
+def sum_posit_array(bits, nbits, es, axis=0, cumulative=False):
+    npcoder.check_config(nbits, es)
+
+    bits = np.moveaxis(np.asarray(bits), axis, -1)
+    dtype = npcoder.dtype_for_nbits(nbits)
+    cinf_bits = dtype.type(1 << (nbits-1))
+    if cumulative:
+        nar = np.logical_or.accumulate(bits == cinf_bits, axis=-1)
+    else:
+        nar = np.any(bits == cinf_bits, axis=-1)
+
+    if _use_limbs(nbits, es):
+        maxscale = _maxscale(nbits, es)
+        limbs = _limbs(bits, nbits, es, 0, 2*maxscale // LIMB_BITS + 1).astype(np.int64)
+        sums = np.cumsum(limbs, axis=-1) if cumulative else np.sum(limbs, axis=-1)
+        # Four spare limbs take the carries out of the top limb.
+        d = np.concatenate((sums, np.zeros((4,) + sums.shape[1:], dtype=np.int64)))
+        out = _round_limbs(d, -maxscale, nbits, es)
+    else:
+        out = _sum_python(bits, nbits, es, cumulative)
+
+    out = np.where(nar, cinf_bits, out).astype(dtype)
+    return np.moveaxis(out, -1, axis) if cumulative else out
+
+
+def _dot_python(abits, bbits, nbits, es):
+    lsb = -2*_maxscale(nbits, es)
+    size = int(np.prod(abits.shape[1:]))
+    a = abits.reshape(len(abits), size)
+    b = bbits.reshape(len(bbits), size)
+
+    out = np.zeros(size, dtype=abits.dtype)
+    for c in range(size):
+        acc = 0
+        for (va, vb) in zip(a[:, c], b[:, c]):
+            (xa, ma) = _fixedpoint(va, nbits, es)
+            (xb, mb) = _fixedpoint(vb, nbits, es)
+            acc += (xa*xb) << (ma + mb - lsb)
+        out[c] = coder.fixedpoint_to_posit_binary(acc, lsb, nbits, es)
+    return out.reshape(abits.shape[1:])
+
+
+# Return the sums of the elementwise products of posit bit patterns along
+# axis, accumulated exactly in a quire and rounded once, as PCPosit.fdp.
+def dot_posit_array(abits, bbits, nbits, es, axis=0):
+    npcoder.check_config(nbits, es)
+
+    (abits, bbits) = np.broadcast_arrays(np.asarray(abits), np.asarray(bbits))
+    abits = np.moveaxis(abits, axis, 0)
+    bbits = np.moveaxis(bbits, axis, 0)
+    dtype = npcoder.dtype_for_nbits(nbits)
+    cinf_bits = dtype.type(1 << (nbits-1))
+    nar = np.any((abits == cinf_bits) | (bbits == cinf_bits), axis=0)
+
+    if _use_limbs(nbits, es):
+        maxscale = _maxscale(nbits, es)
+        nlimbs = 2*maxscale // LIMB_BITS + 1
+        d = np.zeros((2*nlimbs + 3,) + abits.shape[1:], dtype=np.int64)
+        for k in range(0, len(abits), _BLOCK_K):
+            al = _limbs(abits[k:k+_BLOCK_K], nbits, es, 0, nlimbs)
+            bl = _limbs(bbits[k:k+_BLOCK_K], nbits, es, 0, nlimbs)
+            ai = [ i for i in range(nlimbs) if al[i].any() ]
+            bj = [ j for j in range(nlimbs) if bl[j].any() ]
+            for i in ai:
+                for j in bj:
+                    d[i+j] += np.sum(al[i] * bl[j], axis=0).astype(np.int64)
+            _carry(d)
+        out = _round_limbs(d, -2*maxscale, nbits, es)
+    else:
+        out = _dot_python(abits, bbits, nbits, es)
+
+    return np.where(nar, cinf_bits, out).astype(dtype)
+
+
+def _fused_python(abits, bbits, cbits, nbits, es, csign):
+    lsb = -2*_maxscale(nbits, es)
+
+    def fused(a, b, c):
+        (xa, ma) = _fixedpoint(a, nbits, es)
+        (xb, mb) = _fixedpoint(b, nbits, es)
+        (xc, mc) = _fixedpoint(c, nbits, es)
+        acc = ((xa*xb) << (ma + mb - lsb)) + ((csign*xc) << (mc - lsb))
+        return coder.fixedpoint_to_posit_binary(acc, lsb, nbits, es)
+
+    return np.frompyfunc(fused, 3, 1)(abits, bbits, cbits)
+
+
+# Return a * b + csign * c elementwise, accumulated exactly in a quire and
+# rounded once, as PCPosit.fma and fms.
+def fused_posit_array(abits, bbits, cbits, nbits, es, csign=1):
+    npcoder.check_config(nbits, es)
+
+    (abits, bbits, cbits) = np.broadcast_arrays(np.asarray(abits), np.asarray(bbits), np.asarray(cbits))
+    dtype = npcoder.dtype_for_nbits(nbits)
+    cinf_bits = dtype.type(1 << (nbits-1))
+    nar = (abits == cinf_bits) | (bbits == cinf_bits) | (cbits == cinf_bits)
+
+    if _use_limbs(nbits, es):
+        maxscale = _maxscale(nbits, es)
+        nlimbs = 2*maxscale // LIMB_BITS + 1
+        al = _limbs(abits, nbits, es, 0, nlimbs)
+        bl = _limbs(bbits, nbits, es, 0, nlimbs)
+        d = csign * _limbs(cbits, nbits, es, maxscale, 2*nlimbs + 3).astype(np.int64)
+        ai = [ i for i in range(nlimbs) if al[i].any() ]
+        bj = [ j for j in range(nlimbs) if bl[j].any() ]
+        for i in ai:
+            for j in bj:
+                d[i+j] += (al[i] * bl[j]).astype(np.int64)
+        out = _round_limbs(d, -2*maxscale, nbits, es)
+    else:
+        out = _fused_python(abits, bbits, cbits, nbits, es, csign)
+
+    return np.where(nar, cinf_bits, out).astype(dtype)
@@ -0,0 +1,131 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import numpy as np
+
+from sgposit         import coder
+from sgposit.pcposit import PCPosit
+
+
+MAX_TABLE_NBITS = 8
+
+OPS = ('add', 'sub', 'mul', 'div')
+
+_REF_OPS = {
+    'add': PCPosit.__add__,
+    'sub': PCPosit.__sub__,
+    'mul': PCPosit.__mul__,
+    'div': PCPosit.__truediv__,
+}
+
+_tables = {}
+
+
+"""
+Full 2^nbits x 2^nbits result tables of the binary posit operations, for small
+posit configurations. The tables are computed once from PCPosit, the reference
+implementation, and every operation afterwards is a lookup.
+"""
+class PositOpTable(object):
+
+    def __init__(self, nbits, es):
+        if nbits < 2 or nbits > MAX_TABLE_NBITS:
+            raise ValueError('Expect 2 <= nbits <= {} for operation tables.'.format(MAX_TABLE_NBITS))
+        if es < 0:
+            raise ValueError('Expect es >= 0.')
+
+        self.nbits = nbits
+        self.es = es
+        self._arrays = {}
+        self._lists = {}
+
+
+    # Return the table of op as a 2^nbits x 2^nbits array, indexed by [abits, bbits].
+    def table(self, op):
+        t = self._arrays.get(op)
+        if t is None:
+            self._build(op)
+            t = self._arrays[op]
+        return t
+
+
+    # Scalar (abits op bbits).
+    def lookup(self, op, abits, bbits):
+        t = self._lists.get(op)
+        if t is None:
+            self._build(op)
+            t = self._lists[op]
+        return t[(abits << self.nbits) | bbits]
+
+
+    # Elementwise (abits op bbits) over broadcastable arrays of bit patterns.
+    def gather(self, op, abits, bbits, out=None):
+        t = self.table(op)
+        abits = np.asarray(abits)
+        bbits = np.asarray(bbits)
+        if out is None:
+            return t[abits, bbits]
+        out[...] = t[abits, bbits]
+        return out
+
+
+    def add(self, abits, bbits):
+        return self.lookup('add', abits, bbits)
+
+
+    def sub(self, abits, bbits):
+        return self.lookup('sub', abits, bbits)
+
+
+    def mul(self, abits, bbits):
+        return self.lookup('mul', abits, bbits)
+
+
+    def div(self, abits, bbits):
+        return self.lookup('div', abits, bbits)
+
+
+    def _build(self, op):
+        if op not in _REF_OPS:
+            raise ValueError('Unknown posit operation {}.'.format(op))
+
+        refop = _REF_OPS[op]
+        nbits = self.nbits
+        es = self.es
+        posits = [ PCPosit(bits, mode='bits', nbits=nbits, es=es) for bits in range(1 << nbits) ]
+
+        values = [ coder.encode_posit_binary(refop(a, b).rep) for a in posits for b in posits ]
+
+        self._lists[op] = values
+        self._arrays[op] = np.array(values, dtype=np.uint8).reshape(1 << nbits, 1 << nbits)
+
+
+# Return the shared operation tables of posit configuration (nbits, es).
+def get_op_table(nbits, es):
+    key = (nbits, es)
+    t = _tables.get(key)
+    if t is None:
+        t = PositOpTable(nbits, es)
+        _tables[key] = t
+    return t
@@ -21,18 +21,139 @@
 # SOFTWARE.
 
 
+import decimal
+import fractions
+import math
 import numbers
 import operator
+import struct
 
 from sgposit import coder
 
 
+# Scalar types PCPosit converts from and takes as operands.
+SCALAR_TYPES = (numbers.Integral, float, fractions.Fraction, decimal.Decimal)
+
+_CONSTANT_CACHE_SIZE = 256
+
+_constant_cache = {}
+
+# Bound on the interned posits kept per configuration.
+INTERN_POOL_SIZE = 1 << 16
+
+_interning = False
+
+_intern_pools = {}
+
+
+# Enable or disable interning. While enabled, PCPosit(bits, mode='bits', ...)
+# returns a shared instance per (bits, nbits, es) from a flyweight pool. The
+# shared instances must not be modified.
+def set_interning(enabled):
+    global _interning
+    _interning = bool(enabled)
+    if not _interning:
+        _intern_pools.clear()
+
+
+def is_interning():
+    return _interning
+
+
+# Posit bit patterns order as 2's complement integers, cinf first.
+def _signed_bits(bits, nbits):
+    if bits >> (nbits-1):
+        return bits - (1 << nbits)
+    return bits
+
+
+# Return False for float and Decimal inf and nan.
+def scalar_is_finite(v):
+    if isinstance(v, float):
+        return not (math.isinf(v) or math.isnan(v))
+    elif isinstance(v, decimal.Decimal):
+        return v.is_finite()
+    return True
+
+
+# Return (x,m) of an int, float, Fraction or Decimal scalar, or None for inf and nan.
+# Int and float are exact. A Fraction quotient keeps more than nbits significant
+# bits and a sticky bit, enough to round correctly to posit<nbits,*>.
+def scalar_to_fixedpoint(v, nbits):
+    if isinstance(v, numbers.Integral):
+        return (int(v), 0)
+
+    elif isinstance(v, float):
+        u = struct.unpack('<Q', struct.pack('<d', v))[0]
+        s = u >> 63
+        biased_exp = (u >> 52) & 0x7FF
+        frac = u & ((1 << 52) - 1)
+
+        if biased_exp == 0x7FF:
+            return None
+        elif biased_exp == 0:
+            (x, m) = (frac, -1074)                  # Subnormal or zero.
+        else:
+            (x, m) = (frac | (1 << 52), biased_exp - 1075)
+
+        return (-x if s else x, m)
+
+    elif isinstance(v, decimal.Decimal):
+        if not v.is_finite():
+            return None
+        v = fractions.Fraction(v)
+
+    elif not isinstance(v, fractions.Fraction):
+        raise ValueError('Input is not supported.')
+
+    (a, b) = (v.numerator, v.denominator)
+    if b == 1:
+        return (a, 0)
+
+    sign = 1
+    if a < 0:
+        (a, sign) = (-a, -1)
+
+    (q, m) = coder.fixedpoint_quotient(a, b, nbits)
+
+    return (sign * q, m)
+
+
+# Return op(x * 2^m, v) exactly for fp = (x,m) and a SCALAR_TYPES v. Against
+# nan it is False, and inf compares as beyond every number.
+def compare_fixedpoint_scalar(fp, v, op):
+    if not scalar_is_finite(v):
+        if v != v:
+            return False
+        return op(0, v)
+
+    return op(coder.fixedpoint_to_fraction(*fp), fractions.Fraction(v))
+
+
 """
 Provably correct posit number arithmetic.
 """
-class PCPosit:
+class PCPosit(object):
+
+    _interned = False
+
+    _rep = None         # Positrep, None until decoded from _sbits and _config.
+
+    _sbits = None       # Signed bit pattern, cached.
+
+    _config = None      # (nbits, es) of a rounded result created from _sbits alone.
+
+
+    def __new__(cls, v=None, mode=None, nbits=None, es=None):
+        if _interning and mode == 'bits' and cls is PCPosit and isinstance(v, numbers.Integral):
+            return cls._intern(v, 32 if nbits is None else nbits, 2 if es is None else es)
+        return object.__new__(cls)
+
 
     def __init__(self, v=None, mode=None, nbits=None, es=None):
+        if self._interned:
+            return
+
         nbits_given = True
         es_given = True
         if nbits is None:
@@ -46,15 +167,21 @@ class PCPosit:
             self.rep = coder.create_zero_positrep(nbits=nbits, es=es)
             return
         elif isinstance(v, PCPosit):
-            if nbits_given and v.rep['nbits'] != nbits:
-                raise NotImplementedError('Mismatched nbits posit conversion is not implemented.')
-            if es_given and v.rep['es'] != es:
-                raise NotImplementedError('Mismatched es posit conversion is not implemented.')
-            self.rep = coder.copy_positrep(v.rep)
+            if (not nbits_given or v.rep.nbits == nbits) and (not es_given or v.rep.es == es):
+                self.rep = v.rep    # Immutable, shared.
+            elif v.rep.t == 'c':
+                self.rep = coder.create_cinf_positrep(nbits=nbits, es=es)
+            else:
+                if not nbits_given:
+                    nbits = v.rep.nbits
+                if not es_given:
+                    es = v.rep.es
+                self.rep = PCPosit._fixedpoint_to_posit(v.rep.x, v.rep.m, nbits=nbits, es=es).rep
             return
         elif mode == 'bits':
             if isinstance(v, numbers.Integral):
                 self.rep = coder.decode_posit_binary(v, nbits=nbits, es=es)
+                self._sbits = _signed_bits(v, nbits)
                 return
             elif isinstance(v, str):
                 raise NotImplementedError('Binary bit string posit conversion is not implemented.')
@@ -68,117 +195,312 @@ class PCPosit:
 
             return
 
+        elif mode is None and isinstance(v, SCALAR_TYPES):
+            self.rep = PCPosit._scalar_to_rep(v, nbits, es)
+            return
+
         raise ValueError('Input is not supported.')
 
 
+    # The positrep, decoded on first read for a rounded result.
+    @property
+    def rep(self):
+        rep = self._rep
+        if rep is None:
+            (nbits, es) = self._config
+            rep = coder.decode_posit_binary(self._sbits & ((1 << nbits) - 1), nbits=nbits, es=es)
+            self._rep = rep
+        return rep
+
+
+    @rep.setter
+    def rep(self, rep):
+        self._rep = rep
+        self._sbits = None
+
+
+    # The configuration, read without decoding a rounded result.
+    @property
+    def nbits(self):
+        if self._rep is None:
+            return self._config[0]
+        return self._rep.nbits
+
+
+    @property
+    def es(self):
+        if self._rep is None:
+            return self._config[1]
+        return self._rep.es
+
+
     def __add__(self, other):
-        if self.rep['t'] == 'z':
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return NotImplemented
+
+        a = self.rep
+        b = other.rep
+
+        if a.t == 'z':
             return PCPosit(other)
-        elif other.rep['t'] == 'z':
+        elif b.t == 'z':
             return PCPosit(self)
-        elif self.rep['t'] == 'c' or other.rep['t'] == 'c':
-            return PCPosit('cinf', nbits=self.rep['nbits'], es=self.rep['es'])
+        elif a.t == 'c' or b.t == 'c':
+            return PCPosit('cinf', nbits=a.nbits, es=a.es)
 
-        assert self.rep['t'] == 'n' and other.rep['t'] == 'n'
+        assert a.t == 'n' and b.t == 'n'
 
-        (xa,ma) = self._fixedpoint()
-        (xb,mb) = other._fixedpoint()
+        (xa,ma) = (a.x, a.m)
+        (xb,mb) = (b.x, b.m)
 
         m = max(ma, mb)
         xc = xa*2**(m-mb) + xb*2**(m-ma)
         mc = ma + mb - m
 
-        return self._fixedpoint_to_posit(xc, mc, nbits=self.rep['nbits'], es=self.rep['es'])
+        return self._fixedpoint_to_posit(xc, mc, nbits=a.nbits, es=a.es)
+
+
+    def __radd__(self, other):
+        return self.__add__(other)
 
 
     def __sub__(self, other):
-        p = -PCPosit(other)
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return NotImplemented
+
+        p = -other
         return self + p
 
 
+    def __rsub__(self, other):
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return NotImplemented
+
+        return other - self
+
+
     def __neg__(self):
         p = PCPosit(self)
-        if p.rep['t'] == 'n':
-            p.rep['s'] = p.rep['s'] ^ 1
+        if p.rep.t == 'n':
+            p.rep = p.rep.replace(s=p.rep.s ^ 1)
+            if self._sbits is not None:
+                p._sbits = -self._sbits
         return p
 
 
     def __mul__(self, other):
-        if self.rep['t'] == 'c' or other.rep['t'] == 'c':
-            return PCPosit('cinf', nbits=self.rep['nbits'], es=self.rep['es'])
-        elif self.rep['t'] == 'z' or other.rep['t'] == 'z':
-            return PCPosit('0', nbits=self.rep['nbits'], es=self.rep['es'])
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return NotImplemented
 
-        assert self.rep['t'] == 'n' and other.rep['t'] == 'n'
+        a = self.rep
+        b = other.rep
 
-        (xa,ma) = self._fixedpoint()
-        (xb,mb) = other._fixedpoint()
+        if a.t == 'c' or b.t == 'c':
+            return PCPosit('cinf', nbits=a.nbits, es=a.es)
+        elif a.t == 'z' or b.t == 'z':
+            return PCPosit('0', nbits=a.nbits, es=a.es)
+
+        assert a.t == 'n' and b.t == 'n'
+
+        xc = a.x * b.x
+        mc = a.m + b.m
 
-        xc = xa * xb
-        mc = ma + mb
+        return self._fixedpoint_to_posit(xc, mc, nbits=a.nbits, es=a.es)
 
-        return self._fixedpoint_to_posit(xc, mc, nbits=self.rep['nbits'], es=self.rep['es'])
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
 
 
     def __div__(self, other):
         return self.__truediv__(other)
 
 
+    def __rdiv__(self, other):
+        return self.__rtruediv__(other)
+
+
     def __truediv__(self, other):
-        if self.rep['t'] == 'c' or other.rep['t'] == 'z':
-            return PCPosit('cinf', nbits=self.rep['nbits'], es=self.rep['es'])
-        elif self.rep['t'] == 'z' or other.rep['t'] == 'c':
-            return PCPosit('0', nbits=self.rep['nbits'], es=self.rep['es'])
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return NotImplemented
+
+        if self.rep.t == 'c' or other.rep.t == 'z':
+            return PCPosit('cinf', nbits=self.rep.nbits, es=self.rep.es)
+        elif self.rep.t == 'z' or other.rep.t == 'c':
+            return PCPosit('0', nbits=self.rep.nbits, es=self.rep.es)
 
-        assert self.rep['t'] == 'n' and other.rep['t'] == 'n'
+        assert self.rep.t == 'n' and other.rep.t == 'n'
 
         (xa,ma) = self._fixedpoint()
         (xb,mb) = other._fixedpoint()
 
-        nbits = self.rep['nbits']
-        es = self.rep['es']
+        nbits = self.rep.nbits
+        es = self.rep.es
         sign = 1
         if (xa < 0)^(xb < 0): sign = -1
         if xa < 0: xa = -xa
         if xb < 0: xb = -xb
 
-        g = ma - mb + (2**es)*(nbits-2) + nbits - 1
-        g = max(0, g)
-        xc = (xa * 2**g) // xb
-        mc = ma - mb - g
+        (xc,mc) = coder.fixedpoint_quotient(xa, xb, nbits)
+
+        return self._fixedpoint_to_posit(sign*xc, ma - mb + mc, nbits=nbits, es=es)
+
 
-        xc = max(xc, 1)     # Posit never round to 0.
-        xc *= sign
+    # Return the square root rounded once, cinf for negative numbers.
+    def sqrt(self):
+        nbits = self.rep.nbits
+        es = self.rep.es
+
+        if self.rep.t == 'c' or (self.rep.t == 'n' and self.rep.s == 1):
+            return PCPosit('cinf', nbits=nbits, es=es)
+        elif self.rep.t == 'z':
+            return PCPosit('0', nbits=nbits, es=es)
+
+        (xa,ma) = self._fixedpoint()
+        (xc,mc) = coder.fixedpoint_sqrt(xa, ma, nbits)
 
         return self._fixedpoint_to_posit(xc, mc, nbits=nbits, es=es)
 
 
+    # Return self*b + c rounded once.
+    def fma(self, b, c):
+        return self._fused(b, c, 1)
+
+
+    # Return self*b - c rounded once.
+    def fms(self, b, c):
+        return self._fused(b, c, -1)
+
+
+    # b and c are PCPosit of this configuration or scalars rounded to it, as for
+    # the binary operators.
+    def _fused(self, b, c, csign):
+        ((_, b, c), nbits, es) = PCPosit._coerce_sequence([self, b, c], None, None)
+
+        if self.rep.t == 'c' or b.rep.t == 'c' or c.rep.t == 'c':
+            return PCPosit('cinf', nbits=nbits, es=es)
+
+        (xa,ma) = self._fixedpoint()
+        (xb,mb) = b._fixedpoint()
+        (xc,mc) = c._fixedpoint()
+
+        return self._fixedpoint_sum_to_posit([(xa*xb, ma+mb), (csign*xc, mc)], nbits=nbits, es=es)
+
+
+    # Return the dot product of xs and ys rounded once.
+    @classmethod
+    def fdp(cls, xs, ys, nbits=None, es=None):
+        xs = list(xs)
+        ys = list(ys)
+        if len(xs) != len(ys):
+            raise ValueError('Expect sequences of equal length.')
+        (ps, nbits, es) = cls._coerce_sequence(xs + ys, nbits, es)
+        (xs, ys) = (ps[:len(xs)], ps[len(xs):])
+
+        terms = []
+        for (a, b) in zip(xs, ys):
+            if a.rep.t == 'c' or b.rep.t == 'c':
+                return PCPosit('cinf', nbits=nbits, es=es)
+            terms.append((a.rep.x * b.rep.x, a.rep.m + b.rep.m))
+
+        return cls._fixedpoint_sum_to_posit(terms, nbits=nbits, es=es)
+
+
+    # Return the sum of xs rounded once.
+    @classmethod
+    def fsum(cls, xs, nbits=None, es=None):
+        (xs, nbits, es) = cls._coerce_sequence(list(xs), nbits, es)
+
+        terms = []
+        for a in xs:
+            if a.rep.t == 'c':
+                return PCPosit('cinf', nbits=nbits, es=es)
+            terms.append((a.rep.x, a.rep.m))
+
+        return cls._fixedpoint_sum_to_posit(terms, nbits=nbits, es=es)
+
+
+    # Return (ps, nbits, es) with scalars in ps rounded to the configuration,
+    # by default that of the first PCPosit in ps.
+    @classmethod
+    def _coerce_sequence(cls, ps, nbits, es):
+        first = next((p for p in ps if isinstance(p, PCPosit)), None)
+        if first is not None:
+            if nbits is None:
+                nbits = first.rep.nbits
+            if es is None:
+                es = first.rep.es
+        if nbits is None:
+            nbits = 32
+        if es is None:
+            es = 2
+
+        out = []
+        for p in ps:
+            if isinstance(p, SCALAR_TYPES):
+                p = PCPosit(p, nbits=nbits, es=es)
+            elif not isinstance(p, PCPosit):
+                raise TypeError('Expect PCPosit or scalar operands, got {}.'.format(type(p).__name__))
+            elif p.rep.nbits != nbits or p.rep.es != es:
+                raise NotImplementedError('Mismatched posit configuration fused operation is not implemented.')
+            out.append(p)
+
+        return (out, nbits, es)
+
+
+    def __rtruediv__(self, other):
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return NotImplemented
+
+        return other / self
+
+
     def __floordiv__(self, other):
         raise NotImplementedError
 
 
     def __eq__(self, other):
+        if not isinstance(other, PCPosit):
+            return self._cmp_op(other, operator.eq)
+
         a = self.rep
         b = other.rep
 
-        if a['t'] == 'c' or b['t'] == 'c':
+        if a.t == 'c' or b.t == 'c':
             return False
 
-        elif a['t'] == 'z' or b['t'] == 'z':
-            if a['t'] == b['t']:
+        elif a.t == 'z' or b.t == 'z':
+            if a.t == b.t:
                 return True
             else:
                 return False
 
         else:
-            assert a['t'] == 'n'
-            assert b['t'] == 'n'
+            assert a.t == 'n'
+            assert b.t == 'n'
 
-            return a == b
+            return a.x == b.x and a.m == b.m and a.nbits == b.nbits and a.es == b.es
+
+
+    # Consistent with __eq__, including against int, float and Fraction of equal value.
+    def __hash__(self):
+        rep = self.rep
+        if rep.t == 'c':
+            return hash(('cinf', rep.nbits, rep.es))
+        return coder.fixedpoint_hash(rep.x, rep.m)
 
 
     def __ne__(self, other):
-        return not(self == other)
+        eq = self.__eq__(other)
+        if eq is NotImplemented:
+            return NotImplemented
+        return not eq
 
 
     def __lt__(self, other):
@@ -201,13 +523,37 @@ class PCPosit:
         return coder.positrep_to_str(self.rep)
 
 
+    def __float__(self):
+        if self.rep.t == 'c':
+            return float('nan')
+        return coder.fixedpoint_to_float(self.rep.x, self.rep.m)
+
+
+    def __int__(self):
+        if self.rep.t == 'c':
+            raise ValueError('Cannot convert cinf posit to integer.')
+        return coder.fixedpoint_to_int(self.rep.x, self.rep.m)
+
+
+    def to_fraction(self):
+        if self.rep.t == 'c':
+            raise ValueError('Cannot convert cinf posit to fraction.')
+        return coder.fixedpoint_to_fraction(self.rep.x, self.rep.m)
+
+
     def _cmp_op(self, other, op):
+        if not isinstance(other, PCPosit):
+            return self._cmp_scalar(other, op)
+
         a = self.rep
         b = other.rep
 
-        if a['t'] == 'c' or b['t'] == 'c':
+        if a.t == 'c' or b.t == 'c':
             return False
 
+        if a.nbits == b.nbits and a.es == b.es:
+            return op(self.order_key(), other.order_key())
+
         (xa,ma) = self._fixedpoint()
         (xb,mb) = other._fixedpoint()
 
@@ -218,61 +564,115 @@ class PCPosit:
         return op(xa, xb)
 
 
-    # Return (x,m) representing number = x * 2^m
-    def _fixedpoint(self):
-        rep = self.rep
+    # Return the bit pattern as a signed integer. It orders posits of one
+    # configuration by value, with cinf first, e.g. sorted(ps, key=PCPosit.order_key).
+    def order_key(self):
+        sbits = self._sbits
+        if sbits is None:
+            rep = self.rep
+            sbits = _signed_bits(coder.encode_posit_binary(rep), rep.nbits)
+            self._sbits = sbits
+        return sbits
+
+
+    # Compare exactly against an int, float, Fraction or Decimal scalar.
+    def _cmp_scalar(self, other, op):
+        if not isinstance(other, SCALAR_TYPES):
+            return NotImplemented
+
+        if self.rep.t == 'c':
+            return False
+
+        return compare_fixedpoint_scalar(self._fixedpoint(), other, op)
+
+
+    # Return other as a PCPosit of this configuration, or NotImplemented.
+    def _coerce(self, other):
+        if isinstance(other, PCPosit):
+            return other
+        elif not isinstance(other, SCALAR_TYPES):
+            return NotImplemented
+
+        p = PCPosit(nbits=self.rep.nbits, es=self.rep.es)
+        p.rep = PCPosit._scalar_to_rep(other, self.rep.nbits, self.rep.es)
+        return p
 
-        assert rep['t'] != 'c'
 
-        if rep['t'] == 'z':
-            x = 0
-            m = 0
+    # Return the correctly rounded positrep of a scalar, caching int and float constants.
+    @classmethod
+    def _scalar_to_rep(cls, v, nbits, es):
+        cached = type(v) is int or type(v) is float
+        if cached:
+            key = (v, nbits, es)
+            rep = _constant_cache.get(key)
+            if rep is not None:
+                return rep
+
+        fp = scalar_to_fixedpoint(v, nbits)
+        if fp is None:
+            rep = coder.create_cinf_positrep(nbits=nbits, es=es)
         else:
-            assert rep['t'] == 'n'
+            rep = cls._fixedpoint_to_posit(fp[0], fp[1], nbits=nbits, es=es).rep
 
-            x = (-1)**rep['s'] * (2**rep['h'] + rep['f'])
-            m = 2**rep['es'] * rep['k'] + rep['e'] - rep['h']
+        if cached and fp is not None:
+            if len(_constant_cache) >= _CONSTANT_CACHE_SIZE:
+                _constant_cache.clear()
+            _constant_cache[key] = rep
 
-        return (x,m)
+        return rep
 
 
     @classmethod
-    def _fixedpoint_to_posit(cls, x, m, nbits=None, es=None):
-        assert nbits is not None
-        assert es is not None
+    def _intern(cls, bits, nbits, es):
+        pool = _intern_pools.get((nbits, es))
+        if pool is None:
+            pool = _intern_pools[(nbits, es)] = {}
+
+        p = pool.get(bits)
+        if p is None:
+            p = object.__new__(cls)
+            p.rep = coder.decode_posit_binary(bits, nbits=nbits, es=es)
+            p._sbits = _signed_bits(bits, nbits)
+            p._interned = True
+            if len(pool) >= INTERN_POOL_SIZE:
+                pool.clear()
+            pool[bits] = p
 
-        if x == 0:
-            return PCPosit('0', nbits=nbits, es=es)
+        return p
 
-        p = PCPosit(nbits=nbits, es=es)
-        p.rep['t'] = 'n'
-        p.rep['s'] = 0
 
-        if x < 0:
-            x = -x
-            p.rep['s'] = 1
+    # Return (x,m) representing number = x * 2^m
+    def _fixedpoint(self):
+        rep = self.rep
+
+        assert rep.t != 'c'
+
+        return (rep.x, rep.m)
 
-        assert x != 0
 
-        while x != 0 and x % 2 == 0:
-            x >>= 1
-            m += 1
+    # Round the exact sum of the (x,m) terms once.
+    @classmethod
+    def _fixedpoint_sum_to_posit(cls, terms, nbits=None, es=None):
+        terms = [ (x,m) for (x,m) in terms if x != 0 ]
+        if len(terms) == 0:
+            return cls('0', nbits=nbits, es=es)
+
+        m = min(mi for (xi,mi) in terms)
+        x = sum(xi << (mi - m) for (xi,mi) in terms)
 
-        g = 0
-        y = x
-        while y >= 2:
-            y >>= 1
-            g -= 1
+        return cls._fixedpoint_to_posit(x, m, nbits=nbits, es=es)
 
-        assert y >= 1 and y < 2, "y={}".format(y)
 
-        p.rep['e'] = (m - g) % 2**es
-        p.rep['k'] = (m - g) // 2**es
+    @classmethod
+    def _fixedpoint_to_posit(cls, x, m, nbits=None, es=None):
+        assert nbits is not None
+        assert es is not None
 
-        p.rep['h'] = -g
-        p.rep['f'] = x - 2**p.rep['h']
+        bits = coder.fixedpoint_to_posit_binary(x, m, nbits, es)
 
-        bits = coder.encode_posit_binary(p.rep)
-        p.rep = coder.decode_posit_binary(bits, nbits=nbits, es=es)
+        # The rep is decoded on first read.
+        p = object.__new__(cls)
+        p._sbits = _signed_bits(bits, nbits)
+        p._config = (nbits, es)
 
         return p
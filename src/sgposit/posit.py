@@ -0,0 +1,398 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import numbers
+import operator
+
+from sgposit         import coder
+from sgposit.pcposit import SCALAR_TYPES, compare_fixedpoint_scalar
+
+
+# bits: normal posit bit pattern, neither 0 nor cinf.
+# return (x,m) representing number = x * 2^m
+def decode_fixedpoint(bits, nbits, es):
+    n = nbits - 1
+    s = bits >> n
+    if s == 1: bits = (-bits) & ((1 << nbits) - 1)
+
+    if bits >> (n-1):
+        nleads = n - (~bits & ((1 << n) - 1)).bit_length()
+        k = nleads - 1
+    else:
+        nleads = n - bits.bit_length()
+        k = -nleads
+
+    nrem = max(0, n - nleads - 1)     # Remaining bits after the regime terminating bit.
+    if nrem >= es:
+        h = nrem - es
+        x = (1 << h) | (bits & ((1 << h) - 1))
+        e = (bits >> h) & ((1 << es) - 1)
+    else:
+        h = 0
+        x = 1
+        e = (bits & ((1 << nrem) - 1)) << (es - nrem)
+
+    m = (k << es) + e - h
+
+    return (-x if s == 1 else x, m)
+
+
+"""
+Performance optimized posit number arithmetic.
+A posit is kept as its bit pattern, and computed with integer bit manipulation.
+"""
+class Posit(object):
+
+    __slots__ = ('bits', 'nbits', 'es')
+
+
+    def __init__(self, v=None, mode=None, nbits=None, es=None):
+        nbits_given = True
+        es_given = True
+        if nbits is None:
+            nbits_given = False
+            nbits = 32
+        if es is None:
+            es_given = False
+            es = 2
+
+        if nbits < 2 or es < 0:
+            raise ValueError('Expect nbits >= 2 and es >= 0.')
+
+        self.nbits = nbits
+        self.es = es
+
+        if v is None:
+            self.bits = 0
+            return
+        elif isinstance(v, Posit):
+            if not nbits_given:
+                self.nbits = v.nbits
+            if not es_given:
+                self.es = v.es
+            self.bits = convert_posit_binary(v.bits, v.nbits, v.es, self.nbits, self.es)
+            return
+        elif mode == 'bits':
+            if isinstance(v, numbers.Integral):
+                if v < 0 or v >> nbits:
+                    raise ValueError('Bit pattern does not fit in {} bits.'.format(nbits))
+                self.bits = int(v)
+                return
+            elif isinstance(v, str):
+                raise NotImplementedError('Binary bit string posit conversion is not implemented.')
+        elif isinstance(v, str):
+            if v == 'cinf':
+                self.bits = 1 << (nbits-1)
+            elif v == '0':
+                self.bits = 0
+            else:
+                raise ValueError('Expect 0 or cinf posit consntant from the input string.')
+
+            return
+
+        raise ValueError('Input is not supported.')
+
+
+    @classmethod
+    def _from_bits(cls, bits, nbits, es):
+        p = object.__new__(cls)
+        p.bits = bits
+        p.nbits = nbits
+        p.es = es
+        return p
+
+
+    def _check_config(self, other):
+        if self.nbits != other.nbits or self.es != other.es:
+            raise NotImplementedError('Mismatched posit configuration arithmetic is not implemented.')
+
+
+    def __add__(self, other):
+        self._check_config(other)
+        return Posit._from_bits(add_posit_binary(self.bits, other.bits, self.nbits, self.es), self.nbits, self.es)
+
+
+    def __sub__(self, other):
+        self._check_config(other)
+        return Posit._from_bits(sub_posit_binary(self.bits, other.bits, self.nbits, self.es), self.nbits, self.es)
+
+
+    def __neg__(self):
+        return Posit._from_bits(neg_posit_binary(self.bits, self.nbits), self.nbits, self.es)
+
+
+    def __mul__(self, other):
+        self._check_config(other)
+        return Posit._from_bits(mul_posit_binary(self.bits, other.bits, self.nbits, self.es), self.nbits, self.es)
+
+
+    def __div__(self, other):
+        return self.__truediv__(other)
+
+
+    def __truediv__(self, other):
+        self._check_config(other)
+        return Posit._from_bits(div_posit_binary(self.bits, other.bits, self.nbits, self.es), self.nbits, self.es)
+
+
+    def sqrt(self):
+        return Posit._from_bits(sqrt_posit_binary(self.bits, self.nbits, self.es), self.nbits, self.es)
+
+
+    def __floordiv__(self, other):
+        raise NotImplementedError
+
+
+    def __eq__(self, other):
+        if not isinstance(other, Posit):
+            return self._cmp_scalar(other, operator.eq)
+        if self.bits == 1 << (self.nbits-1):
+            return False
+        return self.bits == other.bits and self.nbits == other.nbits and self.es == other.es
+
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        if eq is NotImplemented:
+            return NotImplemented
+        return not eq
+
+
+    def __lt__(self, other):
+        return self._cmp_op(other, operator.lt)
+
+
+    def __le__(self, other):
+        return self._cmp_op(other, operator.le)
+
+
+    def __gt__(self, other):
+        return self._cmp_op(other, operator.gt)
+
+
+    def __ge__(self, other):
+        return self._cmp_op(other, operator.ge)
+
+
+    def __str__(self):
+        return coder.positrep_to_str(coder.decode_posit_binary(self.bits, self.nbits, self.es))
+
+
+    def __hash__(self):
+        if self.bits == 1 << (self.nbits-1):
+            return hash(('cinf', self.nbits, self.es))
+        return coder.fixedpoint_hash(*self._fixedpoint())
+
+
+    def __float__(self):
+        if self.bits == 1 << (self.nbits-1):
+            return float('nan')
+        return coder.fixedpoint_to_float(*self._fixedpoint())
+
+
+    def __int__(self):
+        if self.bits == 1 << (self.nbits-1):
+            raise ValueError('Cannot convert cinf posit to integer.')
+        return coder.fixedpoint_to_int(*self._fixedpoint())
+
+
+    def to_fraction(self):
+        if self.bits == 1 << (self.nbits-1):
+            raise ValueError('Cannot convert cinf posit to fraction.')
+        return coder.fixedpoint_to_fraction(*self._fixedpoint())
+
+
+    # Return the bit pattern as a signed integer. It orders posits of one
+    # configuration by value, with cinf first, e.g. sorted(ps, key=Posit.order_key).
+    def order_key(self):
+        if self.bits >> (self.nbits-1):
+            return self.bits - (1 << self.nbits)
+        return self.bits
+
+
+    # Posit bit patterns order as 2's complement integers, cinf aside.
+    def _cmp_op(self, other, op):
+        if not isinstance(other, Posit):
+            return self._cmp_scalar(other, op)
+        self._check_config(other)
+
+        n = self.nbits - 1
+        cinf_bits = 1 << n
+        a = self.bits
+        b = other.bits
+
+        if a == cinf_bits or b == cinf_bits:
+            return False
+
+        if a >> n: a -= cinf_bits << 1
+        if b >> n: b -= cinf_bits << 1
+
+        return op(a, b)
+
+
+    # Compare by value against an int, float, Fraction or Decimal scalar, as PCPosit.
+    def _cmp_scalar(self, other, op):
+        if not isinstance(other, SCALAR_TYPES):
+            return NotImplemented
+        if self.bits == 1 << (self.nbits-1):
+            return False
+        return compare_fixedpoint_scalar(self._fixedpoint(), other, op)
+
+
+    # Return (x,m) representing number = x * 2^m
+    def _fixedpoint(self):
+        assert self.bits != 1 << (self.nbits-1)
+
+        if self.bits == 0:
+            return (0, 0)
+
+        return decode_fixedpoint(self.bits, self.nbits, self.es)
+
+
+def neg_posit_binary(bits, nbits):
+    return (-bits) & ((1 << nbits) - 1)
+
+
+def add_posit_binary(abits, bbits, nbits, es):
+    cinf_bits = 1 << (nbits-1)
+
+    if abits == cinf_bits or bbits == cinf_bits:
+        return cinf_bits
+    elif abits == 0:
+        return bbits
+    elif bbits == 0:
+        return abits
+
+    (xa,ma) = decode_fixedpoint(abits, nbits, es)
+    (xb,mb) = decode_fixedpoint(bbits, nbits, es)
+
+    ta = ma + abs(xa).bit_length()
+    tb = mb + abs(xb).bit_length()
+
+    # Far apart operands: the smaller one only decides the rounding direction,
+    # replaced by a sticky unit below the rounding position of the larger one.
+    if ta - tb >= nbits + 2:
+        m = ta - nbits - 2
+        xc = (xa << (ma - m)) + (1 if xb > 0 else -1)
+        mc = m
+    elif tb - ta >= nbits + 2:
+        m = tb - nbits - 2
+        xc = (xb << (mb - m)) + (1 if xa > 0 else -1)
+        mc = m
+    elif ma >= mb:
+        xc = (xa << (ma - mb)) + xb
+        mc = mb
+    else:
+        xc = xa + (xb << (mb - ma))
+        mc = ma
+
+    if xc == 0:
+        return 0
+
+    return coder.fixedpoint_to_posit_binary(xc, mc, nbits, es)
+
+
+def sub_posit_binary(abits, bbits, nbits, es):
+    return add_posit_binary(abits, (-bbits) & ((1 << nbits) - 1), nbits, es)
+
+
+def mul_posit_binary(abits, bbits, nbits, es):
+    cinf_bits = 1 << (nbits-1)
+
+    if abits == cinf_bits or bbits == cinf_bits:
+        return cinf_bits
+    elif abits == 0 or bbits == 0:
+        return 0
+
+    (xa,ma) = decode_fixedpoint(abits, nbits, es)
+    (xb,mb) = decode_fixedpoint(bbits, nbits, es)
+
+    return coder.fixedpoint_to_posit_binary(xa*xb, ma+mb, nbits, es)
+
+
+def div_posit_binary(abits, bbits, nbits, es):
+    cinf_bits = 1 << (nbits-1)
+
+    if abits == cinf_bits or bbits == 0:
+        return cinf_bits
+    elif abits == 0 or bbits == cinf_bits:
+        return 0
+
+    (xa,ma) = decode_fixedpoint(abits, nbits, es)
+    (xb,mb) = decode_fixedpoint(bbits, nbits, es)
+
+    sign = 1
+    if (xa < 0)^(xb < 0): sign = -1
+    if xa < 0: xa = -xa
+    if xb < 0: xb = -xb
+
+    (xc,mc) = coder.fixedpoint_quotient(xa, xb, nbits)
+
+    return coder.fixedpoint_to_posit_binary(sign*xc, ma - mb + mc, nbits, es)
+
+
+def sqrt_posit_binary(bits, nbits, es):
+    cinf_bits = 1 << (nbits-1)
+
+    if bits == 0:
+        return 0
+    elif bits & cinf_bits:
+        return cinf_bits        # cinf and negative numbers.
+
+    (x,m) = decode_fixedpoint(bits, nbits, es)
+    (xc,mc) = coder.fixedpoint_sqrt(x, m, nbits)
+
+    return coder.fixedpoint_to_posit_binary(xc, mc, nbits, es)
+
+
+# Convert a posit<nbits,es> bit pattern to the nearest posit<to_nbits,to_es>.
+def convert_posit_binary(bits, nbits, es, to_nbits, to_es):
+    if nbits == to_nbits and es == to_es:
+        return bits
+
+    cinf_bits = 1 << (nbits-1)
+    if bits == 0:
+        return 0
+    elif bits == cinf_bits:
+        return 1 << (to_nbits-1)
+
+    if es == to_es:
+        # Same es, widening appends zero bits, narrowing rounds the bit string.
+        d = nbits - to_nbits
+        if d < 0:
+            return bits << -d
+
+        s = bits >> (nbits-1)
+        v = (-bits) & ((1 << nbits) - 1) if s else bits
+        w = v >> d
+        truncation = v & ((1 << d) - 1)
+        tie = 1 << (d-1)
+        if truncation > tie or (truncation == tie and w & 1):
+            w += 1
+        w = min(max(w, 1), (1 << (to_nbits-1)) - 1)    # Never round to 0 or cinf.
+
+        return (-w) & ((1 << to_nbits) - 1) if s else w
+
+    (x, m) = decode_fixedpoint(bits, nbits, es)
+    return coder.fixedpoint_to_posit_binary(x, m, to_nbits, to_es)
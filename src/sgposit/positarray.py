@@ -0,0 +1,831 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import numbers
+
+import numpy as np
+
+from sgposit         import coder
+from sgposit         import posit
+from sgposit         import npcoder
+from sgposit         import npquire
+from sgposit.npcoder import dtype_for_nbits
+from sgposit.optable import MAX_TABLE_NBITS, get_op_table
+from sgposit.pcposit import PCPosit, SCALAR_TYPES
+
+
+_SCALAR_OPS = {
+    'add': posit.add_posit_binary,
+    'sub': posit.sub_posit_binary,
+    'mul': posit.mul_posit_binary,
+    'div': posit.div_posit_binary,
+}
+
+_UFUNC_OPS = {
+    np.add: 'add',
+    np.subtract: 'sub',
+    np.multiply: 'mul',
+    np.divide: 'div',
+    np.true_divide: 'div',
+}
+
+_UFUNC_CMPS = {
+    np.equal: np.equal,
+    np.less: np.less,
+    np.less_equal: np.less_equal,
+    np.greater: np.greater,
+    np.greater_equal: np.greater_equal,
+}
+
+_UFUNC_FUNCTIONS = {
+    np.exp: 'exp',
+    np.exp2: 'exp2',
+    np.log: 'log',
+    np.log2: 'log2',
+    np.sin: 'sin',
+    np.cos: 'cos',
+    np.tanh: 'tanh',
+}
+
+
+def _posit_to_bits(p):
+    if isinstance(p, posit.Posit):
+        return p.bits
+    return coder.encode_posit_binary(p.rep)
+
+
+def _posit_config(p):
+    return (p.nbits, p.es)
+
+
+# Python and NumPy real scalars, which round to the nearest posit.
+def _is_scalar(v):
+    return isinstance(v, SCALAR_TYPES + (np.integer, np.floating))
+
+
+# Operands an arithmetic or comparison operator accepts; the operators
+# return NotImplemented for others.
+def _is_operand(v):
+    return isinstance(v, (PositArray, PCPosit, posit.Posit)) or _is_scalar(v)
+
+
+"""
+Array of posits of one configuration, stored as raw bit patterns in an
+unsigned integer ndarray.
+"""
+class PositArray(object):
+
+    def __init__(self, bits=None, nbits=None, es=None, copy=True):
+        if nbits is None:
+            nbits = 32
+        if es is None:
+            es = 2
+        if es < 0:
+            raise ValueError('Expect es >= 0.')
+
+        dtype = dtype_for_nbits(nbits)
+
+        if bits is None:
+            bits = np.zeros(0, dtype=dtype)
+        elif not (isinstance(bits, np.ndarray) and bits.dtype == dtype):
+            if not isinstance(bits, np.ndarray):
+                values = bits
+                bits = np.asarray(values)
+                if bits.dtype.kind == 'f':      # Mixed Python ints beyond the int64 range.
+                    bits = np.array(values, dtype=object)
+            if bits.dtype.kind not in 'uiO' and bits.size > 0:
+                raise ValueError('Expect integer bit patterns.')
+            if bits.dtype.kind == 'O' and not all(isinstance(v, numbers.Integral) for v in bits.flat):
+                raise ValueError('Expect integer bit patterns.')
+            if bits.size > 0 and (np.any(bits < 0) or np.any(bits > (1 << nbits) - 1)):
+                raise ValueError('Bit pattern does not fit in {} bits.'.format(nbits))
+            bits = bits.astype(dtype)
+            copy = False
+        elif nbits < 8*dtype.itemsize and bits.size > 0 and bits.max() >> nbits:
+            raise ValueError('Bit pattern does not fit in {} bits.'.format(nbits))
+
+        self.bits = bits.copy() if copy else bits
+        self.nbits = nbits
+        self.es = es
+
+
+    @classmethod
+    def _wrap(cls, bits, nbits, es):
+        a = object.__new__(cls)
+        a.bits = bits
+        a.nbits = nbits
+        a.es = es
+        return a
+
+
+    @classmethod
+    def zeros(cls, shape, nbits=None, es=None):
+        if nbits is None:
+            nbits = 32
+        if es is None:
+            es = 2
+        return cls._wrap(np.zeros(shape, dtype=dtype_for_nbits(nbits)), nbits, es)
+
+
+    # posits: (nested) list of PCPosit or Posit of the same configuration.
+    @classmethod
+    def from_posits(cls, posits, nbits=None, es=None):
+        flat = []
+        def flatten(v):
+            if isinstance(v, (PCPosit, posit.Posit)):
+                flat.append(v)
+                return ()
+            shapes = [ flatten(u) for u in v ]
+            if any(shape != shapes[0] for shape in shapes):
+                raise ValueError('Expect a regular nested list of posits.')
+            return (len(shapes),) + (shapes[0] if shapes else ())
+        shape = flatten(posits)
+
+        if flat:
+            (nbits0, es0) = _posit_config(flat[0])
+            if nbits is None: nbits = nbits0
+            if es is None: es = es0
+        a = cls.zeros(shape, nbits=nbits, es=es)
+
+        for i, p in enumerate(flat):
+            if _posit_config(p) != (a.nbits, a.es):
+                raise NotImplementedError('Mismatched posit configuration conversion is not implemented.')
+            a.bits.flat[i] = _posit_to_bits(p)
+
+        return a
+
+
+    # Return a nested list of PCPosit.
+    def tolist(self):
+        nbits = self.nbits
+        es = self.es
+        def convert(v):
+            if isinstance(v, list):
+                return [ convert(u) for u in v ]
+            return PCPosit(v, mode='bits', nbits=nbits, es=es)
+        return convert(self.bits.tolist())
+
+
+    # Return the posits rounded to posit<nbits,es> as a new PositArray.
+    def convert(self, nbits, es):
+        return PositArray._wrap(npcoder.convert_posit_array(self.bits, self.nbits, self.es, nbits, es), nbits, es)
+
+
+    # Return a float64 ndarray of the posit values, cinf as nan.
+    def to_float64(self):
+        return npcoder.to_float64(self.bits, self.nbits, self.es)
+
+
+    @property
+    def shape(self):
+        return self.bits.shape
+
+
+    @property
+    def ndim(self):
+        return self.bits.ndim
+
+
+    @property
+    def size(self):
+        return self.bits.size
+
+
+    def __len__(self):
+        return len(self.bits)
+
+
+    def copy(self):
+        return PositArray._wrap(self.bits.copy(), self.nbits, self.es)
+
+
+    def reshape(self, *shape):
+        return PositArray._wrap(self.bits.reshape(*shape), self.nbits, self.es)
+
+
+    def __getitem__(self, index):
+        bits = self.bits[index]
+        if isinstance(bits, np.ndarray):
+            return PositArray._wrap(bits, self.nbits, self.es)
+        return PCPosit(int(bits), mode='bits', nbits=self.nbits, es=self.es)
+
+
+    def __setitem__(self, index, value):
+        self.bits[index] = self._operand_bits(value)
+
+
+    def _check_config(self, nbits, es):
+        if self.nbits != nbits or self.es != es:
+            raise NotImplementedError('Mismatched posit configuration arithmetic is not implemented.')
+
+
+    # Return the bit patterns of a PositArray, PCPosit or Posit operand, or of
+    # a scalar rounded to this configuration.
+    def _operand_bits(self, other):
+        if isinstance(other, PositArray):
+            self._check_config(other.nbits, other.es)
+            return other.bits
+        elif isinstance(other, (PCPosit, posit.Posit)):
+            self._check_config(*_posit_config(other))
+            return self.bits.dtype.type(_posit_to_bits(other))
+        elif _is_scalar(other):
+            if isinstance(other, np.generic):
+                other = other.item()
+            p = PCPosit(other, nbits=self.nbits, es=self.es)
+            return self.bits.dtype.type(_posit_to_bits(p))
+
+        raise TypeError('Expect PositArray, PCPosit, Posit or scalar operand.')
+
+
+    def _output(self, shape, out):
+        if out is None:
+            return PositArray.zeros(shape, nbits=self.nbits, es=self.es)
+
+        self._check_config(out.nbits, out.es)
+        if out.shape != shape:
+            raise ValueError('Output shape {} does not match result shape {}.'.format(out.shape, shape))
+
+        return out
+
+
+    def _binary_op(self, op, other, out):
+        nbits = self.nbits
+        es = self.es
+        abits = self.bits
+        bbits = self._operand_bits(other)
+        out = self._output(np.broadcast(abits, bbits).shape, out)
+
+        if nbits <= MAX_TABLE_NBITS:
+            table = get_op_table(nbits, es).table(op).ravel()
+            index = (abits.astype(np.intp) << nbits) | bbits
+            np.take(table, index, out=out.bits)
+        elif nbits <= npcoder.ARITH_MAX_NBITS:
+            out.bits[...] = npcoder.arith_posit_array(op, abits, bbits, nbits, es)
+        else:
+            f = _SCALAR_OPS[op]
+            kernel = np.frompyfunc(lambda a, b: f(a, b, nbits, es), 2, 1)
+            out.bits[...] = kernel(abits, bbits)
+
+        return out
+
+
+    def add(self, other, out=None):
+        return self._binary_op('add', other, out)
+
+
+    def sub(self, other, out=None):
+        return self._binary_op('sub', other, out)
+
+
+    def mul(self, other, out=None):
+        return self._binary_op('mul', other, out)
+
+
+    def div(self, other, out=None):
+        return self._binary_op('div', other, out)
+
+
+    def sqrt(self, out=None):
+        nbits = self.nbits
+        es = self.es
+        out = self._output(self.shape, out)
+
+        if npcoder.sqrt_array_supported(nbits, es):
+            out.bits[...] = npcoder.sqrt_posit_array(self.bits, nbits, es)
+        else:
+            kernel = np.frompyfunc(lambda a: posit.sqrt_posit_binary(a, nbits, es), 1, 1)
+            out.bits[...] = kernel(self.bits)
+
+        return out
+
+
+    def neg(self, out=None):
+        out = self._output(self.shape, out)
+        np.negative(self.bits, out=out.bits)
+        if self.nbits < 8*self.bits.dtype.itemsize:
+            out.bits &= self.bits.dtype.type((1 << self.nbits) - 1)
+        return out
+
+
+    # Matrix product with one rounding per element, as np.matmul for 1-D and
+    # 2-D operands. Products accumulate exactly in a quire per element.
+    def matmul(self, other, out=None):
+        if not isinstance(other, PositArray):
+            raise TypeError('Expect PositArray operand.')
+        self._check_config(other.nbits, other.es)
+        if self.ndim not in (1, 2) or other.ndim not in (1, 2):
+            raise NotImplementedError('Matrix products of {}-D and {}-D arrays are not implemented.'.format(self.ndim, other.ndim))
+
+        abits = self.bits.reshape(1, -1) if self.ndim == 1 else self.bits
+        bbits = other.bits.reshape(-1, 1) if other.ndim == 1 else other.bits
+        bits = npquire.matmul_posit_array(abits, bbits, self.nbits, self.es)
+        shape = self.shape[:-1] + other.shape[1:]
+        if shape == ():
+            return PCPosit(int(bits[0, 0]), mode='bits', nbits=self.nbits, es=self.es)
+
+        out = self._output(shape, out)
+        out.bits[...] = bits.reshape(shape)
+        return out
+
+
+    def dot(self, other, out=None):
+        return self.matmul(other, out)
+
+
+    # Matrix-vector product y + self @ x of a 2-D array, accumulated exactly
+    # in a quire per element with y, and rounded once.
+    def gemv(self, x, y=None, out=None):
+        if not isinstance(x, PositArray) or not (y is None or isinstance(y, PositArray)):
+            raise TypeError('Expect PositArray operand.')
+        self._check_config(x.nbits, x.es)
+        if self.ndim != 2 or x.ndim != 1:
+            raise ValueError('Expect a 2-D matrix and a 1-D vector.')
+
+        cbits = None
+        if y is not None:
+            self._check_config(y.nbits, y.es)
+            if y.shape != self.shape[:1]:
+                raise ValueError('Vector shape {} does not match result shape {}.'.format(y.shape, self.shape[:1]))
+            cbits = y.bits.reshape(-1, 1)
+
+        bits = npquire.matmul_posit_array(self.bits, x.bits.reshape(-1, 1), self.nbits, self.es, cbits)
+        out = self._output(self.shape[:1], out)
+        out.bits[...] = bits.reshape(-1)
+        return out
+
+
+    def __matmul__(self, other):
+        if not isinstance(other, PositArray):
+            return NotImplemented
+        return self.matmul(other)
+
+
+    def __add__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self.add(other)
+
+
+    def __radd__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self._rop(other).add(self)
+
+
+    def __sub__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self.sub(other)
+
+
+    def __rsub__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self._rop(other).sub(self)
+
+
+    def __mul__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self.mul(other)
+
+
+    def __rmul__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self._rop(other).mul(self)
+
+
+    def __div__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self.div(other)
+
+
+    def __truediv__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self.div(other)
+
+
+    def __rtruediv__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self._rop(other).div(self)
+
+
+    __rdiv__ = __rtruediv__
+
+
+    def __neg__(self):
+        return self.neg()
+
+
+    def _rop(self, other):
+        bits = np.asarray(self._operand_bits(other))
+        return PositArray._wrap(bits, self.nbits, self.es)
+
+
+    # Posit bit patterns order as 2's complement integers, cinf aside.
+    def _signed_bits(self, bits):
+        dtype = self.bits.dtype
+        shift = dtype.type(8*dtype.itemsize - self.nbits)
+        return np.left_shift(bits, shift, dtype=dtype).view(np.dtype('i{}'.format(dtype.itemsize)))
+
+
+    def _from_signed_bits(self, keys):
+        dtype = self.bits.dtype
+        shift = dtype.type(8*dtype.itemsize - self.nbits)
+        return np.right_shift(np.asarray(keys).view(dtype), shift)
+
+
+    # Sort in place by value, cinf first, as ndarray.sort.
+    def sort(self, axis=-1):
+        keys = self._signed_bits(self.bits)
+        keys.sort(axis=axis)
+        self.bits[...] = self._from_signed_bits(keys)
+
+
+    # Return the indices that sort the posits by value, cinf first, as np.argsort.
+    def argsort(self, axis=-1, kind=None):
+        return np.argsort(self._signed_bits(self.bits), axis=axis, kind=kind)
+
+
+    # Return where to insert v into this sorted 1-D array, as np.searchsorted.
+    def searchsorted(self, v, side='left', sorter=None):
+        vbits = np.asarray(self._operand_bits(v))
+        return np.searchsorted(self._signed_bits(self.bits), self._signed_bits(vbits), side=side, sorter=sorter)
+
+
+    # Return the minimum posit, cinf if any is cinf, as a PCPosit for axis=None.
+    def min(self, axis=None):
+        return self._reduce(np.min, axis)
+
+
+    # Return the maximum posit, cinf if any is cinf, as a PCPosit for axis=None.
+    def max(self, axis=None):
+        return self._reduce(np.max, axis)
+
+
+    def _reduce(self, func, axis):
+        dtype = self.bits.dtype
+        cinf_bits = dtype.type(1 << (self.nbits-1))
+        out = self._from_signed_bits(func(self._signed_bits(self.bits), axis=axis))
+        out = np.where(np.any(self.bits == cinf_bits, axis=axis), cinf_bits, out).astype(dtype)
+        if axis is None:
+            return PCPosit(int(out), mode='bits', nbits=self.nbits, es=self.es)
+        return PositArray._wrap(out, self.nbits, self.es)
+
+
+    # Return the sorted unique posits, cinf first, and their counts if return_counts.
+    def unique(self, return_counts=False):
+        result = np.unique(self._signed_bits(self.bits), return_counts=return_counts)
+        if return_counts:
+            return (PositArray._wrap(self._from_signed_bits(result[0]), self.nbits, self.es), result[1])
+        return PositArray._wrap(self._from_signed_bits(result), self.nbits, self.es)
+
+
+    def _cmp_op(self, other, op):
+        cinf_bits = 1 << (self.nbits-1)
+        bbits = np.asarray(self._operand_bits(other))
+        out = op(self._signed_bits(self.bits), self._signed_bits(bbits))
+        out &= (self.bits != cinf_bits) & (bbits != cinf_bits)
+        return out
+
+
+    def __eq__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self._cmp_op(other, np.equal)
+
+
+    def __ne__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return ~self._cmp_op(other, np.equal)
+
+
+    def __lt__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self._cmp_op(other, np.less)
+
+
+    def __le__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self._cmp_op(other, np.less_equal)
+
+
+    def __gt__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self._cmp_op(other, np.greater)
+
+
+    def __ge__(self, other):
+        if not _is_operand(other):
+            return NotImplemented
+        return self._cmp_op(other, np.greater_equal)
+
+
+    # Elementwise maximum or minimum, cinf if either is cinf.
+    def _minmax(self, other, func):
+        dtype = self.bits.dtype
+        cinf_bits = dtype.type(1 << (self.nbits-1))
+        bbits = np.asarray(self._operand_bits(other))
+        out = self._from_signed_bits(func(self._signed_bits(self.bits), self._signed_bits(bbits)))
+        out = np.where((self.bits == cinf_bits) | (bbits == cinf_bits), cinf_bits, out).astype(dtype)
+        return PositArray._wrap(out, self.nbits, self.es)
+
+
+    def _abs(self):
+        return PositArray._wrap(np.where(self._signed_bits(self.bits) < 0, self.neg().bits, self.bits), self.nbits, self.es)
+
+
+    # Return a PCPosit, Posit or scalar operand of a ufunc as a 0-d PositArray.
+    def _ufunc_operand(self, v):
+        if isinstance(v, PositArray):
+            self._check_config(v.nbits, v.es)
+            return v
+        return PositArray._wrap(np.asarray(self._operand_bits(v)), self.nbits, self.es)
+
+
+    def _ufunc_call(self, ufunc, inputs):
+        args = [ self._ufunc_operand(v) for v in inputs ]
+
+        if ufunc in _UFUNC_OPS and len(args) == 2:
+            return getattr(args[0], _UFUNC_OPS[ufunc])(args[1])
+        elif ufunc in _UFUNC_CMPS:
+            return args[0]._cmp_op(args[1], _UFUNC_CMPS[ufunc])
+        elif ufunc is np.not_equal:
+            return ~args[0]._cmp_op(args[1], np.equal)
+        elif ufunc is np.maximum:
+            return args[0]._minmax(args[1], np.maximum)
+        elif ufunc is np.minimum:
+            return args[0]._minmax(args[1], np.minimum)
+        elif ufunc is np.matmul:
+            return args[0].matmul(args[1])
+        elif ufunc is np.negative:
+            return args[0].neg()
+        elif ufunc is np.positive:
+            return args[0].copy()
+        elif ufunc is np.absolute:
+            return args[0]._abs()
+        elif ufunc is np.sqrt:
+            return args[0].sqrt()
+        elif ufunc is np.isnan:
+            return args[0].bits == (1 << (self.nbits-1))
+        elif ufunc is np.isfinite:
+            return args[0].bits != (1 << (self.nbits-1))
+        elif ufunc in _UFUNC_FUNCTIONS:
+            from sgposit import elementary
+            bits = elementary.function_posit_array(_UFUNC_FUNCTIONS[ufunc], args[0].bits, self.nbits, self.es)
+            return PositArray._wrap(bits, self.nbits, self.es)
+
+        raise NotImplementedError('np.{} is not implemented for posit arrays.'.format(ufunc.__name__))
+
+
+    # Reduce (or accumulate) along axis with np.add, np.multiply, np.maximum or
+    # np.minimum. Sums accumulate exactly in a quire and round once; products
+    # round after every step, as a loop of np.multiply would.
+    def _ufunc_reduce(self, ufunc, axis, keepdims=False, accumulate=False):
+        bits = self.bits
+        if isinstance(axis, tuple):
+            if len(axis) != 1:
+                raise NotImplementedError('Reduction over several axes is not implemented.')
+            axis = axis[0]
+        all_axes = axis is None
+        if all_axes:
+            bits = bits.ravel()
+            axis = 0
+        axis = axis % max(bits.ndim, 1)
+
+        if ufunc is np.add:
+            out = npquire.sum_posit_array(bits, self.nbits, self.es, axis=axis, cumulative=accumulate)
+        elif ufunc in (np.maximum, np.minimum):
+            keys = self._signed_bits(bits)
+            isnar = bits == (1 << (self.nbits-1))
+            if accumulate:
+                keys = ufunc.accumulate(keys, axis=axis)
+                isnar = np.logical_or.accumulate(isnar, axis=axis)
+            else:
+                keys = ufunc.reduce(keys, axis=axis)
+                isnar = np.any(isnar, axis=axis)
+            out = np.where(isnar, bits.dtype.type(1 << (self.nbits-1)), self._from_signed_bits(keys)).astype(bits.dtype)
+        elif ufunc is np.multiply:
+            steps = np.moveaxis(bits, axis, 0)
+            acc = PositArray._wrap(np.full(steps.shape[1:], 1 << (self.nbits-2), dtype=bits.dtype), self.nbits, self.es)
+            results = []
+            for step in steps:
+                acc = acc._binary_op('mul', PositArray._wrap(step, self.nbits, self.es), None)
+                results.append(acc.bits)
+            if accumulate:
+                out = np.moveaxis(np.array(results, dtype=bits.dtype).reshape(steps.shape), 0, axis)
+            else:
+                out = acc.bits
+        else:
+            raise NotImplementedError('np.{}.{} is not implemented for posit arrays.'.format(
+                ufunc.__name__, 'accumulate' if accumulate else 'reduce'))
+
+        if keepdims:
+            out = out.reshape((1,)*self.ndim) if all_axes else np.expand_dims(out, axis)
+        return PositArray._wrap(np.asarray(out), self.nbits, self.es)
+
+
+    # Store a ufunc result into out where the mask is true, as NumPy does.
+    def _ufunc_store(self, result, out, where):
+        rbits = result.bits if isinstance(result, PositArray) else np.asarray(result)
+        if out is None:
+            if where is True:
+                if isinstance(result, PositArray) and result.ndim == 0:
+                    return PCPosit(int(result.bits), mode='bits', nbits=result.nbits, es=result.es)
+                return result
+            out = PositArray.zeros(rbits.shape, nbits=result.nbits, es=result.es) \
+                if isinstance(result, PositArray) else np.zeros(rbits.shape, dtype=rbits.dtype)
+
+        if isinstance(result, PositArray) != isinstance(out, PositArray):
+            raise ValueError('Output type {} does not match result type {}.'.format(type(out).__name__, type(result).__name__))
+        if isinstance(out, PositArray):
+            self._check_config(out.nbits, out.es)
+        obits = out.bits if isinstance(out, PositArray) else out
+        if obits.shape != rbits.shape:
+            raise ValueError('Output shape {} does not match result shape {}.'.format(obits.shape, rbits.shape))
+
+        np.copyto(obits, rbits, where=where)
+        return out
+
+
+    # NumPy ufunc protocol: np.add(a, b), np.sqrt(a), np.add.reduce(a) and
+    # np.maximum.accumulate(a) run on the posit kernels, with broadcasting,
+    # out= and where=. Other ufuncs raise NotImplementedError rather than
+    # compute on the bit patterns.
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        out = kwargs.pop('out', None)
+        if out is not None:
+            if len(out) != 1:
+                raise NotImplementedError('np.{} with several outputs is not implemented.'.format(ufunc.__name__))
+            out = out[0]
+        where = kwargs.pop('where', True)
+
+        if method == '__call__':
+            if kwargs:
+                raise NotImplementedError('np.{} with {} is not implemented.'.format(ufunc.__name__, ', '.join(sorted(kwargs))))
+            result = self._ufunc_call(ufunc, inputs)
+        elif method in ('reduce', 'accumulate') and len(inputs) == 1 and where is True:
+            axis = kwargs.pop('axis', 0)
+            keepdims = kwargs.pop('keepdims', False)
+            if kwargs.pop('dtype', None) is not None:
+                raise NotImplementedError('np.{}.{} with a dtype is not implemented.'.format(ufunc.__name__, method))
+            if kwargs:
+                raise NotImplementedError('np.{}.{} with {} is not implemented.'.format(ufunc.__name__, method, ', '.join(sorted(kwargs))))
+            result = self._ufunc_reduce(ufunc, axis, keepdims, accumulate=(method == 'accumulate'))
+        else:
+            raise NotImplementedError('np.{}.{} is not implemented for posit arrays.'.format(ufunc.__name__, method))
+
+        return self._ufunc_store(result, out, where)
+
+
+    # NumPy array function protocol: np.sum, np.dot, np.sort, np.where and the
+    # other functions in _ARRAY_FUNCTIONS run on posit arrays. Others raise
+    # NotImplementedError rather than compute on the bit patterns.
+    def __array_function__(self, func, types, args, kwargs):
+        impl = _ARRAY_FUNCTIONS.get(func)
+        if impl is None:
+            raise NotImplementedError('np.{} is not implemented for posit arrays.'.format(func.__name__))
+        return impl(*args, **kwargs)
+
+
+
+def _no_options(name, kwargs):
+    options = sorted(k for (k, v) in kwargs.items() if v is not None)
+    if options:
+        raise NotImplementedError('np.{} with {} is not implemented for posit arrays.'.format(name, ', '.join(options)))
+
+
+def _reduction(name, ufunc, accumulate=False):
+    def impl(a, axis=None, dtype=None, out=None, keepdims=False, **kwargs):
+        _no_options(name, dict(kwargs, dtype=dtype))
+        if accumulate:
+            if keepdims:
+                raise NotImplementedError('np.{} with keepdims is not implemented for posit arrays.'.format(name))
+            result = a._ufunc_reduce(ufunc, axis, accumulate=True)
+            if axis is None:
+                result = result.reshape(-1)
+        else:
+            result = a._ufunc_reduce(ufunc, axis, keepdims)
+        return a._ufunc_store(result, out, True)
+    return impl
+
+
+def _np_dot(a, b, out=None):
+    return a.matmul(b, out)
+
+
+def _np_sort(a, axis=-1, kind=None, order=None):
+    _no_options('sort', {'kind': kind, 'order': order})
+    if axis is None:
+        a = a.reshape(-1)
+        axis = -1
+    a = a.copy()
+    a.sort(axis)
+    return a
+
+
+def _np_argsort(a, axis=-1, kind=None, order=None):
+    _no_options('argsort', {'order': order})
+    if axis is None:
+        return a.reshape(-1).argsort(kind=kind)
+    return a.argsort(axis, kind)
+
+
+def _np_searchsorted(a, v, side='left', sorter=None):
+    return a.searchsorted(v, side, sorter)
+
+
+def _np_unique(a, return_counts=False, **kwargs):
+    _no_options('unique', dict((k, v or None) for (k, v) in kwargs.items()))
+    return a.unique(return_counts)
+
+
+# Posit operands of np.where, np.concatenate and np.stack as bit patterns of
+# one configuration.
+def _config_bits(values):
+    arrays = [ v for v in values if isinstance(v, PositArray) ]
+    (nbits, es) = (arrays[0].nbits, arrays[0].es)
+    return (nbits, es, [ arrays[0]._ufunc_operand(v).bits for v in values ])
+
+
+def _np_where(condition, x=None, y=None):
+    if x is None or y is None or isinstance(condition, PositArray):
+        raise NotImplementedError('np.where on posit array conditions is not implemented.')
+    (nbits, es, (xbits, ybits)) = _config_bits([x, y])
+    return PositArray._wrap(np.where(condition, xbits, ybits).astype(dtype_for_nbits(nbits)), nbits, es)
+
+
+def _np_concatenate(arrays, axis=0, out=None, **kwargs):
+    _no_options('concatenate', dict(kwargs, out=out))
+    (nbits, es, bits) = _config_bits(arrays)
+    return PositArray._wrap(np.concatenate(bits, axis=axis), nbits, es)
+
+
+def _np_stack(arrays, axis=0, out=None, **kwargs):
+    _no_options('stack', dict(kwargs, out=out))
+    (nbits, es, bits) = _config_bits(arrays)
+    return PositArray._wrap(np.stack(bits, axis=axis), nbits, es)
+
+
+def _np_reshape(a, *args, **kwargs):
+    return PositArray._wrap(np.reshape(a.bits, *args, **kwargs), a.nbits, a.es)
+
+
+def _np_transpose(a, axes=None):
+    return PositArray._wrap(np.transpose(a.bits, axes), a.nbits, a.es)
+
+
+_ARRAY_FUNCTIONS = {
+    np.sum: _reduction('sum', np.add),
+    np.prod: _reduction('prod', np.multiply),
+    np.cumsum: _reduction('cumsum', np.add, accumulate=True),
+    np.cumprod: _reduction('cumprod', np.multiply, accumulate=True),
+    np.max: _reduction('max', np.maximum),
+    np.min: _reduction('min', np.minimum),
+    np.amax: _reduction('amax', np.maximum),
+    np.amin: _reduction('amin', np.minimum),
+    np.dot: _np_dot,
+    np.sort: _np_sort,
+    np.argsort: _np_argsort,
+    np.searchsorted: _np_searchsorted,
+    np.unique: _np_unique,
+    np.where: _np_where,
+    np.concatenate: _np_concatenate,
+    np.stack: _np_stack,
+    np.reshape: _np_reshape,
+    np.transpose: _np_transpose,
+    np.copy: lambda a, **kwargs: a.copy(),
+    np.shape: lambda a: a.shape,
+    np.ndim: lambda a: a.ndim,
+    np.size: lambda a, axis=None: a.size if axis is None else a.shape[axis],
+}
+
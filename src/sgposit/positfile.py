@@ -0,0 +1,210 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import os
+import struct
+
+import numpy as np
+
+from sgposit.npcoder    import dtype_for_nbits, check_config
+from sgposit.positarray import PositArray
+
+
+# Posit tensor file format. A fixed size little-endian header is followed by the
+# raw bit patterns in C order, one little-endian unsigned integer of
+# dtype_for_nbits(nbits) per posit, so the payload can be memory mapped as is.
+#
+# Header, HEADER_SIZE bytes:
+#   magic     8 bytes  b'SGPOSIT\0'
+#   version   uint16
+#   nbits     uint16
+#   es        uint16
+#   itemsize  uint8    bytes per bit pattern, the packing
+#   ndim      uint8    0 to MAX_NDIM
+#   shape     MAX_NDIM x uint64, unused dimensions are 0
+#   padding   to HEADER_SIZE
+#
+# Appending grows the first dimension. The payload is written before the header
+# is updated, so readers never see a shape beyond the written data.
+
+MAGIC = b'SGPOSIT\0'
+
+VERSION = 1
+
+MAX_NDIM = 8
+
+HEADER_SIZE = 128
+
+_HEADER_STRUCT = struct.Struct('<8sHHHBB{}Q'.format(MAX_NDIM))
+
+
+def _pack_header(nbits, es, shape):
+    itemsize = dtype_for_nbits(nbits).itemsize
+    dims = list(shape) + [0] * (MAX_NDIM - len(shape))
+    header = _HEADER_STRUCT.pack(MAGIC, VERSION, nbits, es, itemsize, len(shape), *dims)
+    return header + b'\0' * (HEADER_SIZE - len(header))
+
+
+# Return (nbits, es, shape) of the file header.
+def _unpack_header(header):
+    if len(header) < HEADER_SIZE:
+        raise ValueError('Truncated posit file header.')
+
+    fields = _HEADER_STRUCT.unpack(header[:_HEADER_STRUCT.size])
+    (magic, version, nbits, es, itemsize, ndim) = fields[:6]
+    if magic != MAGIC:
+        raise ValueError('Not a posit file.')
+    if version != VERSION:
+        raise NotImplementedError('Posit file version {} is not supported.'.format(version))
+    if ndim > MAX_NDIM:
+        raise ValueError('Corrupted posit file header.')
+    check_config(nbits, es)
+    if itemsize != dtype_for_nbits(nbits).itemsize:
+        raise NotImplementedError('Posit file packing of {} bytes per {} bits posit is not supported.'.format(itemsize, nbits))
+
+    return (nbits, es, tuple(fields[6:6+ndim]))
+
+
+def _file_dtype(nbits):
+    return dtype_for_nbits(nbits).newbyteorder('<')
+
+
+def read_posit_header(filename):
+    with open(filename, 'rb') as fp:
+        return _unpack_header(fp.read(HEADER_SIZE))
+
+
+# Write a PositArray to a posit file.
+def save_posit_array(filename, a):
+    if len(a.shape) > MAX_NDIM:
+        raise ValueError('Posit files support up to {} dimensions.'.format(MAX_NDIM))
+
+    with open(filename, 'wb') as fp:
+        fp.write(_pack_header(a.nbits, a.es, a.shape))
+        fp.write(np.ascontiguousarray(a.bits, dtype=_file_dtype(a.nbits)).tobytes())
+
+
+# Return a PositArray view on the memory mapped payload of a posit file.
+# mode is the np.memmap mode, 'r' read-only, 'r+' read-write or 'c' copy-on-write.
+def load_posit_array(filename, mode='r'):
+    if mode not in ('r', 'r+', 'c'):
+        raise ValueError('Expect mode r, r+ or c.')
+
+    (nbits, es, shape) = read_posit_header(filename)
+    dtype = _file_dtype(nbits)
+
+    count = 1
+    for n in shape:
+        count *= n
+    if os.path.getsize(filename) < HEADER_SIZE + count * dtype.itemsize:
+        raise ValueError('Truncated posit file payload.')
+
+    if count == 0:
+        bits = np.zeros(shape, dtype=dtype)     # np.memmap cannot map an empty payload.
+    else:
+        bits = np.memmap(filename, dtype=dtype, mode=mode, offset=HEADER_SIZE, shape=shape)
+
+    return PositArray._wrap(bits, nbits, es)
+
+
+"""
+Streaming writer of a posit file, appending chunks along the first dimension.
+Each chunk has shape (rows,) + shape, or shape for a single row. Opening an
+existing file with append=True continues it, checking its configuration.
+"""
+class PositFileWriter(object):
+
+    def __init__(self, filename, nbits=None, es=None, shape=(), append=False):
+        if append and os.path.exists(filename):
+            (fnbits, fes, fshape) = read_posit_header(filename)
+            if len(fshape) == 0:
+                raise ValueError('Cannot append to a 0-d posit file.')
+            if (nbits is not None and nbits != fnbits) or (es is not None and es != fes) or tuple(shape) != fshape[1:]:
+                raise ValueError('Posit file configuration or shape does not match.')
+            self.nbits = fnbits
+            self.es = fes
+            self.shape = fshape[1:]
+            self.nrows = fshape[0]
+            self.fp = open(filename, 'r+b')
+            self.fp.truncate(HEADER_SIZE + self._row_bytes() * self.nrows)    # Drop any partial write.
+        else:
+            if nbits is None:
+                nbits = 32
+            if es is None:
+                es = 2
+            check_config(nbits, es)
+            if len(shape) + 1 > MAX_NDIM:
+                raise ValueError('Posit files support up to {} dimensions.'.format(MAX_NDIM))
+            self.nbits = nbits
+            self.es = es
+            self.shape = tuple(shape)
+            self.nrows = 0
+            self.fp = open(filename, 'w+b')
+            self.fp.write(_pack_header(nbits, es, (0,) + self.shape))
+
+        self.fp.seek(0, os.SEEK_END)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def _row_bytes(self):
+        count = 1
+        for n in self.shape:
+            count *= n
+        return count * dtype_for_nbits(self.nbits).itemsize
+
+
+    # chunk: PositArray of the writer configuration, or an ndarray of bit patterns.
+    def append(self, chunk):
+        if isinstance(chunk, PositArray):
+            if chunk.nbits != self.nbits or chunk.es != self.es:
+                raise NotImplementedError('Mismatched posit configuration append is not implemented.')
+            bits = chunk.bits
+        else:
+            bits = PositArray(chunk, nbits=self.nbits, es=self.es, copy=False).bits
+
+        if bits.shape == self.shape:
+            bits = bits.reshape((1,) + self.shape)
+        if bits.shape[1:] != self.shape:
+            raise ValueError('Expect chunk of shape (rows,) + {}.'.format(self.shape))
+
+        self.fp.write(np.ascontiguousarray(bits, dtype=_file_dtype(self.nbits)).tobytes())
+        self.fp.flush()
+
+        self.nrows += bits.shape[0]
+        self.fp.seek(0)
+        self.fp.write(_pack_header(self.nbits, self.es, (self.nrows,) + self.shape))
+        self.fp.flush()
+        self.fp.seek(0, os.SEEK_END)
+
+
+    def close(self):
+        if not self.fp.closed:
+            self.fp.close()
@@ -0,0 +1,167 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import numbers
+
+from sgposit         import posit
+from sgposit.pcposit import PCPosit
+
+
+"""
+Quire, the exact fixed-point accumulator of posit sums and products.
+The quire of posit<nbits,es> holds every product of two posits exactly, with
+2^(es+2)*(nbits-2) + nbits bits, so n^2/2 bits for the standard
+configurations. Its least significant bit weighs minpos^2. The accumulator is
+a single Python integer in units of the least significant bit, and the sum is
+rounded to a posit only once, in to_posit().
+"""
+class Quire(object):
+
+    def __init__(self, nbits=None, es=None):
+        if nbits is None:
+            nbits = 32
+        if es is None:
+            es = 2
+        if nbits < 2 or es < 0:
+            raise ValueError('Expect nbits >= 2 and es >= 0.')
+
+        self.nbits = nbits
+        self.es = es
+        self.qsize = 2**(es+2) * (nbits-2) + nbits
+        self.lsb = -2**(es+1) * (nbits-2)       # Quire value = acc * 2^lsb
+        self.acc = 0
+        self.nar = False
+
+
+    def clear(self):
+        self.acc = 0
+        self.nar = False
+        return self
+
+
+    def is_nar(self):
+        return self.nar
+
+
+    # Return (x,m) of a PCPosit, Posit or posit bit pattern, or None for cinf.
+    def _fixedpoint(self, v):
+        nbits = self.nbits
+        es = self.es
+
+        if isinstance(v, PCPosit):
+            if v.rep.nbits != nbits or v.rep.es != es:
+                raise NotImplementedError('Mismatched posit configuration quire accumulation is not implemented.')
+            if v.rep.t == 'c':
+                return None
+            return v._fixedpoint()
+        elif isinstance(v, posit.Posit):
+            if v.nbits != nbits or v.es != es:
+                raise NotImplementedError('Mismatched posit configuration quire accumulation is not implemented.')
+            bits = v.bits
+        elif isinstance(v, numbers.Integral):
+            if v < 0 or v >> nbits:
+                raise ValueError('Bit pattern does not fit in {} bits.'.format(nbits))
+            bits = v
+        else:
+            raise ValueError('Expect PCPosit, Posit or posit bit pattern.')
+
+        if bits == 0:
+            return (0, 0)
+        elif bits == 1 << (nbits-1):
+            return None
+
+        return posit.decode_fixedpoint(bits, nbits, es)
+
+
+    def _accumulate(self, x, m):
+        assert m >= self.lsb
+        self.acc += x << (m - self.lsb)
+
+
+    def add(self, a):
+        fa = self._fixedpoint(a)
+        if fa is None:
+            self.nar = True
+        elif not self.nar:
+            self._accumulate(fa[0], fa[1])
+        return self
+
+
+    def sub(self, a):
+        fa = self._fixedpoint(a)
+        if fa is None:
+            self.nar = True
+        elif not self.nar:
+            self._accumulate(-fa[0], fa[1])
+        return self
+
+
+    # quire += a * b, exactly.
+    def add_product(self, a, b):
+        fa = self._fixedpoint(a)
+        fb = self._fixedpoint(b)
+        if fa is None or fb is None:
+            self.nar = True
+        elif not self.nar:
+            self._accumulate(fa[0]*fb[0], fa[1]+fb[1])
+        return self
+
+
+    # quire -= a * b, exactly.
+    def sub_product(self, a, b):
+        fa = self._fixedpoint(a)
+        fb = self._fixedpoint(b)
+        if fa is None or fb is None:
+            self.nar = True
+        elif not self.nar:
+            self._accumulate(-fa[0]*fb[0], fa[1]+fb[1])
+        return self
+
+
+    # quire += other quire.
+    def merge(self, other):
+        if self.nbits != other.nbits or self.es != other.es:
+            raise NotImplementedError('Mismatched posit configuration quire merge is not implemented.')
+        self.nar = self.nar or other.nar
+        if not self.nar:
+            self.acc += other.acc
+        return self
+
+
+    # Return the quire as a qsize-bit 2's complement bit pattern.
+    @property
+    def bits(self):
+        if self.nar:
+            return 1 << (self.qsize-1)
+        return self.acc & ((1 << self.qsize) - 1)
+
+
+    # Round the quire value once to the nearest posit.
+    def to_posit(self):
+        if self.nar:
+            return PCPosit('cinf', nbits=self.nbits, es=self.es)
+        elif self.acc == 0:
+            return PCPosit('0', nbits=self.nbits, es=self.es)
+
+        return PCPosit._fixedpoint_to_posit(self.acc, self.lsb, nbits=self.nbits, es=self.es)
@@ -0,0 +1,578 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+
+# Opt-in tracing of PCPosit arithmetic, and batched replay of traces.
+#
+# While a Tracer is recording, the PCPosit operators, fma, fms, sqrt, fsum,
+# fdp and conversions between configurations append one node per outermost
+# operation to a dataflow graph: the op and the node ids of its operands.
+# Operands from outside the trace become constant nodes holding their exact
+# value, unless registered with Tracer.input. A trace saves to a compact
+# binary file, and replay() re-executes it on posit arrays for any
+# (nbits, es) and any input vectors, one vectorized kernel call per op and
+# dependency level.
+#
+#   with trace.Tracer() as tracer:
+#       x = tracer.input(PCPosit(0.5, nbits=16, es=1))
+#       tracer.output(x*x + 1)
+#   trace.save_trace('model.trace', tracer.trace())
+#   (y,) = trace.replay(trace.load_trace('model.trace'), [xs], nbits=8, es=0)
+
+
+import array
+import binascii
+import struct
+import sys
+
+from sgposit         import coder
+from sgposit.pcposit import PCPosit, SCALAR_TYPES, scalar_to_fixedpoint
+
+try:
+    import numpy as np
+    from sgposit            import npcoder
+    from sgposit            import npquire
+    from sgposit.npcoder    import dtype_for_nbits
+    from sgposit.positarray import PositArray
+except ImportError:
+    np = None
+
+
+OPS = ('input', 'const', 'add', 'sub', 'mul', 'div', 'neg', 'sqrt', 'fma', 'fms', 'fsum', 'fdp', 'convert')
+
+_OPCODES = dict((op, i) for (i, op) in enumerate(OPS))
+
+_NARGS = {'add': 2, 'sub': 2, 'mul': 2, 'div': 2, 'neg': 1, 'sqrt': 1, 'fma': 3, 'fms': 3, 'convert': 1}
+
+# Ops with a variable number of operands, held in Trace.operands.
+_SEQUENCE_OPS = ('fsum', 'fdp')
+
+# Most (nbits, es) configurations in one trace.
+MAX_CONFIGS = 256
+
+# Significant bits kept of Fraction and Decimal constants, enough to round
+# correctly to any array configuration.
+CONSTANT_NBITS = 128
+
+
+"""
+A recorded dataflow graph of posit operations, in topological order.
+
+Node i has op OPS[ops[i]], configuration configs[node_configs[i]] and
+operand node ids args[3*i:3*i+3], -1 when unused. Input and const nodes
+instead hold the index of their value in values, an exact (x,m) or None for
+cinf, in args[3*i+1]; an input node holds its input number in args[3*i]. An
+fsum node holds (start, n) in args[3*i:3*i+2] for the n operand ids
+operands[start:start+n], and an fdp node the same for n products, the first
+factors then the second. A convert node rounds its operand to the node's
+configuration. configs[0] is (nbits, es), the configuration of the inputs.
+"""
+class Trace(object):
+
+    def __init__(self, nbits, es, ops, args, values, outputs, configs=None, node_configs=None, operands=None):
+        self.nbits = nbits
+        self.es = es
+        self.ops = ops
+        self.args = args
+        self.values = values
+        self.outputs = outputs
+        self.configs = [(nbits, es)] if configs is None else configs
+        self.node_configs = array.array('B', bytes(len(ops))) if node_configs is None else node_configs
+        self.operands = array.array('i') if operands is None else operands
+        self._batches = None
+
+
+    def __len__(self):
+        return len(self.ops)
+
+
+    @property
+    def ninputs(self):
+        return sum(1 for op in self.ops if op == _OPCODES['input'])
+
+
+    # Return the operand node ids of node i.
+    def operand_ids(self, i):
+        op = OPS[self.ops[i]]
+        (a, n) = self.args[3*i:3*i+2]
+        if op == 'fsum':
+            return list(self.operands[a:a+n])
+        elif op == 'fdp':
+            return list(self.operands[a:a+2*n])
+        elif op in _NARGS:
+            return list(self.args[3*i:3*i+_NARGS[op]])
+        return []
+
+
+    # Return [(op, config index, ids, operand id arrays)] grouping nodes by
+    # dependency level, op, configuration and operand count, or the operand
+    # configuration of a convert, in an order that replays the trace.
+    def batches(self):
+        if self._batches is not None:
+            return self._batches
+
+        n = len(self.ops)
+        levels = [0] * n
+        groups = {}
+        for i in range(n):
+            if self.ops[i] <= _OPCODES['const']:
+                continue
+            operand_ids = self.operand_ids(i)
+            levels[i] = 1 + max(levels[j] for j in operand_ids)
+            op = OPS[self.ops[i]]
+            if op == 'convert':
+                kind = self.node_configs[operand_ids[0]]
+            else:
+                kind = len(operand_ids)
+            groups.setdefault((levels[i], self.ops[i], self.node_configs[i], kind), []).append(i)
+
+        batches = []
+        for key in sorted(groups):
+            ids = groups[key]
+            operand_ids = np.array([ self.operand_ids(i) for i in ids ], dtype=np.int64)
+            batches.append((OPS[key[1]], key[2], np.array(ids, dtype=np.int64), list(operand_ids.T)))
+
+        self._batches = batches
+        return batches
+
+
+"""
+Records PCPosit operations into a Trace while started, as a context manager
+or with start() and stop(). Operands and results are kept alive while
+recording, since nodes are found by object identity.
+"""
+class Tracer(object):
+
+    def __init__(self):
+        self.reset()
+
+
+    def reset(self):
+        self.nbits = None
+        self.es = None
+        self._ops = array.array('B')
+        self._args = array.array('i')
+        self._values = []
+        self._outputs = []
+        self._configs = []
+        self._node_configs = array.array('B')
+        self._operands = array.array('i')
+        self._ids = {}          # id(PCPosit) -> node
+        self._keep = []
+        self._consts = {}       # (value, config index) -> const node
+        self._ninputs = 0
+        self._depth = 0
+
+
+    # Return the index of the configuration of p, the first one seen being 0.
+    def _config_index(self, p):
+        config = (p.nbits, p.es)
+        if self.nbits is None:
+            (self.nbits, self.es) = config
+        if config in self._configs:
+            return self._configs.index(config)
+        if len(self._configs) == MAX_CONFIGS:
+            raise NotImplementedError('Tracing over {} posit configurations is not implemented.'.format(MAX_CONFIGS))
+        self._configs.append(config)
+        return len(self._configs) - 1
+
+
+    def _append(self, op, config, a=-1, b=-1, c=-1):
+        self._ops.append(_OPCODES[op])
+        self._node_configs.append(config)
+        self._args.extend((a, b, c))
+        return len(self._ops) - 1
+
+
+    def _bind(self, p, node):
+        self._ids[id(p)] = node
+        self._keep.append(p)
+
+
+    def _value(self, p):
+        if isinstance(p, PCPosit):
+            return None if p.rep.t == 'c' else p._fixedpoint()
+        elif isinstance(p, SCALAR_TYPES):
+            return scalar_to_fixedpoint(p, CONSTANT_NBITS)
+        raise ValueError('Expect PCPosit or scalar operand.')
+
+
+    # Return the node of an operand, a new const node if it is not traced.
+    # Scalars take configuration config, the one of the operation.
+    def _node(self, v, config):
+        if isinstance(v, PCPosit):
+            node = self._ids.get(id(v))
+            if node is not None:
+                return node
+            config = self._config_index(v)
+
+        value = self._value(v)
+        node = self._consts.get((value, config))
+        if node is None:
+            self._values.append(value)
+            node = self._consts[(value, config)] = self._append('const', config, -1, len(self._values) - 1)
+        if isinstance(v, PCPosit):
+            self._bind(v, node)
+        return node
+
+
+    def _record(self, op, operands, result):
+        config = self._config_index(result)
+        ids = [ self._node(v, config) for v in operands ]
+        if op != 'convert' and any(self._node_configs[i] != config for i in ids):
+            raise NotImplementedError('Mismatched posit configuration tracing is not implemented.')
+        if op == 'convert' and self._node_configs[ids[0]] == config:
+            self._bind(result, ids[0])
+        elif op in _SEQUENCE_OPS:
+            self._bind(result, self._append(op, config, len(self._operands), len(ids) // (2 if op == 'fdp' else 1)))
+            self._operands.extend(ids)
+        else:
+            self._bind(result, self._append(op, config, *ids))
+
+
+    # Register p as the next input of the trace, and return it. Inputs share
+    # the configuration of the trace.
+    def input(self, p):
+        if not isinstance(p, PCPosit):
+            raise ValueError('Expect PCPosit input.')
+        if self._config_index(p) != 0:
+            raise NotImplementedError('Mismatched posit configuration inputs are not implemented.')
+        self._values.append(self._value(p))
+        self._bind(p, self._append('input', 0, self._ninputs, len(self._values) - 1))
+        self._ninputs += 1
+        return p
+
+
+    # Mark p as the next output of the trace, and return it.
+    def output(self, p):
+        self._outputs.append(self._node(p, 0))
+        return p
+
+
+    # Return the recorded Trace. Without marked outputs, the last node is the output.
+    def trace(self):
+        outputs = list(self._outputs)
+        if not outputs and len(self._ops) > 0:
+            outputs = [len(self._ops) - 1]
+        nbits = 32 if self.nbits is None else self.nbits
+        es = 2 if self.es is None else self.es
+        configs = list(self._configs) or [(nbits, es)]
+        return Trace(nbits, es, array.array('B', self._ops), array.array('i', self._args), list(self._values), outputs,
+                     configs, array.array('B', self._node_configs), array.array('i', self._operands))
+
+
+    def __enter__(self):
+        start(self)
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        stop(self)
+
+
+_active = []        # Stack of recording Tracers, the last one records.
+
+_originals = {}     # name -> original PCPosit attribute while installed.
+
+
+def _op_wrapper(func, op, reverse):
+    def wrapper(self, *args):
+        tracer = _active[-1]
+        if tracer._depth:
+            return func(self, *args)
+        tracer._depth += 1
+        try:
+            result = func(self, *args)
+        finally:
+            tracer._depth -= 1
+        if isinstance(result, PCPosit):
+            tracer._record(op, (args[0], self) if reverse else (self,) + args, result)
+        return result
+    return wrapper
+
+
+# Wrap the classmethod fsum or fdp, whose first nseqs arguments are operand
+# sequences.
+def _sequence_wrapper(method, op, nseqs):
+    func = method.__func__
+    def wrapper(cls, *args, **kwargs):
+        tracer = _active[-1]
+        if tracer._depth:
+            return func(cls, *args, **kwargs)
+        seqs = [ list(xs) for xs in args[:nseqs] ]
+        tracer._depth += 1
+        try:
+            result = func(cls, *(seqs + list(args[nseqs:])), **kwargs)
+        finally:
+            tracer._depth -= 1
+        if isinstance(result, PCPosit) and seqs[0]:
+            tracer._record(op, sum(seqs, []), result)
+        return result
+    return classmethod(wrapper)
+
+
+# Wrap PCPosit.__init__ to record PCPosit(p, nbits=..., es=...) of a PCPosit p.
+def _init_wrapper(func):
+    def wrapper(self, v=None, *args, **kwargs):
+        tracer = _active[-1]
+        if tracer._depth or not isinstance(v, PCPosit):
+            return func(self, v, *args, **kwargs)
+        tracer._depth += 1
+        try:
+            func(self, v, *args, **kwargs)
+        finally:
+            tracer._depth -= 1
+        tracer._record('convert', (v,), self)
+    return wrapper
+
+
+_TARGETS = [('__add__', 'add', False), ('__radd__', 'add', True),
+            ('__sub__', 'sub', False), ('__rsub__', 'sub', True),
+            ('__mul__', 'mul', False), ('__rmul__', 'mul', True),
+            ('__truediv__', 'div', False), ('__rtruediv__', 'div', True),
+            ('__neg__', 'neg', False), ('sqrt', 'sqrt', False),
+            ('fma', 'fma', False), ('fms', 'fms', False)]
+
+_SEQUENCE_TARGETS = [('fsum', 'fsum', 1), ('fdp', 'fdp', 2)]
+
+
+def _install(name, wrap, *args):
+    _originals[name] = PCPosit.__dict__[name]
+    setattr(PCPosit, name, wrap(_originals[name], *args))
+
+
+# Start recording into tracer, a new Tracer by default. Return tracer.
+def start(tracer=None):
+    if tracer is None:
+        tracer = Tracer()
+    if not _active:
+        for (name, op, reverse) in _TARGETS:
+            _install(name, _op_wrapper, op, reverse)
+        for (name, op, nseqs) in _SEQUENCE_TARGETS:
+            _install(name, _sequence_wrapper, op, nseqs)
+        _install('__init__', _init_wrapper)
+    _active.append(tracer)
+    return tracer
+
+
+# Stop recording into tracer, the innermost one by default.
+def stop(tracer=None):
+    if not _active:
+        raise ValueError('Tracer is not recording.')
+    if tracer is None:
+        tracer = _active[-1]
+    _active.remove(tracer)
+    if not _active:
+        for (name, original) in _originals.items():
+            setattr(PCPosit, name, original)
+        _originals.clear()
+    return tracer
+
+
+def is_enabled():
+    return len(_active) > 0
+
+
+# Trace file format, little-endian:
+#   magic     8 bytes  b'SGTRACE\0'
+#   version   uint16
+#   nbits     uint16
+#   es        uint16
+#   nnodes    uint32
+#   nvalues   uint32
+#   noutputs  uint32
+#   nconfigs  uint32
+#   noperands uint32
+#   configs   nconfigs x (nbits uint16, es uint16)
+#   ops       nnodes x uint8
+#   nodecfgs  nnodes x uint8
+#   args      3 x nnodes x int32
+#   operands  noperands x int32
+#   outputs   noutputs x int32
+#   values    nvalues x (flag uint8, m int32, nbytes uint32, nbytes of |x|)
+# The value flag is 0 for x >= 0, 1 for x < 0 and 2 for cinf.
+
+MAGIC = b'SGTRACE\0'
+
+VERSION = 2
+
+_HEADER_STRUCT = struct.Struct('<8sHHHIIIII')
+
+_CONFIG_STRUCT = struct.Struct('<HH')
+
+_VALUE_STRUCT = struct.Struct('<BiI')
+
+
+def _little_endian(a):
+    if sys.byteorder == 'big':
+        a = array.array(a.typecode, a)
+        a.byteswap()
+    return a
+
+
+def _pack_value(value):
+    if value is None:
+        return _VALUE_STRUCT.pack(2, 0, 0)
+    (x, m) = value
+    digits = '{:x}'.format(abs(x))
+    data = binascii.unhexlify(('0' * (len(digits) & 1)) + digits)
+    return _VALUE_STRUCT.pack(1 if x < 0 else 0, m, len(data)) + data
+
+
+def save_trace(filename, trace):
+    with open(filename, 'wb') as fp:
+        fp.write(_HEADER_STRUCT.pack(MAGIC, VERSION, trace.nbits, trace.es, len(trace.ops), len(trace.values), len(trace.outputs),
+                                     len(trace.configs), len(trace.operands)))
+        for config in trace.configs:
+            fp.write(_CONFIG_STRUCT.pack(*config))
+        fp.write(trace.ops.tobytes())
+        fp.write(trace.node_configs.tobytes())
+        fp.write(_little_endian(array.array('i', trace.args)).tobytes())
+        fp.write(_little_endian(array.array('i', trace.operands)).tobytes())
+        fp.write(_little_endian(array.array('i', trace.outputs)).tobytes())
+        for value in trace.values:
+            fp.write(_pack_value(value))
+
+
+def _read(fp, n):
+    data = fp.read(n)
+    if len(data) < n:
+        raise ValueError('Truncated trace file.')
+    return data
+
+
+def _read_ints(fp, n):
+    a = array.array('i')
+    a.frombytes(_read(fp, 4*n))
+    return _little_endian(a)
+
+
+def load_trace(filename):
+    with open(filename, 'rb') as fp:
+        (magic, version, nbits, es, nnodes, nvalues, noutputs, nconfigs, noperands) = _HEADER_STRUCT.unpack(_read(fp, _HEADER_STRUCT.size))
+        if magic != MAGIC:
+            raise ValueError('Not a trace file.')
+        if version != VERSION:
+            raise NotImplementedError('Trace file version {} is not supported.'.format(version))
+
+        configs = [ _CONFIG_STRUCT.unpack(_read(fp, _CONFIG_STRUCT.size)) for i in range(nconfigs) ]
+        ops = array.array('B')
+        ops.frombytes(_read(fp, nnodes))
+        node_configs = array.array('B')
+        node_configs.frombytes(_read(fp, nnodes))
+        args = _read_ints(fp, 3*nnodes)
+        operands = _read_ints(fp, noperands)
+        outputs = list(_read_ints(fp, noutputs))
+
+        values = []
+        for i in range(nvalues):
+            (flag, m, nbytes) = _VALUE_STRUCT.unpack(_read(fp, _VALUE_STRUCT.size))
+            if flag == 2:
+                values.append(None)
+                continue
+            x = int(binascii.hexlify(_read(fp, nbytes)) or b'0', 16)
+            values.append((-x if flag == 1 else x, m))
+
+    return Trace(nbits, es, ops, args, values, outputs, configs, node_configs, operands)
+
+
+# Return bit patterns of an exact (x,m) value, or None for cinf, in posit<nbits,es>.
+def _round_value(value, nbits, es):
+    if value is None:
+        return 1 << (nbits-1)
+    return coder.fixedpoint_to_posit_binary(value[0], value[1], nbits, es)
+
+
+def _input_bits(v, nbits, es):
+    if isinstance(v, PositArray):
+        if (v.nbits, v.es) != (nbits, es):
+            raise NotImplementedError('Mismatched posit configuration replay is not implemented.')
+        return v.bits
+    elif isinstance(v, PCPosit) or isinstance(v, SCALAR_TYPES):
+        return coder.encode_posit_binary(PCPosit(v, nbits=nbits, es=es).rep)
+    raise ValueError('Expect PositArray, PCPosit or scalar input.')
+
+
+def _kernel(op, operands, nbits, es):
+    if op == 'fsum':
+        return npquire.sum_posit_array(np.stack(operands), nbits, es, axis=0)
+    elif op == 'fdp':
+        n = len(operands) // 2
+        return npquire.dot_posit_array(np.stack(operands[:n]), np.stack(operands[n:]), nbits, es, axis=0)
+    elif op in ('fma', 'fms'):
+        return npquire.fused_posit_array(operands[0], operands[1], operands[2], nbits, es, 1 if op == 'fma' else -1)
+
+    a = PositArray._wrap(operands[0], nbits, es)
+    if op == 'neg':
+        return a.neg().bits
+    elif op == 'sqrt':
+        return a.sqrt().bits
+    return a._binary_op(op, PositArray._wrap(operands[1], nbits, es), None).bits
+
+
+# Re-execute a trace in posit<nbits,es>, the traced configuration by default.
+# Nodes converted to other configurations keep their traced configuration.
+# inputs gives each input as a PositArray, PCPosit or scalar, broadcast
+# together; by default the traced input values are used. Constants and traced
+# inputs round from their exact values. Return a PositArray per output.
+def replay(trace, inputs=None, nbits=None, es=None):
+    if np is None:
+        raise NotImplementedError('Trace replay requires numpy.')
+    if nbits is None:
+        nbits = trace.nbits
+    if es is None:
+        es = trace.es
+    configs = [(nbits, es)] + list(trace.configs[1:])
+
+    ops = np.frombuffer(trace.ops, dtype=np.uint8)
+    input_ids = np.flatnonzero(ops == _OPCODES['input'])
+    if inputs is None:
+        bits = [ _round_value(trace.values[trace.args[3*i+1]], nbits, es) for i in input_ids ]
+    elif len(inputs) != len(input_ids):
+        raise ValueError('Expect {} inputs.'.format(len(input_ids)))
+    else:
+        bits = [ _input_bits(v, nbits, es) for v in inputs ]
+    bits = [ np.asarray(v, dtype=dtype_for_nbits(nbits)) for v in bits ]
+    shape = np.broadcast(*bits).shape if len(bits) > 1 else (bits[0].shape if bits else ())
+
+    values = np.zeros((len(trace),) + shape, dtype=dtype_for_nbits(max(c[0] for c in configs)))
+    for i in np.flatnonzero(ops == _OPCODES['const']):
+        values[i] = _round_value(trace.values[trace.args[3*i+1]], *configs[trace.node_configs[i]])
+    for (i, v) in zip(input_ids, bits):
+        values[i] = v
+
+    for (op, config, ids, operand_ids) in trace.batches():
+        (cnbits, ces) = configs[config]
+        if op == 'convert':
+            (anbits, aes) = configs[trace.node_configs[operand_ids[0][0]]]
+            values[ids] = npcoder.convert_posit_array(values[operand_ids[0]], anbits, aes, cnbits, ces)
+        else:
+            dtype = dtype_for_nbits(cnbits)
+            values[ids] = _kernel(op, [ values[a].astype(dtype, copy=False) for a in operand_ids ], cnbits, ces)
+
+    outputs = []
+    for i in trace.outputs:
+        (onbits, oes) = configs[trace.node_configs[i]]
+        outputs.append(PositArray._wrap(values[i].astype(dtype_for_nbits(onbits)), onbits, oes))
+    return outputs
@@ -0,0 +1,381 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Exhaustive verification of posit binary operations.
+#
+# The (nbits, es, op, abits range) space is split into shards that run on a
+# process pool. Finished shards are appended to a checkpoint file, one JSON
+# line each, so an interrupted run resumes where it stopped. A shard result is
+# only reused by a run of the same implementation and checker version.
+#
+# Every result is checked against the exact rational result of the operation.
+# The rounding boundaries between posit<nbits,es> patterns c and c+1 are the
+# posit<nbits+1,es> patterns 2c+1, so a correctly rounded c lies between the
+# boundaries 2c-1 and 2c+1, inclusive only when c is even. maxpos and minpos
+# take everything beyond them, posits never round to 0 nor to cinf.
+#
+# Run: python -m sgposit.verify --nbits 10 --es 0 1 --processes 8 --checkpoint posit10.ckpt
+
+
+from __future__ import print_function
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from sgposit         import coder
+from sgposit         import posit
+from sgposit.pcposit import PCPosit
+
+
+OPS = ('add', 'sub', 'mul', 'div')
+
+MAX_MISMATCHES_PER_SHARD = 16
+
+# Version of the correct rounding checks, recorded with each shard result.
+# Bump it when the checks change so that checkpointed results are rerun.
+CHECKER_VERSION = 1
+
+
+_PCPOSIT_OPS = {
+    'add': PCPosit.__add__,
+    'sub': PCPosit.__sub__,
+    'mul': PCPosit.__mul__,
+    'div': PCPosit.__truediv__,
+}
+
+_POSIT_OPS = {
+    'add': posit.add_posit_binary,
+    'sub': posit.sub_posit_binary,
+    'mul': posit.mul_posit_binary,
+    'div': posit.div_posit_binary,
+}
+
+
+def _pcposit_op(op, abits, bbits, nbits, es):
+    a = PCPosit(abits, mode='bits', nbits=nbits, es=es)
+    b = PCPosit(bbits, mode='bits', nbits=nbits, es=es)
+    return coder.encode_posit_binary(_PCPOSIT_OPS[op](a, b).rep)
+
+
+def _posit_op(op, abits, bbits, nbits, es):
+    return _POSIT_OPS[op](abits, bbits, nbits, es)
+
+
+# Implementations under verification, op(op, abits, bbits, nbits, es) -> cbits.
+IMPLEMENTATIONS = {
+    'pcposit': _pcposit_op,
+    'posit': _posit_op,
+}
+
+
+# Return the name an implementation's results are checkpointed under.
+def impl_name(impl):
+    if callable(impl):
+        return '{}.{}'.format(impl.__module__, impl.__name__)
+    return impl
+
+
+def _fixedpoint(bits, nbits, es):
+    if bits == 0:
+        return (0, 0)
+    return posit.decode_fixedpoint(bits, nbits, es)
+
+
+# Return the special result bits when an operand is 0 or cinf, else None.
+def _special_result(op, abits, bbits, nbits):
+    cinf_bits = 1 << (nbits-1)
+    mask = (1 << nbits) - 1
+
+    if op == 'div':
+        if abits == cinf_bits or bbits == 0:
+            return cinf_bits
+        elif abits == 0 or bbits == cinf_bits:
+            return 0
+    elif abits == cinf_bits or bbits == cinf_bits:
+        return cinf_bits
+    elif op == 'mul' and (abits == 0 or bbits == 0):
+        return 0
+    elif abits == 0:
+        return bbits if op == 'add' else (-bbits) & mask
+    elif bbits == 0:
+        return abits
+
+    return None
+
+
+# Return (num, e, den) with the exact result num * 2^e / den, den > 0.
+def _exact_result(op, abits, bbits, nbits, es):
+    (xa, ma) = _fixedpoint(abits, nbits, es)
+    (xb, mb) = _fixedpoint(bbits, nbits, es)
+
+    if op == 'add' or op == 'sub':
+        if op == 'sub':
+            xb = -xb
+        m = min(ma, mb)
+        return ((xa << (ma - m)) + (xb << (mb - m)), m, 1)
+    elif op == 'mul':
+        return (xa * xb, ma + mb, 1)
+    elif op == 'div':
+        if xb < 0:
+            (xa, xb) = (-xa, -xb)
+        return (xa, ma - mb, xb)
+
+    raise ValueError('Unknown posit operation {}.'.format(op))
+
+
+# Compare num * 2^e / den against the posit<nbits,es> bit pattern bits, as -1, 0 or 1.
+def _cmp_exact(exact, bits, nbits, es):
+    (num, e, den) = exact
+    (x, m) = _fixedpoint(bits, nbits, es)
+
+    if e >= m:
+        (lhs, rhs) = (num << (e - m), x * den)
+    else:
+        (lhs, rhs) = (num, (x * den) << (m - e))
+
+    return (lhs > rhs) - (lhs < rhs)
+
+
+# Return True when cbits is the correctly rounded posit<nbits,es> of the exact result.
+def is_correctly_rounded(cbits, exact, nbits, es):
+    if exact[0] == 0:
+        return cbits == 0
+
+    return _is_between_boundaries(cbits, exact[0] > 0, lambda bits: _cmp_exact(exact, bits, nbits+1, es), nbits)
+
+
+# Return True when cbits is the correct posit<nbits,es> result of abits op bbits,
+# special cases included.
+def is_correct_result(op, abits, bbits, cbits, nbits, es):
+    special = _special_result(op, abits, bbits, nbits)
+    if special is not None:
+        return cbits == special
+
+    return is_correctly_rounded(cbits, _exact_result(op, abits, bbits, nbits, es), nbits, es)
+
+
+# Return True when cbits is the correctly rounded posit<nbits,es> square root
+# of the positive posit abits. The root is compared with a boundary b as abits with b^2.
+def is_correctly_rounded_sqrt(cbits, abits, nbits, es):
+    (x, m) = _fixedpoint(abits, nbits, es)
+
+    def cmp_root(bits):
+        (xb, mb) = _fixedpoint(bits, nbits+1, es)
+        (lhs, rhs) = (x, xb*xb)
+        if m >= 2*mb:
+            lhs <<= m - 2*mb
+        else:
+            rhs <<= 2*mb - m
+        return (lhs > rhs) - (lhs < rhs)
+
+    return _is_between_boundaries(cbits, True, cmp_root, nbits)
+
+
+# cmp(bits) compares the exact result with the posit<nbits+1,es> boundary bits.
+def _is_between_boundaries(cbits, positive, cmp, nbits):
+    cinf_bits = 1 << (nbits-1)
+    if cbits == 0 or cbits == cinf_bits:
+        return False
+
+    c = cbits - (1 << nbits) if cbits & cinf_bits else cbits     # Signed, ordered as the values.
+    maxpos = cinf_bits - 1
+    even = c % 2 == 0
+    wide_mask = (1 << (nbits+1)) - 1
+
+    if c == 1:
+        above_lower = positive
+    elif c == -maxpos:
+        above_lower = True
+    else:
+        t = cmp((2*c - 1) & wide_mask)
+        above_lower = t > 0 or (t == 0 and even)
+
+    if c == -1:
+        below_upper = not positive
+    elif c == maxpos:
+        below_upper = True
+    else:
+        t = cmp((2*c + 1) & wide_mask)
+        below_upper = t < 0 or (t == 0 and even)
+
+    return above_lower and below_upper
+
+
+# Verify op over abits in [alo, ahi) against every bbits. Return the shard result dict.
+def run_shard(shard, impl='posit'):
+    (op, nbits, es, alo, ahi) = shard
+    func = IMPLEMENTATIONS[impl] if not callable(impl) else impl
+
+    start = time.time()
+    count = 0
+    nmismatches = 0
+    mismatches = []
+
+    for abits in range(alo, ahi):
+        for bbits in range(1 << nbits):
+            cbits = func(op, abits, bbits, nbits, es)
+            ok = is_correct_result(op, abits, bbits, cbits, nbits, es)
+            count += 1
+            if not ok:
+                nmismatches += 1
+                if len(mismatches) < MAX_MISMATCHES_PER_SHARD:
+                    mismatches.append([abits, bbits, cbits])
+
+    return {
+        'shard': shard_id(shard),
+        'impl': impl_name(impl),
+        'checker': CHECKER_VERSION,
+        'count': count,
+        'nmismatches': nmismatches,
+        'mismatches': mismatches,
+        'seconds': time.time() - start,
+    }
+
+
+def shard_id(shard):
+    return '{}-{}-{}-{}-{}'.format(*shard)
+
+
+# Split every (op, nbits, es) space into shards of at most shard_rows abits values.
+def make_shards(configs, ops=OPS, shard_rows=None):
+    shards = []
+    for (nbits, es) in configs:
+        rows = shard_rows or max(1, (1 << nbits) // 64)
+        for op in ops:
+            if op not in OPS:
+                raise ValueError('Unknown posit operation {}.'.format(op))
+            for alo in range(0, 1 << nbits, rows):
+                shards.append((op, nbits, es, alo, min(alo + rows, 1 << nbits)))
+    return shards
+
+
+# Return {shard id: result} of the checkpointed shards verified with impl and
+# the current checker.
+def load_checkpoint(filename, impl='posit'):
+    done = {}
+    if filename is None or not os.path.exists(filename):
+        return done
+    name = impl_name(impl)
+    with open(filename) as fp:
+        for line in fp:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue        # Line cut short by an interrupted run.
+            if result.get('impl') == name and result.get('checker') == CHECKER_VERSION:
+                done[result['shard']] = result
+    return done
+
+
+def _run_shard_args(args):
+    return run_shard(*args)
+
+
+# Verify the configs and ops exhaustively. Shards already in the checkpoint file
+# for the same impl are skipped. progress(result, ndone, ntotal) is called after each shard.
+# Return a summary dict of counts, mismatches and throughput.
+def verify(configs, ops=OPS, impl='posit', processes=None, shard_rows=None, checkpoint=None, progress=None):
+    shards = make_shards(configs, ops, shard_rows)
+    done = load_checkpoint(checkpoint, impl)
+    todo = [ shard for shard in shards if shard_id(shard) not in done ]
+    results = [ done[shard_id(shard)] for shard in shards if shard_id(shard) in done ]
+
+    start = time.time()
+    count = 0
+    fp = open(checkpoint, 'a') if checkpoint is not None else None
+    pool = multiprocessing.Pool(processes) if processes != 1 and len(todo) > 1 else None
+    try:
+        if pool is None:
+            it = (run_shard(shard, impl) for shard in todo)
+        else:
+            it = pool.imap_unordered(_run_shard_args, [ (shard, impl) for shard in todo ])
+
+        for result in it:
+            results.append(result)
+            count += result['count']
+            if fp is not None:
+                fp.write(json.dumps(result) + '\n')
+                fp.flush()
+                os.fsync(fp.fileno())
+            if progress is not None:
+                progress(result, len(results), len(shards))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        if fp is not None:
+            fp.close()
+
+    seconds = time.time() - start
+    mismatches = []
+    for result in results:
+        (op, nbits, es) = result['shard'].split('-')[:3]
+        mismatches.extend((op, int(nbits), int(es), a, b, c) for (a, b, c) in result['mismatches'])
+
+    return {
+        'nshards': len(shards),
+        'nresumed': len(shards) - len(todo),
+        'count': sum(result['count'] for result in results),
+        'nmismatches': sum(result['nmismatches'] for result in results),
+        'mismatches': mismatches,
+        'seconds': seconds,
+        'pairs_per_second': count / seconds if seconds > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Exhaustively verify posit binary operations.')
+    parser.add_argument('--nbits', type=int, nargs='+', required=True)
+    parser.add_argument('--es', type=int, nargs='+', default=[0, 1, 2])
+    parser.add_argument('--ops', nargs='+', default=list(OPS), choices=OPS)
+    parser.add_argument('--impl', default='posit', choices=sorted(IMPLEMENTATIONS))
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--shard-rows', type=int, default=None)
+    parser.add_argument('--checkpoint', default=None)
+    args = parser.parse_args(argv)
+
+    def progress(result, ndone, ntotal):
+        print('{:>6}/{:<6} {:<20} {:>10} pairs {:>8.0f} pairs/s {:>6} mismatches'.format(
+            ndone, ntotal, result['shard'], result['count'],
+            result['count'] / result['seconds'] if result['seconds'] > 0 else 0.0, result['nmismatches']))
+        sys.stdout.flush()
+
+    configs = [ (nbits, es) for nbits in args.nbits for es in args.es ]
+    summary = verify(configs, args.ops, args.impl, args.processes, args.shard_rows, args.checkpoint, progress)
+
+    for mismatch in summary['mismatches']:
+        print('mismatch op={} nbits={} es={} a=0x{:x} b=0x{:x} c=0x{:x}'.format(*mismatch))
+    print('{} pairs, {} mismatches, {} of {} shards resumed, {:.1f}s, {:.0f} pairs/s'.format(
+        summary['count'], summary['nmismatches'], summary['nresumed'], summary['nshards'],
+        summary['seconds'], summary['pairs_per_second']))
+
+    return 1 if summary['nmismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
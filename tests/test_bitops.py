@@ -62,6 +62,37 @@ class TestBitops(unittest.TestCase):
         bits = 0b0110001111
         self.assertEqual(count_leading_bits(bits, 1, 5), 0)
 
+        bits = -0b0110001111
+        self.assertEqual(count_leading_bits(bits, 1, 5), 2)
+
+
+    def test_extract_bits(self):
+        self.assertEqual(extract_bits(0x00FF, 3, 5), 0x01F)
+        self.assertEqual(extract_bits(0xFF0F, 4, 8), 0x0F0)
+        self.assertEqual(extract_bits(0xFF0F, 4, 0), 0)
+
+
+    def test_count_leading_zeros(self):
+        self.assertEqual(count_leading_zeros(0b0001011, 7), 3)
+        self.assertEqual(count_leading_zeros(0, 7), 7)
+        self.assertEqual(count_leading_zeros(1 << 255, 256), 0)
+
+
+    def test_count_leading_ones(self):
+        self.assertEqual(count_leading_ones(0b1110100, 7), 3)
+        self.assertEqual(count_leading_ones(0b1111111, 7), 7)
+        self.assertEqual(count_leading_ones(0, 7), 0)
+        self.assertEqual(count_leading_ones((1 << 256) - 2, 256), 255)
+
+
+    def test_round_shift_right_even(self):
+        self.assertEqual(round_shift_right_even(0b10110, 2), 0b110)   # 101.10 tie, round to even.
+        self.assertEqual(round_shift_right_even(0b10010, 2), 0b100)   # 100.10 tie, round to even.
+        self.assertEqual(round_shift_right_even(0b10011, 2), 0b101)   # 100.11 round up.
+        self.assertEqual(round_shift_right_even(0b10101, 2), 0b101)   # 101.01 round down.
+        self.assertEqual(round_shift_right_even(0b101, 0), 0b101)
+        self.assertEqual(round_shift_right_even(0b101, -2), 0b10100)
+
 
 if __name__ == '__main__':
     unittest.main()
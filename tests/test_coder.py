@@ -21,6 +21,7 @@
 # SOFTWARE.
 
 
+import random
 import unittest
 
 from sgposit.coder import *
@@ -172,5 +173,76 @@ class TestCoder(unittest.TestCase):
         self.assertIsNot(rep1, rep2)
 
 
+    def test_positrep_fields(self):
+        rep = decode_posit_binary(self.posit_n6e2_3o32_bits, 6, 2)
+        self.assertIsInstance(rep, PositRep)
+        self.assertEqual((rep.s, rep.k, rep.e, rep.f, rep.h, rep.nbits, rep.es, rep.t), (0, -1, 0, 1, 1, 6, 2, 'n'))
+        self.assertEqual(rep['k'], -1)
+        self.assertEqual(sorted(rep.keys()), sorted(['s', 'k', 'e', 'f', 'h', 'nbits', 'es', 't']))
+
+
+    def test_positrep_fixedpoint(self):
+        rep = decode_posit_binary(self.posit_n6e2_3o32_bits, 6, 2)      # 3/32 = 3 * 2^-5
+        self.assertEqual((rep.x, rep.m), (3, -5))
+
+        rep = decode_posit_binary(self.posit_n6e2_m128_bits, 6, 2)      # -128 = -1 * 2^7
+        self.assertEqual((rep.x, rep.m), (-1, 7))
+
+        rep = create_zero_positrep(6, 2)
+        self.assertEqual((rep.x, rep.m), (0, 0))
+
+
+    def test_positrep_immutable(self):
+        rep = decode_posit_binary(self.posit_n6e2_6_bits, 6, 2)
+
+        def set_attr():
+            rep.s = 1
+        def set_item():
+            rep['s'] = 1
+
+        self.assertRaises(AttributeError, set_attr)
+        self.assertRaises(TypeError, set_item)
+
+
+    def test_positrep_replace(self):
+        rep = decode_posit_binary(self.posit_n6e2_6_bits, 6, 2)
+        neg = rep.replace(s=1)
+
+        self.assertEqual(neg, { 's': 1, 'k': 0, 'e': 2, 'f': 1, 'h': 1, 'nbits': 6, 'es': 2, 't': 'n' })
+        self.assertEqual((neg.x, neg.m), (-3, 1))
+        self.assertEqual(rep.s, 0)
+
+
+    def test_positrep_eq(self):
+        rep1 = decode_posit_binary(self.posit_n6e2_6_bits, 6, 2)
+        rep2 = decode_posit_binary(self.posit_n6e2_6_bits, 6, 2)
+        self.assertEqual(rep1, rep2)
+        self.assertEqual(hash(rep1), hash(rep2))
+        self.assertNotEqual(rep1, decode_posit_binary(self.posit_n6e2_3o32_bits, 6, 2))
+        self.assertNotEqual(rep1, { 's': 0, 'k': 0, 'e': 2, 'f': 1, 'h': 1, 'nbits': 6, 'es': 2 })
+
+
+    def test_special_positrep_shared(self):
+        self.assertIs(decode_posit_binary(0, 8, 1), create_zero_positrep(8, 1))
+        self.assertIs(decode_posit_binary(self.posit_n10e3_cinf_bits, 10, 3), create_cinf_positrep(10, 3))
+
+
+    def test_fixedpoint_to_posit_binary(self):
+        self.assertEqual(fixedpoint_to_posit_binary(3, -5, 6, 2), self.posit_n6e2_3o32_bits)
+        self.assertEqual(fixedpoint_to_posit_binary(-1, 7, 6, 2), self.posit_n6e2_m128_bits)
+        self.assertEqual(fixedpoint_to_posit_binary(0, 3, 6, 2), 0)
+
+        # Same rounding as encoding the exact positrep.
+        rng = random.Random(19)
+        for (nbits, es) in [(2, 0), (6, 2), (16, 1), (32, 2), (64, 3)]:
+            for i in range(500):
+                x = rng.getrandbits(rng.randint(1, 2*nbits)) | 1
+                m = rng.randint(-4*nbits*(1 << es), 4*nbits*(1 << es))
+                s = rng.randint(0, 1)
+                h = x.bit_length() - 1
+                rep = create_positrep(nbits=nbits, es=es, s=s, k=(m + h) >> es, e=(m + h) & ((1 << es) - 1), f=x ^ (1 << h), h=h)
+                self.assertEqual(fixedpoint_to_posit_binary(-x if s else x, m, nbits, es), encode_posit_binary(rep))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,183 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import os
+import random
+import unittest
+
+import mpmath
+from mpmath import mp
+import numpy as np
+
+from sgposit            import coder
+from sgposit            import elementary
+from sgposit            import posit
+from sgposit.pcposit    import PCPosit
+from sgposit.posit      import Posit
+from sgposit.positarray import PositArray
+
+
+_MP_FUNCTIONS = {
+    'exp'    : mpmath.exp,
+    'exp2'   : lambda v: mpmath.power(2, v),
+    'log'    : mpmath.log,
+    'log2'   : lambda v: mpmath.log(v, 2),
+    'sin'    : mpmath.sin,
+    'cos'    : mpmath.cos,
+    'tanh'   : mpmath.tanh,
+    'sigmoid': lambda v: 1 / (1 + mpmath.exp(-v)),
+}
+
+
+class TestElementary(unittest.TestCase):
+
+    def setUp(self):
+        mp.prec = 1200
+
+        self.posit_n6e2_1_bits = 0x10
+        self.posit_n6e2_1o2_bits = 0x0E
+        self.posit_n6e2_2_bits = 0x12
+        self.posit_n6e2_m1o2_bits = 0x32
+        self.posit_n6e2_maxpos_bits = 0x1F
+        self.posit_n6e2_minpos_bits = 0x01
+        self.posit_n6e2_cinf_bits = 0x20
+
+
+    def tearDown(self):
+        pass
+
+
+    # The posit nearest to the mpmath value of the function, rounded from
+    # 1100 bits with a sticky bit.
+    def ref_bits(self, name, bits, nbits, es):
+        cinf_bits = 1 << (nbits-1)
+        if bits == cinf_bits:
+            return cinf_bits
+
+        (x, m) = posit.decode_fixedpoint(bits, nbits, es) if bits != 0 else (0, 0)
+        v = mp.mpf(x) * mp.mpf(2)**m
+        if name in ('log', 'log2') and v <= 0:
+            return cinf_bits
+
+        r = _MP_FUNCTIONS[name](v)
+        if r == 0:
+            return 0
+        (man, e) = mpmath.frexp(r)
+        y = int(mpmath.floor(man * mp.mpf(2)**1100))
+        if y != man * mp.mpf(2)**1100:
+            y |= 1
+        return coder.fixedpoint_to_posit_binary(y, e - 1100, nbits, es)
+
+
+    def run_against_mpmath(self, configs, patterns=None):
+        for (nbits, es) in configs:
+            for name in elementary.FUNCTIONS:
+                for bits in (patterns(nbits, es) if patterns else range(1 << nbits)):
+                    self.assertEqual(elementary._evaluate(name, bits, nbits, es), self.ref_bits(name, bits, nbits, es),
+                                     (name, nbits, es, bits))
+
+
+    def test_special_values(self):
+        f = lambda name, bits: elementary.function_posit_binary(name, bits, 6, 2)
+
+        for name in elementary.FUNCTIONS:
+            self.assertEqual(f(name, self.posit_n6e2_cinf_bits), self.posit_n6e2_cinf_bits)
+
+        self.assertEqual(f('exp', 0), self.posit_n6e2_1_bits)
+        self.assertEqual(f('exp2', self.posit_n6e2_1_bits), self.posit_n6e2_2_bits)
+        self.assertEqual(f('exp2', self.posit_n6e2_m1o2_bits), elementary._evaluate('exp2', self.posit_n6e2_m1o2_bits, 6, 2))
+        self.assertEqual(f('log', self.posit_n6e2_1_bits), 0)
+        self.assertEqual(f('log', 0), self.posit_n6e2_cinf_bits)
+        self.assertEqual(f('log', self.posit_n6e2_m1o2_bits), self.posit_n6e2_cinf_bits)
+        self.assertEqual(f('log2', self.posit_n6e2_2_bits), self.posit_n6e2_1_bits)
+        self.assertEqual(f('sin', 0), 0)
+        self.assertEqual(f('cos', 0), self.posit_n6e2_1_bits)
+        self.assertEqual(f('tanh', 0), 0)
+        self.assertEqual(f('sigmoid', 0), self.posit_n6e2_1o2_bits)
+
+        # Posits saturate to maxpos and minpos instead of overflowing to cinf or 0.
+        self.assertEqual(f('exp', self.posit_n6e2_maxpos_bits), self.posit_n6e2_maxpos_bits)
+        self.assertEqual(f('exp', (-self.posit_n6e2_maxpos_bits) & 0x3F), self.posit_n6e2_minpos_bits)
+        self.assertEqual(f('sigmoid', (-self.posit_n6e2_maxpos_bits) & 0x3F), self.posit_n6e2_minpos_bits)
+        self.assertEqual(f('tanh', self.posit_n6e2_maxpos_bits), self.posit_n6e2_1_bits)
+
+        big = (1 << 63) - 1
+        self.assertEqual(elementary.function_posit_binary('exp', big, 64, 3), big)
+        self.assertEqual(elementary.function_posit_binary('tanh', big + 2, 64, 3), (-(1 << 62)) & ((1 << 64) - 1))
+
+        self.assertRaises(ValueError, elementary.function_posit_binary, 'sqrt', 1, 6, 2)
+
+
+    def test_small_exhaustive(self):
+        self.run_against_mpmath([(2, 0), (5, 1), (8, 0), (8, 2)])
+
+
+    def test_wide_random(self):
+        def patterns(nbits, es):
+            rng = random.Random(21)
+            # Mostly moderate values, where the functions are not saturated.
+            values = [ rng.choice([-1, 1]) * rng.uniform(0, 1) * 2**rng.uniform(-30, 8) for i in range(30) ]
+            return [ coder.encode_posit_binary(PCPosit(v, nbits=nbits, es=es).rep) for v in values ] + \
+                   [ rng.getrandbits(nbits) for i in range(10) ]
+        self.run_against_mpmath([(16, 1), (32, 2), (64, 3)], patterns)
+
+
+    def test_types(self):
+        p = PCPosit(self.posit_n6e2_2_bits, mode='bits', nbits=6, es=2)
+        q = Posit(self.posit_n6e2_2_bits, mode='bits', nbits=6, es=2)
+        a = PositArray([[self.posit_n6e2_2_bits, 0], [self.posit_n6e2_cinf_bits, self.posit_n6e2_m1o2_bits]], nbits=6, es=2)
+
+        for name in elementary.FUNCTIONS:
+            func = getattr(elementary, name)
+            ref = elementary.function_posit_binary(name, self.posit_n6e2_2_bits, 6, 2)
+
+            self.assertIsInstance(func(p), PCPosit)
+            self.assertEqual(coder.encode_posit_binary(func(p).rep), ref)
+            self.assertIsInstance(func(q), Posit)
+            self.assertEqual(func(q).bits, ref)
+
+            b = func(a)
+            self.assertIsInstance(b, PositArray)
+            self.assertEqual((b.nbits, b.es, b.shape, b.bits.dtype), (6, 2, (2, 2), np.uint8))
+            self.assertEqual(b.bits.tolist(), [ [ elementary.function_posit_binary(name, int(v), 6, 2) for v in row ] for row in a.bits ])
+
+        self.assertRaises(ValueError, elementary.exp, 1.5)
+
+
+    def test_wide_array(self):
+        rng = np.random.RandomState(21)
+        bits = rng.randint(0, 2**31, size=20).astype(np.uint32) << np.uint32(1)
+        a = PositArray(bits, nbits=32, es=2)
+        b = elementary.tanh(a)
+        self.assertEqual(b.bits.dtype, np.uint32)
+        self.assertEqual(b.bits.tolist(), [ elementary.function_posit_binary('tanh', int(v), 32, 2) for v in bits ])
+
+
+    @unittest.skipUnless(os.environ.get('SGPOSIT_LONG_TESTS') == '1', 'Long test.')
+    def test_exhaustive(self):
+        self.run_against_mpmath([(10, 1), (12, 0), (12, 3), (16, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+from fractions import Fraction
+import json
+import random
+import unittest
+
+import numpy as np
+
+from sgposit            import coder
+from sgposit            import instrument
+from sgposit            import posit
+from sgposit.pcposit    import PCPosit
+from sgposit.posit      import Posit
+from sgposit.positarray import PositArray
+
+
+class TestInstrument(unittest.TestCase):
+
+    def setUp(self):
+        self.posit_n6e2_1_bits = 0x10
+        self.posit_n6e2_3o2_bits = 0x11
+
+
+    def tearDown(self):
+        self.assertFalse(instrument.is_enabled())
+
+
+    def test_classify_rounding(self):
+        rng = random.Random(2)
+        for (nbits, es) in [(2, 0), (5, 1), (8, 0), (8, 2), (16, 1)]:
+            cinf_bits = 1 << (nbits-1)
+            maxpos = cinf_bits - 1
+            for i in range(2000):
+                x = rng.choice([-1, 1]) * rng.getrandbits(rng.randint(1, 2*nbits))
+                if x == 0:
+                    continue
+                m = rng.randint(-4*nbits*(1 << es), 4*nbits*(1 << es))
+                event = instrument.classify_rounding(x, m, nbits, es)
+
+                bits = coder.fixedpoint_to_posit_binary(abs(x), m, nbits, es)
+                v = Fraction(abs(x)) * Fraction(2)**m
+                (xc, mc) = posit.decode_fixedpoint(bits, nbits, es)
+                c = Fraction(xc) * Fraction(2)**mc
+
+                if event == 'exact':
+                    self.assertEqual(c, v)
+                elif event == 'up':
+                    self.assertGreater(c, v)
+                elif event == 'down':
+                    self.assertLess(c, v)
+                elif event == 'tie':
+                    self.assertEqual(bits % 2, 0)
+                    # The tie lies on the posit<nbits+1,es> boundary between bits and a neighbour.
+                    bounds = [ posit.decode_fixedpoint(b, nbits+1, es) for b in (2*bits - 1, 2*bits + 1) ]
+                    self.assertIn(v, [ Fraction(xb) * Fraction(2)**mb for (xb, mb) in bounds ])
+                elif event == 'saturate_max':
+                    self.assertEqual(bits, maxpos)
+                    self.assertGreater(v, c)
+                else:
+                    self.assertEqual(bits, 1)
+                    self.assertLess(v, c)
+
+
+    def test_disabled_is_uninstalled(self):
+        add = PCPosit.__dict__['__add__']
+        round_fixedpoint = coder.fixedpoint_to_posit_binary
+        encode = coder.encode_posit_binary
+
+        with instrument.collect():
+            self.assertTrue(instrument.is_enabled())
+            self.assertIsNot(PCPosit.__dict__['__add__'], add)
+
+        self.assertIs(PCPosit.__dict__['__add__'], add)
+        self.assertIs(coder.fixedpoint_to_posit_binary, round_fixedpoint)
+        self.assertIs(coder.encode_posit_binary, encode)
+
+
+    def test_op_counts(self):
+        a = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+        b = PCPosit(self.posit_n6e2_1_bits, mode='bits', nbits=6, es=2)
+        qa = Posit(self.posit_n6e2_3o2_bits, mode='bits', nbits=8, es=0)
+
+        with instrument.collect() as stats:
+            a + b
+            a - b           # One sub, not also an add.
+            a * b * b
+            a.fma(b, b)
+            qa / qa
+            PositArray([1, 2, 3], nbits=8, es=0) + PositArray([4, 5, 6], nbits=8, es=0)
+
+        counts = stats.to_dict()['ops']
+        self.assertEqual(counts['posit<6,2>'], {'add': 1, 'sub': 1, 'mul': 2, 'fma': 1})
+        self.assertEqual(counts['posit<8,0>'], {'div': 1, 'add': 3})
+        self.assertEqual(stats.to_dict()['timings'], {})
+
+
+    def test_rounding_counts(self):
+        a = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+        b = PCPosit(self.posit_n6e2_1_bits, mode='bits', nbits=6, es=2)
+        maxpos = PCPosit(0x1F, mode='bits', nbits=6, es=2)
+
+        with instrument.collect() as stats:
+            a + a           # 3, exact
+            a * a           # 9/4 ~> 2, down
+            a + b           # 5/2 ~> 2, tie to even
+            maxpos * maxpos
+
+        rounding = stats.to_dict()['rounding']['posit<6,2>']
+        self.assertEqual(rounding, {'exact': 1, 'down': 1, 'up': 0, 'tie': 1, 'saturate_max': 1, 'saturate_min': 0})
+
+
+    def test_timing_and_json(self):
+        a = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+
+        with instrument.collect(timing=True) as stats:
+            a * a
+
+        doc = json.loads(stats.to_json())
+        self.assertEqual(doc['timings']['PCPosit._fixedpoint_to_posit']['calls'], 1)
+        self.assertGreaterEqual(doc['timings']['coder.fixedpoint_to_posit_binary']['seconds'], 0.0)
+        self.assertEqual(doc['ops'], {'posit<6,2>': {'mul': 1}})
+
+
+    def test_nested(self):
+        a = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+
+        outer = instrument.start()
+        a + a
+        with instrument.collect() as inner:
+            a * a
+        a - a
+        instrument.stop(outer)
+
+        self.assertEqual(outer.to_dict()['ops'], {'posit<6,2>': {'add': 1, 'sub': 1}})
+        self.assertEqual(inner.to_dict()['ops'], {'posit<6,2>': {'mul': 1}})
+        self.assertRaises(ValueError, instrument.stop)
+
+
+if __name__ == '__main__':
+    unittest.main()
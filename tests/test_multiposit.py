@@ -0,0 +1,100 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from fractions import Fraction
+import random
+import unittest
+
+from sgposit            import coder
+from sgposit.multiposit import MultiPosit, sweep
+from sgposit.pcposit    import PCPosit
+
+
+class TestMultiPosit(unittest.TestCase):
+
+    def setUp(self):
+        self.configs = ((6, 1), (8, 0), (8, 2), (16, 1), (32, 2), (64, 3))
+
+
+    def tearDown(self):
+        pass
+
+
+    def bits_of(self, p):
+        return coder.encode_posit_binary(p.rep)
+
+
+    def run_configs(self, fn, values):
+        return [ self.bits_of(fn(*[ PCPosit(v, nbits=nbits, es=es) for v in values ])) for (nbits, es) in self.configs ]
+
+
+    def test_matches_pcposit(self):
+        def fn(a, b, c):
+            d = (a*b - c) / (a + c)
+            return (d*d + a).sqrt() - b/3 + (-c)
+
+        rng = random.Random(24)
+        for i in range(200):
+            values = [ rng.choice([rng.uniform(-10, 10), rng.randint(-5, 5), Fraction(rng.randint(-50, 50), rng.randint(1, 30)), 0, 1e-20, 1e30])
+                       for j in range(3) ]
+            self.assertEqual(sweep(fn, values, self.configs).bits(), self.run_configs(fn, values))
+
+
+    def test_reference_and_errors(self):
+        a = MultiPosit(Fraction(1, 3), self.configs)
+        self.assertEqual(a.reference(), Fraction((2**257 + 1) // 3, 2**257))    # 256 bits, rounded up.
+        errors = a.errors()
+        for (p, err) in zip(a.posits(), errors):
+            (x, m) = p._fixedpoint()
+            self.assertEqual(err, float(abs(x*Fraction(2)**m - Fraction(1, 3)) * 3))
+        self.assertTrue(errors[-1] < errors[-2] < errors[3] < errors[1])
+        self.assertEqual(a.smallest(1e-6), (32, 2))
+        self.assertEqual(a.smallest(0.1), (6, 1))
+        self.assertEqual(a.smallest(0.0), None)
+
+        b = (a*3 - 1)
+        self.assertEqual(b.reference(), 0)
+        self.assertEqual(b.errors()[-1], 0.0)
+        self.assertEqual(a.posit(16, 1), PCPosit(Fraction(1, 3), nbits=16, es=1))
+
+        c = a / 0
+        self.assertEqual(c.reference(), None)
+        self.assertEqual(c.errors(), [0.0] * len(self.configs))
+        self.assertEqual(c.bits(), [ 1 << (nbits-1) for (nbits, es) in self.configs ])
+
+        # maxpos of posit<8,0> is 64, so the sum saturates there but not in the reference.
+        d = MultiPosit(100, ((8, 0),)) + 1
+        self.assertEqual(d.bits(), [0x7F])
+        self.assertEqual(d.errors(), [float(Fraction(37, 101))])
+
+
+    def test_invalid(self):
+        a = MultiPosit(1, ((8, 0),))
+        b = MultiPosit(1, ((8, 1),))
+        self.assertRaises(NotImplementedError, lambda: a + b)
+        self.assertRaises(TypeError, lambda: a + 'x')
+        self.assertRaises(ValueError, MultiPosit, 'x')
+        self.assertRaises(ValueError, MultiPosit, 1, ())
+        self.assertRaises(ValueError, MultiPosit, 1, ((1, 0),))
+
+
+if __name__ == '__main__':
+    unittest.main()
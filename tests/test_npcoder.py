@@ -0,0 +1,195 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import random
+import unittest
+
+import numpy as np
+
+from sgposit         import coder
+from sgposit         import posit
+from sgposit.npcoder import *
+from sgposit.pcposit import PCPosit
+
+
+class TestNPCoder(unittest.TestCase):
+
+    def setUp(self):
+        self.configs = [(2, 0), (3, 1), (5, 3), (6, 2), (8, 0), (8, 2), (12, 1)]
+
+
+    def tearDown(self):
+        pass
+
+
+    def fields_as_rep(self, fields, i, nbits, es):
+        (s, k, e, f, h, t) = fields
+        return { 's': int(s[i]), 'k': int(k[i]), 'e': int(e[i]), 'f': int(f[i]), 'h': int(h[i]),
+                 'nbits': nbits, 'es': es, 't': str(t[i]) }
+
+
+    def test_dtype_for_nbits(self):
+        self.assertEqual(dtype_for_nbits(8), np.uint8)
+        self.assertEqual(dtype_for_nbits(9), np.uint16)
+        self.assertEqual(dtype_for_nbits(32), np.uint32)
+        self.assertEqual(dtype_for_nbits(64), np.uint64)
+        self.assertRaises(ValueError, dtype_for_nbits, 65)
+
+
+    def test_bit_length(self):
+        values = [0, 1, 2, 3, 255, 256, 2**53 + 1, 2**63, 2**64 - 1]
+        out = bit_length(np.array(values, dtype=np.uint64))
+        self.assertEqual(out.tolist(), [ v.bit_length() for v in values ])
+
+
+    def test_decode_posit_array_exhaustive(self):
+        for (nbits, es) in self.configs:
+            fields = decode_posit_array(np.arange(2**nbits), nbits, es)
+            for bits in range(2**nbits):
+                self.assertEqual(self.fields_as_rep(fields, bits, nbits, es), coder.decode_posit_binary(bits, nbits, es))
+
+
+    def test_decode_posit_array_wide(self):
+        rng = random.Random(11)
+        for (nbits, es) in [(16, 1), (32, 2), (64, 3)]:
+            bits = [0, 1 << (nbits-1), 1, 2**nbits - 1] + [ rng.getrandbits(nbits) for i in range(500) ]
+            fields = decode_posit_array(np.array(bits, dtype=np.uint64), nbits, es)
+            for (i, v) in enumerate(bits):
+                self.assertEqual(self.fields_as_rep(fields, i, nbits, es), coder.decode_posit_binary(v, nbits, es))
+
+
+    def test_encoding_decoding_symmetry(self):
+        for (nbits, es) in self.configs + [(16, 0), (16, 2), (16, 17)]:
+            bits = np.arange(2**nbits)
+            (s, k, e, f, h, t) = decode_posit_array(bits, nbits, es)
+            out = encode_posit_array(s, k, e, f, h, t, nbits, es)
+            self.assertEqual(out.dtype, dtype_for_nbits(nbits))
+            self.assertTrue(np.array_equal(out, bits))
+
+
+    def test_encode_posit_array_rounding(self):
+        rng = random.Random(5)
+        for (nbits, es) in [(5, 1), (8, 2), (16, 1), (32, 3), (64, 2)]:
+            reps = []
+            for i in range(1000):
+                h = rng.randint(0, 64)
+                rep = coder.create_positrep(nbits=nbits, es=es, s=rng.randint(0, 1), k=rng.randint(-nbits-2, nbits+2),
+                                            e=rng.getrandbits(es) if es > 0 else 0, f=rng.getrandbits(h) if h > 0 else 0, h=h)
+                reps.append(rep)
+            fields = [ [ rep[key] for rep in reps ] for key in ['s', 'k', 'e', 'f', 'h', 't'] ]
+            fields[3] = np.array(fields[3], dtype=np.uint64)
+            out = encode_posit_array(*(fields + [nbits, es]))
+            self.assertEqual(out.tolist(), [ coder.encode_posit_binary(rep) for rep in reps ])
+
+
+    def test_fixedpoint_array(self):
+        rng = random.Random(9)
+        for (nbits, es) in [(6, 2), (16, 1), (32, 2), (64, 3)]:
+            bits = [ rng.getrandbits(nbits) for i in range(500) ]
+            bits = [ v for v in bits if v != 0 and v != 1 << (nbits-1) ]
+            (x, m) = decode_fixedpoint_array(np.array(bits, dtype=np.uint64), nbits, es)
+            self.assertEqual(list(zip(x.tolist(), m.tolist())), [ posit.decode_fixedpoint(v, nbits, es) for v in bits ])
+
+            xs = [ rng.choice([-1, 1]) * rng.getrandbits(rng.randint(1, 62)) or 1 for i in range(500) ]
+            ms = [ rng.randint(-4*nbits, 4*nbits) for i in range(500) ]
+            out = round_fixedpoint_array(np.array(xs), np.array(ms), nbits, es)
+            self.assertEqual(out.tolist(), [ coder.fixedpoint_to_posit_binary(x, m, nbits, es) for (x, m) in zip(xs, ms) ])
+
+
+    def test_to_float64(self):
+        rng = random.Random(13)
+        for (nbits, es) in self.configs + [(16, 1), (24, 2), (32, 2), (64, 3), (64, 9)]:
+            if nbits <= 12:
+                bits = list(range(2**nbits))
+            else:
+                bits = [0, 1, 1 << (nbits-1), 2**nbits - 1] + [ rng.getrandbits(nbits) for i in range(500) ]
+            out = to_float64(np.array(bits, dtype=dtype_for_nbits(nbits)), nbits, es)
+            self.assertEqual(out.dtype, np.float64)
+            for (v, f) in zip(bits, out.tolist()):
+                if v == 1 << (nbits-1):
+                    self.assertNotEqual(f, f)
+                else:
+                    self.assertEqual(f, float(PCPosit(v, mode='bits', nbits=nbits, es=es)))
+
+        self.assertEqual(to_float64(np.array([[0x10, 0x35]]), 6, 2).tolist(), [[1.0, -0.1875]])
+        self.assertEqual(to_float64([1, 2**39 - 1, 2**39 + 1], 40, 32).tolist(), [0.0, float('inf'), float('-inf')])
+
+
+    def test_to_float64_extremes(self):
+        # maxpos and minpos of wide es overflow and underflow float64 alike
+        # for scalars and arrays.
+        for (nbits, es) in [(16, 7), (32, 6), (40, 32), (64, 9)]:
+            bits = [1, 2**(nbits-1) - 1, 2**(nbits-1) + 1, 2**nbits - 1, 2**(nbits-1) - 2, 2]
+            out = to_float64(np.array(bits, dtype=dtype_for_nbits(nbits)), nbits, es)
+            self.assertEqual(out.tolist()[:4], [0.0, float('inf'), float('-inf'), -0.0])
+            self.assertEqual(out.tolist(), [ float(PCPosit(v, mode='bits', nbits=nbits, es=es)) for v in bits ])
+            self.assertEqual(out.tolist(), [ float(posit.Posit(v, mode='bits', nbits=nbits, es=es)) for v in bits ])
+
+        # Rounding up to 2^1024 overflows too.
+        self.assertEqual(coder.fixedpoint_to_float(2**54 - 1, 970), float('inf'))
+        self.assertEqual(coder.fixedpoint_to_float(-(2**54 - 1), 970), float('-inf'))
+        self.assertEqual(coder.fixedpoint_to_float(2**53 - 1, 971), float.fromhex('0x1.fffffffffffffp+1023'))
+
+
+    def test_convert_posit_array(self):
+        rng = random.Random(17)
+        pairs = [(8, 2, 6, 1), (6, 1, 12, 2), (16, 1, 8, 0), (16, 1, 32, 2), (32, 2, 16, 1), (64, 3, 32, 2), (32, 2, 64, 3)]
+        for (nbits, es, to_nbits, to_es) in pairs:
+            if nbits <= 12:
+                bits = list(range(2**nbits))
+            else:
+                bits = [0, 1, 1 << (nbits-1), 2**nbits - 1] + [ rng.getrandbits(nbits) for i in range(500) ]
+            out = convert_posit_array(np.array(bits, dtype=dtype_for_nbits(nbits)), nbits, es, to_nbits, to_es)
+            self.assertEqual(out.dtype, dtype_for_nbits(to_nbits))
+            self.assertEqual(out.tolist(), [ posit.convert_posit_binary(v, nbits, es, to_nbits, to_es) for v in bits ])
+
+
+    def test_arith_posit_array(self):
+        rng = random.Random(19)
+        ops = [('add', posit.add_posit_binary), ('sub', posit.sub_posit_binary),
+               ('mul', posit.mul_posit_binary), ('div', posit.div_posit_binary)]
+        for (nbits, es) in [(5, 1), (6, 3), (8, 0), (16, 1), (24, 5), (32, 2)]:
+            if nbits <= 6:
+                (a, b) = np.meshgrid(np.arange(2**nbits), np.arange(2**nbits))
+                (a, b) = (a.ravel().tolist(), b.ravel().tolist())
+            else:
+                special = [0, 1, 1 << (nbits-1), 2**nbits - 1]
+                a = special * 4 + [ rng.getrandbits(nbits) for i in range(1000) ]
+                b = [ v for v in special for i in range(4) ] + [ rng.getrandbits(nbits) for i in range(1000) ]
+            for (op, f) in ops:
+                out = arith_posit_array(op, np.array(a, dtype=np.uint64), np.array(b, dtype=np.uint64), nbits, es)
+                self.assertEqual(out.dtype, dtype_for_nbits(nbits))
+                self.assertEqual(out.tolist(), [ f(u, v, nbits, es) for (u, v) in zip(a, b) ])
+
+        self.assertRaises(ValueError, arith_posit_array, 'add', [0], [0], 40, 2)
+        self.assertRaises(ValueError, arith_posit_array, 'pow', [0], [0], 16, 1)
+
+
+    def test_invalid_config(self):
+        self.assertRaises(ValueError, decode_posit_array, [0], 65, 2)
+        self.assertRaises(ValueError, decode_posit_array, [0], 16, 33)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import unittest
+
+import numpy as np
+
+from sgposit         import coder
+from sgposit.optable import PositOpTable, get_op_table
+from sgposit.pcposit import PCPosit
+
+
+class TestOpTable(unittest.TestCase):
+
+    def setUp(self):
+        self.nbits = 5
+        self.es = 1
+
+
+    def tearDown(self):
+        pass
+
+
+    def run_table_op(self, op_str=None, op=None):
+        nbits = self.nbits
+        es = self.es
+        t = get_op_table(nbits, es)
+        table = t.table(op_str)
+
+        self.assertEqual(table.shape, (2**nbits, 2**nbits))
+        self.assertEqual(table.dtype, np.uint8)
+
+        for abits in range(2**nbits):
+            for bbits in range(2**nbits):
+                a = PCPosit(abits, mode='bits', nbits=nbits, es=es)
+                b = PCPosit(bbits, mode='bits', nbits=nbits, es=es)
+                cbits = coder.encode_posit_binary(op(a, b).rep)
+                self.assertEqual(t.lookup(op_str, abits, bbits), cbits)
+                self.assertEqual(table[abits, bbits], cbits)
+
+
+    def test_add(self):
+        self.run_table_op('add', PCPosit.__add__)
+
+
+    def test_sub(self):
+        self.run_table_op('sub', PCPosit.__sub__)
+
+
+    def test_mul(self):
+        self.run_table_op('mul', PCPosit.__mul__)
+
+
+    def test_div(self):
+        self.run_table_op('div', PCPosit.__truediv__)
+
+
+    def test_gather(self):
+        t = get_op_table(self.nbits, self.es)
+        abits = np.arange(2**self.nbits, dtype=np.uint8)
+        bbits = np.uint8(0x09)
+
+        c = t.gather('mul', abits, bbits)
+        self.assertEqual(c.shape, abits.shape)
+        for i in range(2**self.nbits):
+            self.assertEqual(c[i], t.mul(i, 0x09))
+
+        out = np.zeros((2**self.nbits, 2**self.nbits), dtype=np.uint8)
+        t.gather('add', abits[:,None], abits[None,:], out=out)
+        self.assertTrue(np.array_equal(out, t.table('add')))
+
+
+    def test_get_op_table_shared(self):
+        self.assertIs(get_op_table(4, 0), get_op_table(4, 0))
+        self.assertIsNot(get_op_table(4, 0), get_op_table(4, 1))
+
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, PositOpTable, 9, 0)
+        self.assertRaises(ValueError, get_op_table(4, 0).lookup, 'pow', 1, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
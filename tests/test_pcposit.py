@@ -21,10 +21,16 @@
 # SOFTWARE.
 
 
+from decimal   import Decimal
+from fractions import Fraction
+import math
+import random
 import unittest
 
 from sgposit         import coder
+from sgposit         import pcposit
 from sgposit.pcposit import PCPosit
+from sgposit         import verify
 
 
 class TestPCPosit(unittest.TestCase):
@@ -114,6 +120,83 @@ class TestPCPosit(unittest.TestCase):
         self.run_posit_op(self.posit_n6e2_3o2_bits, '/', self.posit_n6e2_1_bits, self.posit_n6e2_3o2_bits, 6, 2)
 
 
+    def test_truediv_wide(self):
+        rng = random.Random(18)
+        for (nbits, es) in [(32,2), (64,3), (128,4), (256,5)]:
+            for i in range(200):
+                abits = rng.getrandbits(nbits)
+                bbits = rng.getrandbits(nbits)
+                a = PCPosit(abits, mode='bits', nbits=nbits, es=es)
+                b = PCPosit(bbits, mode='bits', nbits=nbits, es=es)
+                cbits = coder.encode_posit_binary((a / b).rep)
+                special = verify._special_result('div', abits, bbits, nbits)
+                if special is not None:
+                    self.assertEqual(cbits, special)
+                    continue
+                exact = verify._exact_result('div', abits, bbits, nbits, es)
+                self.assertTrue(verify.is_correctly_rounded(cbits, exact, nbits, es), (nbits, es, abits, bbits))
+
+        # Quotients beyond maxpos and minpos saturate.
+        maxpos = PCPosit((1 << 63) - 1, mode='bits', nbits=64, es=3)
+        minpos = PCPosit(1, mode='bits', nbits=64, es=3)
+        self.assertEqual(maxpos / minpos, maxpos)
+        self.assertEqual(minpos / maxpos, minpos)
+        self.assertEqual(-minpos / maxpos, -minpos)
+
+
+    def test_sqrt(self):
+        self.assert_posit_bits(PCPosit(self.posit_n6e2_1o4_bits, mode='bits', nbits=6, es=2).sqrt(), self.posit_n6e2_1o2_bits)
+        self.assert_posit_bits(PCPosit(self.posit_n6e2_2_bits, mode='bits', nbits=6, es=2).sqrt(), self.posit_n6e2_3o2_bits)  # 1.414 ~> 3/2
+        self.assertEqual(PCPosit('0', nbits=6, es=2).sqrt().rep.t, 'z')
+        self.assertEqual(PCPosit('cinf', nbits=6, es=2).sqrt().rep.t, 'c')
+        self.assertEqual(PCPosit(self.posit_n6e2_m1o2_bits, mode='bits', nbits=6, es=2).sqrt().rep.t, 'c')
+
+        rng = random.Random(20)
+        for (nbits, es) in [(8, 0), (16, 1), (32, 2), (64, 3), (256, 5)]:
+            for i in range(200):
+                abits = rng.getrandbits(nbits - 1)
+                if abits == 0:
+                    continue
+                cbits = coder.encode_posit_binary(PCPosit(abits, mode='bits', nbits=nbits, es=es).sqrt().rep)
+                self.assertTrue(verify.is_correctly_rounded_sqrt(cbits, abits, nbits, es), (nbits, es, abits))
+
+
+    def test_lazy_rep(self):
+        a = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+
+        # Rounded results are decoded once, on the first read of rep.
+        decode = coder.decode_posit_binary
+        calls = []
+        coder.decode_posit_binary = lambda *args, **kwargs: calls.append(args) or decode(*args, **kwargs)
+        try:
+            c = a * a
+            self.assertEqual(c.order_key(), self.posit_n6e2_2_bits)
+            self.assertEqual((c.nbits, c.es), (6, 2))
+            self.assertEqual(len(calls), 0)
+            self.assertEqual(c.rep, decode(self.posit_n6e2_2_bits, 6, 2))
+            self.assertIs(c.rep, c.rep)
+            self.assertEqual(len(calls), 1)
+        finally:
+            coder.decode_posit_binary = decode
+
+        self.assertRaises(AttributeError, getattr, c, 'reps')
+        self.assertRaises(AttributeError, getattr, c, 'nbitz')
+
+        z = a - a
+        self.assertEqual(z.rep.t, 'z')
+        self.assertEqual(z.order_key(), 0)
+        self.assertEqual((z.nbits, z.es), (6, 2))
+
+
+    def test_subclass_results(self):
+        class SubPosit(PCPosit):
+            pass
+
+        a = SubPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+        for p in [a * a, a + a, a / a, a - a, a.sqrt(), a.fma(a, a), SubPosit.fsum([a, a]), SubPosit.fsum([a, -a])]:
+            self.assertIsInstance(p, SubPosit)
+
+
     def test_create_pcposit_from_large_int_bits(self):
         p0 = PCPosit(3**80, mode='bits', nbits=256, es=2)
         p1 = PCPosit(5**90, mode='bits', nbits=256, es=2)
@@ -123,6 +206,292 @@ class TestPCPosit(unittest.TestCase):
         p5 = p0 / p1
 
 
+    def test_convert_config(self):
+        a = PCPosit(self.posit_n6e2_3o16_bits, mode='bits', nbits=6, es=2)
+        b = PCPosit(a, nbits=32, es=2)
+        self.assertEqual((b.rep.nbits, b.rep.es), (32, 2))
+        self.assertEqual(b.to_fraction(), a.to_fraction())
+        self.assertEqual(PCPosit(b, nbits=6, es=2).rep, a.rep)
+
+        self.assertEqual(PCPosit(PCPosit(1.75, nbits=16, es=1), nbits=6, es=2).rep.t, 'n')
+        self.assert_posit_bits(PCPosit(PCPosit(1.75, nbits=16, es=1), nbits=6, es=2), self.posit_n6e2_2_bits)   # Tie to even.
+        self.assert_posit_bits(PCPosit(PCPosit(2**40, nbits=32, es=2), nbits=6, es=2), 0x1F)
+        self.assertEqual(PCPosit(PCPosit('cinf', nbits=6, es=2), nbits=16, es=1).rep.t, 'c')
+        self.assertEqual(PCPosit(PCPosit('0', nbits=6, es=2), nbits=16, es=1).rep.t, 'z')
+        self.assertEqual(PCPosit(a, es=0).rep.nbits, 6)
+
+
+    def test_hash(self):
+        a = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+        b = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+        c = PCPosit(self.posit_n6e2_m3o16_bits, mode='bits', nbits=6, es=2)
+
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(len(set([a, b, c, PCPosit('0', nbits=6, es=2), PCPosit('0', nbits=8, es=0)])), 3)
+        self.assertEqual({a: 1}[b], 1)
+        self.assertEqual(hash(a), hash(1.5))
+        self.assertEqual(hash(c), hash(Fraction(-3, 16)))
+        self.assertEqual(hash(PCPosit(-1, nbits=6, es=2)), hash(-1))
+        self.assertEqual(hash(PCPosit('cinf', nbits=6, es=2)), hash(PCPosit('cinf', nbits=6, es=2)))
+
+        rng = random.Random(3)
+        for (nbits, es) in [(16, 1), (32, 2), (64, 3), (256, 5)]:
+            for i in range(200):
+                p = PCPosit(rng.getrandbits(nbits-1), mode='bits', nbits=nbits, es=es)
+                self.assertEqual(hash(p), hash(p.to_fraction()))
+
+
+    def test_interning(self):
+        try:
+            pcposit.set_interning(True)
+            self.assertTrue(pcposit.is_interning())
+
+            a = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+            self.assertIs(PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2), a)
+            self.assertIsNot(PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=1), a)
+            self.assertIsNot(PCPosit(a), a)
+            self.assert_posit_bits(a, self.posit_n6e2_3o2_bits)
+            self.assert_posit_bits(a + a, self.posit_n6e2_3_bits)
+
+            # Bounded pool for large nbits.
+            size = pcposit.INTERN_POOL_SIZE
+            pcposit.INTERN_POOL_SIZE = 4
+            try:
+                ps = [ PCPosit(bits, mode='bits', nbits=64, es=3) for bits in range(1, 11) ]
+                self.assertLessEqual(len(pcposit._intern_pools[(64, 3)]), 4)
+                self.assertEqual([ coder.encode_posit_binary(p.rep) for p in ps ], list(range(1, 11)))
+            finally:
+                pcposit.INTERN_POOL_SIZE = size
+        finally:
+            pcposit.set_interning(False)
+
+        self.assertIsNot(PCPosit(self.posit_n6e2_1_bits, mode='bits', nbits=6, es=2), PCPosit(self.posit_n6e2_1_bits, mode='bits', nbits=6, es=2))
+
+
+    def test_order_key(self):
+        rng = random.Random(8)
+        for (nbits, es) in [(6, 2), (32, 2)]:
+            bits = [0, 1 << (nbits-1)] + [ rng.getrandbits(nbits) for i in range(200) ]
+            ps = [ PCPosit(v, mode='bits', nbits=nbits, es=es) for v in bits ]
+            ps += [ -p for p in ps ] + [ p * p for p in ps ]
+            ordered = sorted(ps, key=PCPosit.order_key)
+
+            self.assertEqual(ordered[0].rep.t, 'c')
+            finite = [ p for p in ordered if p.rep.t != 'c' ]
+            self.assertEqual([ p.to_fraction() for p in finite ], sorted(p.to_fraction() for p in finite))
+            for (a, b) in zip(finite, finite[1:]):
+                self.assertTrue(a <= b)
+                self.assertEqual(a < b, a.to_fraction() < b.to_fraction())
+
+        # Mixed configurations compare by value.
+        self.assertTrue(PCPosit(1.5, nbits=6, es=2) < PCPosit(1.75, nbits=16, es=1))
+        self.assertFalse(PCPosit(2, nbits=6, es=2) > PCPosit(2, nbits=16, es=1))
+
+
+    def test_fma(self):
+        a = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+        b = PCPosit(self.posit_n6e2_2_bits, mode='bits', nbits=6, es=2)
+        cinf = PCPosit(self.posit_n6e2_cinf_bits, mode='bits', nbits=6, es=2)
+
+        # 9/4 - 2 = 1/4 exactly, but a*a rounds to 2 first when unfused.
+        self.assertEqual(coder.encode_posit_binary((a*a - b).rep), 0)
+        self.assertEqual(coder.encode_posit_binary(a.fms(a, b).rep), self.posit_n6e2_1o4_bits)
+        self.assertEqual(coder.encode_posit_binary(a.fma(a, -b).rep), self.posit_n6e2_1o4_bits)
+        self.assertEqual(coder.encode_posit_binary(PCPosit.fma(a, PCPosit('0', nbits=6, es=2), b).rep), self.posit_n6e2_2_bits)
+        self.assertEqual(a.fma(a, cinf).rep.t, 'c')
+
+        # Scalars round to the configuration of a, other configurations are rejected.
+        self.assertEqual(coder.encode_posit_binary(a.fms(a, 2).rep), self.posit_n6e2_1o4_bits)
+        other = PCPosit(self.posit_n6e2_1_bits, mode='bits', nbits=6, es=1)
+        self.assertRaises(NotImplementedError, a.fma, other, b)
+        self.assertRaises(NotImplementedError, a.fms, b, other)
+        self.assertRaises(NotImplementedError, other.fma, a, a)
+        self.assertRaises(TypeError, a.fma, b, 'x')
+        self.assertRaises(TypeError, a.fms, None, b)
+
+
+    def test_fma_exhaustive(self):
+        nbits = 5
+        es = 1
+        ps = [ PCPosit(v, mode='bits', nbits=nbits, es=es) for v in range(2**nbits) ]
+        for a in ps:
+            for b in ps:
+                for c in ps:
+                    p = a.fma(b, c)
+                    if a.rep.t == 'c' or b.rep.t == 'c' or c.rep.t == 'c':
+                        self.assertEqual(p.rep.t, 'c')
+                        continue
+                    (xa,ma) = a._fixedpoint()
+                    (xb,mb) = b._fixedpoint()
+                    (xc,mc) = c._fixedpoint()
+                    m = min(ma+mb, mc)
+                    ref = PCPosit._fixedpoint_to_posit((xa*xb << (ma+mb-m)) + (xc << (mc-m)), m, nbits=nbits, es=es)
+                    self.assertEqual(coder.encode_posit_binary(p.rep), coder.encode_posit_binary(ref.rep))
+
+
+    def test_fdp(self):
+        a = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+        one = PCPosit(self.posit_n6e2_1_bits, mode='bits', nbits=6, es=2)
+        m2 = PCPosit(self.posit_n6e2_2_bits, mode='bits', nbits=6, es=2)
+        cinf = PCPosit(self.posit_n6e2_cinf_bits, mode='bits', nbits=6, es=2)
+
+        self.assertEqual(coder.encode_posit_binary(PCPosit.fdp([a, one], [a, -m2]).rep), self.posit_n6e2_1o4_bits)
+        self.assertEqual(PCPosit.fdp([a, cinf], [a, one]).rep.t, 'c')
+        self.assertEqual(PCPosit.fdp([], [], nbits=6, es=2).rep.t, 'z')
+        self.assertRaises(ValueError, PCPosit.fdp, [a], [])
+        self.assertRaises(NotImplementedError, PCPosit.fdp, [a], [PCPosit(self.posit_n6e2_1_bits, mode='bits', nbits=6, es=1)])
+        self.assertEqual(coder.encode_posit_binary(PCPosit.fdp([a, 1], [1.5, -m2]).rep), self.posit_n6e2_1o4_bits)
+        self.assertRaises(TypeError, PCPosit.fdp, [a], [None])
+
+
+    def test_fsum(self):
+        a = PCPosit(self.posit_n6e2_3_bits, mode='bits', nbits=6, es=2)
+        b = PCPosit(self.posit_n6e2_3o16_bits, mode='bits', nbits=6, es=2)
+
+        # 3 + 3/16 rounds to 3 when unfused.
+        self.assertEqual(coder.encode_posit_binary((a + b - a).rep), 0)
+        self.assertEqual(coder.encode_posit_binary(PCPosit.fsum([a, b, -a]).rep), self.posit_n6e2_3o16_bits)
+        self.assertEqual(PCPosit.fsum([]).rep.t, 'z')
+        self.assertEqual(PCPosit.fsum([a, PCPosit('cinf', nbits=6, es=2)]).rep.t, 'c')
+
+        # Scalars round to the configuration of the posits, or the one given.
+        self.assertEqual(coder.encode_posit_binary(PCPosit.fsum([3, b, -a]).rep), self.posit_n6e2_3o16_bits)
+        self.assertEqual(coder.encode_posit_binary(PCPosit.fsum([3, 0.1875, -3], nbits=6, es=2).rep), self.posit_n6e2_3o16_bits)
+        self.assertEqual(PCPosit.fsum([1.5, 2]).rep.nbits, 32)
+        self.assertEqual(PCPosit.fsum([float('inf'), a]).rep.t, 'c')
+        self.assertRaises(TypeError, PCPosit.fsum, [a, 'x'])
+        self.assertRaises(TypeError, PCPosit.fsum, [a, None])
+
+
+    def assert_posit_bits(self, p, ref_bits):
+        self.assertEqual(coder.encode_posit_binary(p.rep), ref_bits)
+
+
+    def test_create_pcposit_from_int(self):
+        self.assert_posit_bits(PCPosit(1, nbits=6, es=2), self.posit_n6e2_1_bits)
+        self.assert_posit_bits(PCPosit(3, nbits=6, es=2), self.posit_n6e2_3_bits)
+        self.assert_posit_bits(PCPosit(0, nbits=6, es=2), 0)
+        self.assert_posit_bits(PCPosit(-1, nbits=6, es=2), (-self.posit_n6e2_1_bits) & 0x3F)
+        self.assert_posit_bits(PCPosit(10**30, nbits=6, es=2), 0x1F)       # maxpos
+        self.assert_posit_bits(PCPosit(5, nbits=6, es=2), 0x14)            # 5 ~> 4
+
+
+    def test_create_pcposit_from_float(self):
+        self.assert_posit_bits(PCPosit(1.5, nbits=6, es=2), self.posit_n6e2_3o2_bits)
+        self.assert_posit_bits(PCPosit(-0.1875, nbits=6, es=2), self.posit_n6e2_m3o16_bits)
+        self.assert_posit_bits(PCPosit(-0.0, nbits=6, es=2), 0)
+        self.assert_posit_bits(PCPosit(1e-300, nbits=6, es=2), 0x01)       # Never round to 0.
+        self.assertEqual(PCPosit(float('inf'), nbits=6, es=2).rep.t, 'c')
+        self.assertEqual(PCPosit(float('nan'), nbits=6, es=2).rep.t, 'c')
+
+        rng = random.Random(5)
+        for i in range(200):
+            v = rng.uniform(-4, 4) * 2.0**rng.randint(-60, 60)
+            p = PCPosit(v, nbits=32, es=2)
+            ref = PCPosit._fixedpoint_to_posit(Fraction(v).numerator, -(Fraction(v).denominator.bit_length()-1), nbits=32, es=2)
+            self.assertEqual(p.rep, ref.rep)
+
+        # Subnormal doubles.
+        (x, m) = PCPosit(5e-324, nbits=128, es=4)._fixedpoint()
+        self.assertEqual(Fraction(x) * Fraction(2)**m, Fraction(5e-324))
+
+
+    def test_create_pcposit_from_fraction(self):
+        self.assert_posit_bits(PCPosit(Fraction(3, 16), nbits=6, es=2), self.posit_n6e2_3o16_bits)
+        self.assert_posit_bits(PCPosit(Fraction(7, 2), nbits=6, es=2), 0x14)   # 7/2 ~> 4
+
+        # The result must agree with rounding a tight dyadic bracket whenever both ends agree.
+        rng = random.Random(7)
+        for (nbits, es) in [(6, 2), (8, 0), (16, 1), (32, 2)]:
+            for i in range(200):
+                v = Fraction(rng.randint(-10**6, 10**6), rng.randint(1, 10**6))
+                if v == 0:
+                    continue
+                lo = (v.numerator << 200) // v.denominator
+                rlo = PCPosit._fixedpoint_to_posit(lo, -200, nbits=nbits, es=es)
+                rhi = PCPosit._fixedpoint_to_posit(lo + 1, -200, nbits=nbits, es=es)
+                if rlo.rep == rhi.rep:
+                    self.assertEqual(PCPosit(v, nbits=nbits, es=es).rep, rlo.rep)
+
+
+    def test_create_pcposit_from_decimal(self):
+        self.assert_posit_bits(PCPosit(Decimal('-0.75'), nbits=6, es=2), self.posit_n6e2_m3o4_bits)
+        self.assertEqual(PCPosit(Decimal('0.1'), nbits=16, es=1).rep, PCPosit(Fraction(1, 10), nbits=16, es=1).rep)
+        self.assertEqual(PCPosit(Decimal('NaN'), nbits=6, es=2).rep.t, 'c')
+        self.assertEqual(PCPosit(Decimal('-Infinity'), nbits=6, es=2).rep.t, 'c')
+        self.assertRaises(ValueError, PCPosit, 1j)
+
+
+    def test_mixed_scalar_operands(self):
+        a = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+
+        self.assert_posit_bits(a + 1.5, self.posit_n6e2_3_bits)
+        self.assert_posit_bits(1.5 + a, self.posit_n6e2_3_bits)
+        self.assert_posit_bits(a - 1, self.posit_n6e2_1o2_bits)
+        self.assert_posit_bits(3 - a, self.posit_n6e2_3o2_bits)
+        self.assert_posit_bits(a * Fraction(1, 2), self.posit_n6e2_3o4_bits)
+        self.assert_posit_bits(2 * a, self.posit_n6e2_3_bits)
+        self.assert_posit_bits(a / Decimal(2), self.posit_n6e2_3o4_bits)
+        self.assert_posit_bits(3 / a, self.posit_n6e2_2_bits)
+        self.assertRaises(TypeError, lambda: a + 'x')
+        self.assertRaises(TypeError, lambda: 'x' * a)
+
+
+    def test_cmp_scalar(self):
+        a = PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2)
+        cinf = PCPosit(self.posit_n6e2_cinf_bits, mode='bits', nbits=6, es=2)
+
+        self.assertTrue(a == 1.5)
+        self.assertTrue(1.5 == a)
+        self.assertTrue(a != Fraction(3, 2) + Fraction(1, 1000))
+        self.assertTrue(a < Fraction(3, 2) + Fraction(1, 1000))
+        self.assertTrue(a >= Decimal('1.5'))
+        self.assertTrue(2 > a)
+        self.assertTrue(a < float('inf'))
+        self.assertFalse(a == float('nan'))
+        self.assertTrue(a != float('nan'))
+        self.assertFalse(cinf == 0)
+        self.assertFalse(cinf < 1)
+        self.assertFalse(a == 'x')
+        self.assertTrue(a != 'x')
+
+
+    def test_float(self):
+        self.assertEqual(float(PCPosit(self.posit_n6e2_m3o16_bits, mode='bits', nbits=6, es=2)), -0.1875)
+        self.assertEqual(float(PCPosit('0', nbits=6, es=2)), 0.0)
+        self.assertTrue(math.isnan(float(PCPosit('cinf', nbits=6, es=2))))
+
+        # Correctly rounded, 2^60 + 2^7 + 1 is nearer to 2^60 + 2^8 than to 2^60.
+        p = PCPosit(2**60 + 2**7 + 1, nbits=128, es=2)
+        self.assertEqual(float(p), float(2**60 + 2**8))
+
+        rng = random.Random(9)
+        for (nbits, es) in [(16, 1), (32, 2), (64, 3), (128, 4)]:
+            for i in range(200):
+                p = PCPosit(rng.getrandbits(nbits-1), mode='bits', nbits=nbits, es=es)
+                try:
+                    ref = float(p.to_fraction())
+                except OverflowError:
+                    ref = float('inf')
+                self.assertEqual(float(p), ref)
+                self.assertEqual(float(-p), -ref)
+
+
+    def test_int(self):
+        self.assertEqual(int(PCPosit(self.posit_n6e2_3_bits, mode='bits', nbits=6, es=2)), 3)
+        self.assertEqual(int(PCPosit(self.posit_n6e2_m3o2_bits, mode='bits', nbits=6, es=2)), -1)
+        self.assertEqual(int(PCPosit(self.posit_n6e2_3o4_bits, mode='bits', nbits=6, es=2)), 0)
+        self.assertEqual(int(PCPosit(2**100, nbits=64, es=3)), 2**100)
+        self.assertRaises(ValueError, int, PCPosit('cinf', nbits=6, es=2))
+
+
+    def test_to_fraction(self):
+        self.assertEqual(PCPosit(self.posit_n6e2_m3o16_bits, mode='bits', nbits=6, es=2).to_fraction(), Fraction(-3, 16))
+        self.assertEqual(PCPosit(self.posit_n6e2_3_bits, mode='bits', nbits=6, es=2).to_fraction(), 3)
+        self.assertEqual(PCPosit('0', nbits=6, es=2).to_fraction(), 0)
+        self.assertRaises(ValueError, PCPosit('cinf', nbits=6, es=2).to_fraction)
+
+
     @unittest.skip("Not implemented.")
     def test_floordiv(self):
         raise NotImplementedError
@@ -0,0 +1,304 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+from decimal   import Decimal
+from fractions import Fraction
+import math
+import random
+import unittest
+
+from sgposit         import coder
+from sgposit.pcposit import PCPosit
+from sgposit         import posit
+from sgposit.posit   import Posit
+from sgposit         import verify
+
+
+class TestPosit(unittest.TestCase):
+
+    def setUp(self):
+        self.posit_n6e2_m1o16_bits = 0x38
+        self.posit_n6e2_m1o2_bits = 0x32
+        self.posit_n6e2_m1o64_bits = 0x3A
+        self.posit_n6e2_m3o2_bits = 0x2F
+        self.posit_n6e2_m3o4_bits = 0x31
+        self.posit_n6e2_m3o8_bits = 0x33
+        self.posit_n6e2_m3o16_bits = 0x35
+
+        self.posit_n6e2_1_bits = 0x10
+        self.posit_n6e2_1o2_bits = 0x0E
+        self.posit_n6e2_1o4_bits = 0x0C
+        self.posit_n6e2_1o8_bits = 0x0A
+        self.posit_n6e2_2_bits = 0x12
+        self.posit_n6e2_3_bits = 0x13
+        self.posit_n6e2_3o2_bits = 0x11
+        self.posit_n6e2_3o4_bits = 0x0F
+        self.posit_n6e2_3o16_bits = 0x0B
+        self.posit_n6e2_3o8_bits = 0x0D
+        self.posit_n6e2_cinf_bits = 0x20
+
+
+    def tearDown(self):
+        pass
+
+
+    def run_posit_op(self, abits=None, op_str=None, bbits=None, ref_cbits=None, nbits=None, es=None):
+        a = Posit(abits, nbits=nbits, es=es, mode='bits')
+        b = Posit(bbits, nbits=nbits, es=es, mode='bits')
+        c = None
+
+        if op_str == '+':
+            c = a + b
+        elif op_str == '-':
+            c = a - b
+        elif op_str == '*':
+            c = a * b
+        elif op_str == '/':
+            c = a / b
+        elif op_str == 'u-':
+            c = -a
+        else:
+            raise NotImplementedError("op={}".format(op_str))
+
+        self.assertEqual(c.bits, ref_cbits)
+
+
+    def test_add_simple(self):
+        self.run_posit_op(self.posit_n6e2_3o2_bits, '+', self.posit_n6e2_3o2_bits, self.posit_n6e2_3_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_1o4_bits, '+', self.posit_n6e2_3o4_bits, self.posit_n6e2_1_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_1o8_bits, '+', self.posit_n6e2_m3o16_bits, self.posit_n6e2_m1o16_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_3o8_bits, '+', self.posit_n6e2_3o4_bits, self.posit_n6e2_1_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_3o2_bits, '+', self.posit_n6e2_1_bits, self.posit_n6e2_2_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_cinf_bits, '+', self.posit_n6e2_1_bits, self.posit_n6e2_cinf_bits, 6, 2)
+        self.run_posit_op(0, '+', self.posit_n6e2_m3o8_bits, self.posit_n6e2_m3o8_bits, 6, 2)
+
+
+    def test_sub_simple(self):
+        self.run_posit_op(self.posit_n6e2_3o2_bits, '-', self.posit_n6e2_3o2_bits, 0, 6, 2)
+        self.run_posit_op(self.posit_n6e2_1o4_bits, '-', self.posit_n6e2_3o4_bits, self.posit_n6e2_m1o2_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_1o8_bits, '-', self.posit_n6e2_m3o16_bits, self.posit_n6e2_1o4_bits, 6, 2) # result: 5/16 ~> 1/4
+        self.run_posit_op(self.posit_n6e2_3o8_bits, '-', self.posit_n6e2_3o4_bits, self.posit_n6e2_m3o8_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_3o2_bits, '-', self.posit_n6e2_1_bits, self.posit_n6e2_1o2_bits, 6, 2)
+        self.run_posit_op(0, '-', self.posit_n6e2_3o8_bits, self.posit_n6e2_m3o8_bits, 6, 2)
+
+
+    def test_neg_simple(self):
+        self.run_posit_op(self.posit_n6e2_3o2_bits, 'u-', None, self.posit_n6e2_m3o2_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_m3o16_bits, 'u-', None, self.posit_n6e2_3o16_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_cinf_bits, 'u-', None, self.posit_n6e2_cinf_bits, 6, 2)
+        self.run_posit_op(0, 'u-', None, 0, 6, 2)
+
+
+    def test_mul_simple(self):
+        self.run_posit_op(self.posit_n6e2_3o2_bits, '*', self.posit_n6e2_3o2_bits, self.posit_n6e2_2_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_1o4_bits, '*', self.posit_n6e2_3o4_bits, self.posit_n6e2_3o16_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_1o8_bits, '*', self.posit_n6e2_m3o16_bits, self.posit_n6e2_m1o64_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_3o8_bits, '*', self.posit_n6e2_3o4_bits, self.posit_n6e2_1o4_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_3o2_bits, '*', self.posit_n6e2_1_bits, self.posit_n6e2_3o2_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_cinf_bits, '*', 0, self.posit_n6e2_cinf_bits, 6, 2)
+
+
+    def test_truediv_simple(self):
+        self.run_posit_op(self.posit_n6e2_3o2_bits, '/', self.posit_n6e2_3o2_bits, self.posit_n6e2_1_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_1o4_bits, '/', self.posit_n6e2_3o4_bits, self.posit_n6e2_3o8_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_1o8_bits, '/', self.posit_n6e2_m3o16_bits, self.posit_n6e2_m3o4_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_3o8_bits, '/', self.posit_n6e2_3o4_bits, self.posit_n6e2_1o2_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_3o2_bits, '/', self.posit_n6e2_1_bits, self.posit_n6e2_3o2_bits, 6, 2)
+        self.run_posit_op(self.posit_n6e2_3o2_bits, '/', 0, self.posit_n6e2_cinf_bits, 6, 2)
+        self.run_posit_op(0, '/', self.posit_n6e2_cinf_bits, 0, 6, 2)
+
+
+    def test_cmp(self):
+        values = [ self.posit_n6e2_m3o2_bits, self.posit_n6e2_m3o4_bits, self.posit_n6e2_m1o16_bits, 0,
+                   self.posit_n6e2_1o8_bits, self.posit_n6e2_1_bits, self.posit_n6e2_3_bits ]
+
+        for i, abits in enumerate(values):
+            for j, bbits in enumerate(values):
+                a = Posit(abits, nbits=6, es=2, mode='bits')
+                b = Posit(bbits, nbits=6, es=2, mode='bits')
+                self.assertEqual(a == b, i == j)
+                self.assertEqual(a != b, i != j)
+                self.assertEqual(a < b, i < j)
+                self.assertEqual(a <= b, i <= j)
+                self.assertEqual(a > b, i > j)
+                self.assertEqual(a >= b, i >= j)
+
+
+    def test_cmp_cinf(self):
+        cinf = Posit('cinf', nbits=6, es=2)
+        one = Posit(self.posit_n6e2_1_bits, nbits=6, es=2, mode='bits')
+
+        self.assertFalse(cinf == cinf)
+        self.assertTrue(cinf != cinf)
+        self.assertFalse(cinf < one)
+        self.assertFalse(one >= cinf)
+
+
+    def test_str(self):
+        self.assertEqual(str(Posit(self.posit_n6e2_3o16_bits, nbits=6, es=2, mode='bits')), '3/16')
+        self.assertEqual(str(Posit(self.posit_n6e2_m3o2_bits, nbits=6, es=2, mode='bits')), '-1-1/2')
+        self.assertEqual(str(Posit('cinf', nbits=6, es=2)), 'cinf')
+        self.assertEqual(str(Posit(nbits=6, es=2)), '0')
+
+
+    def test_numeric_conversion(self):
+        rng = random.Random(4)
+        for (nbits, es) in [(6, 2), (16, 1), (64, 3)]:
+            for i in range(100):
+                bits = rng.getrandbits(nbits)
+                p = PCPosit(bits, mode='bits', nbits=nbits, es=es)
+                q = Posit(bits, mode='bits', nbits=nbits, es=es)
+                if bits == 1 << (nbits-1):
+                    self.assertTrue(math.isnan(float(q)))
+                    self.assertRaises(ValueError, int, q)
+                    self.assertRaises(ValueError, q.to_fraction)
+                    continue
+                self.assertEqual(float(q), float(p))
+                self.assertEqual(int(q), int(p))
+                self.assertEqual(q.to_fraction(), p.to_fraction())
+
+
+    def test_hash(self):
+        rng = random.Random(6)
+        for (nbits, es) in [(6, 2), (32, 2), (128, 4)]:
+            for i in range(100):
+                bits = rng.getrandbits(nbits)
+                p = PCPosit(bits, mode='bits', nbits=nbits, es=es)
+                q = Posit(bits, mode='bits', nbits=nbits, es=es)
+                self.assertEqual(hash(q), hash(Posit(bits, mode='bits', nbits=nbits, es=es)))
+                if bits != 1 << (nbits-1):
+                    self.assertEqual(hash(q), hash(p))
+
+
+    def test_cmp_scalar(self):
+        one = Posit(1 << 30, mode='bits')
+        half = Posit(self.posit_n6e2_1o2_bits, nbits=6, es=2, mode='bits')
+        cinf = Posit('cinf', nbits=6, es=2)
+
+        self.assertTrue(one == 1 and 1 == one and one == 1.0 and one == Fraction(1))
+        self.assertTrue(half == 0.5 and half != 1 and half < 1 and 0.25 < half and half <= Decimal('0.5'))
+        self.assertTrue(half < float('inf') and half > float('-inf'))
+        self.assertFalse(half == float('nan') or half < float('nan'))
+        self.assertFalse(cinf == 0 or cinf < 1 or cinf > 1)
+        self.assertTrue(cinf != 0)
+
+        self.assertFalse(one == None)
+        self.assertTrue(one != None)
+        self.assertFalse(one == 'one')
+        self.assertFalse(one == PCPosit(1, nbits=32, es=2))
+        self.assertRaises(TypeError, lambda: one < None)
+
+
+    def test_hash_mixed_keys(self):
+        one = Posit(1 << 30, mode='bits')
+        half = Posit(self.posit_n6e2_1o2_bits, nbits=6, es=2, mode='bits')
+        cinf = Posit('cinf', nbits=6, es=2)
+
+        d = {1: 'a', 0.5: 'b', 'one': 'c', None: 'd'}
+        self.assertEqual(d.get(one), 'a')
+        self.assertEqual(d.get(half), 'b')
+        self.assertEqual(d.get(cinf), None)
+        self.assertEqual(len({one, 1, half, 0.5, Fraction(1, 2), None}), 3)
+        self.assertEqual(len({cinf, Posit('cinf', nbits=6, es=2), one}), 3)
+        self.assertEqual({one: 'x'}[1.0], 'x')
+
+
+    def test_create_posit_invalid(self):
+        self.assertRaises(ValueError, Posit, 1 << 6, mode='bits', nbits=6, es=2)
+        self.assertRaises(ValueError, Posit, 'one', nbits=6, es=2)
+
+
+    def test_convert_config(self):
+        a = Posit(self.posit_n6e2_3o16_bits, nbits=6, es=2, mode='bits')
+        self.assertEqual(Posit(a, nbits=8, es=2).bits, self.posit_n6e2_3o16_bits << 2)
+        self.assertEqual(Posit(a, es=1).nbits, 6)
+        self.assertEqual(Posit(Posit('cinf', nbits=6, es=2), nbits=16, es=1).bits, 1 << 15)
+
+        for nbits in range(2, 7):
+            for es in range(0, 3):
+                for to_nbits in range(2, 9):
+                    for to_es in range(0, 3):
+                        for bits in range(2**nbits):
+                            p = PCPosit(bits, mode='bits', nbits=nbits, es=es)
+                            q = Posit(bits, mode='bits', nbits=nbits, es=es)
+                            ref = coder.encode_posit_binary(PCPosit(p, nbits=to_nbits, es=to_es).rep)
+                            self.assertEqual(Posit(q, nbits=to_nbits, es=to_es).bits, ref)
+
+
+    def test_mismatched_config(self):
+        a = Posit(self.posit_n6e2_1_bits, nbits=6, es=2, mode='bits')
+        b = Posit(self.posit_n6e2_1_bits, nbits=6, es=1, mode='bits')
+        self.assertRaises(NotImplementedError, lambda: a + b)
+
+
+    def test_create_posit_from_large_int_bits(self):
+        a = [ 3**80, 5**90 ]
+        pa = [ PCPosit(bits, mode='bits', nbits=256, es=2) for bits in a ]
+        qa = [ Posit(bits, mode='bits', nbits=256, es=2) for bits in a ]
+
+        self.assertEqual((qa[0] + qa[1]).bits, coder.encode_posit_binary((pa[0] + pa[1]).rep))
+        self.assertEqual((qa[0] - qa[1]).bits, coder.encode_posit_binary((pa[0] - pa[1]).rep))
+        self.assertEqual((qa[0] * qa[1]).bits, coder.encode_posit_binary((pa[0] * pa[1]).rep))
+        self.assertEqual((qa[0] / qa[1]).bits, coder.encode_posit_binary((pa[0] / pa[1]).rep))
+
+
+    def test_random_against_pcposit(self):
+        rng = random.Random(20180601)
+        for (nbits, es) in [(10, 1), (16, 1), (32, 2), (64, 3), (128, 4)]:
+            for i in range(200):
+                abits = rng.getrandbits(nbits)
+                bbits = rng.getrandbits(nbits)
+                pa = PCPosit(abits, mode='bits', nbits=nbits, es=es)
+                pb = PCPosit(bbits, mode='bits', nbits=nbits, es=es)
+                qa = Posit(abits, mode='bits', nbits=nbits, es=es)
+                qb = Posit(bbits, mode='bits', nbits=nbits, es=es)
+
+                self.assertEqual((qa + qb).bits, coder.encode_posit_binary((pa + pb).rep))
+                self.assertEqual((qa - qb).bits, coder.encode_posit_binary((pa - pb).rep))
+                self.assertEqual((qa * qb).bits, coder.encode_posit_binary((pa * pb).rep))
+                self.assertEqual((qa / qb).bits, coder.encode_posit_binary((pa / pb).rep))
+                self.assertEqual(qa < qb, pa < pb)
+                self.assertEqual(qa.sqrt().bits, coder.encode_posit_binary(pa.sqrt().rep))
+
+
+    def test_sqrt(self):
+        self.assertEqual(Posit(0x6000, mode='bits', nbits=16, es=1).sqrt().bits, 0x5000)      # sqrt(4) = 2
+        self.assertEqual(Posit(0, mode='bits', nbits=16, es=1).sqrt().bits, 0)
+        self.assertEqual(Posit(0x8000, mode='bits', nbits=16, es=1).sqrt().bits, 0x8000)
+        self.assertEqual(Posit(0xC000, mode='bits', nbits=16, es=1).sqrt().bits, 0x8000)    # sqrt(-1)
+
+        # Exhaustive up to nbits=16 against the exact root.
+        for (nbits, es) in [(2, 0), (5, 1), (8, 0), (8, 2), (12, 1), (16, 0), (16, 1), (16, 2), (16, 3)]:
+            for abits in range(1, 1 << (nbits-1)):
+                cbits = posit.sqrt_posit_binary(abits, nbits, es)
+                self.assertTrue(verify.is_correctly_rounded_sqrt(cbits, abits, nbits, es), (nbits, es, abits, cbits))
+
+
+    @unittest.skip("Not implemented.")
+    def test_floordiv(self):
+        raise NotImplementedError
+
+
+if __name__ == '__main__':
+    unittest.main()
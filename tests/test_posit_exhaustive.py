@@ -0,0 +1,132 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import operator
+import os
+import unittest
+
+from sgposit         import coder
+from sgposit.pcposit import PCPosit
+from sgposit.posit   import Posit
+from sgposit         import verify
+
+
+class TestPositExhaustive(unittest.TestCase):
+
+    _multiprocess_can_split_ = True
+
+
+    def setUp(self):
+        self.nbits_range = range(2,9)
+        self.es_range = range(0,3)
+
+
+    def tearDown(self):
+        pass
+
+
+    # Posit (a op b) must be bit-for-bit identical to PCPosit (a op b). As both
+    # share the fixed-point rounding in coder, results are also checked against
+    # the rounding boundaries in verify, and comparisons against Fraction values.
+    def run_posit_2op_exhaustive(self, op_str=None, nbits_range=None, es_range=None):
+        ops = {
+            '+' : (PCPosit.__add__, Posit.__add__, 'add'),
+            '-' : (PCPosit.__sub__, Posit.__sub__, 'sub'),
+            '*' : (PCPosit.__mul__, Posit.__mul__, 'mul'),
+            '/' : (PCPosit.__truediv__, Posit.__truediv__, 'div'),
+            '<' : (PCPosit.__lt__, Posit.__lt__, operator.lt),
+            '==': (PCPosit.__eq__, Posit.__eq__, operator.eq),
+        }
+        if op_str not in ops:
+            raise NotImplementedError("op={}".format(op_str))
+        (refop, op, check) = ops[op_str]
+
+        if nbits_range is None:
+            nbits_range = self.nbits_range
+        if es_range is None:
+            es_range = self.es_range
+
+        for nbits in nbits_range:
+            for es in es_range:
+                pa = [ PCPosit(bits, nbits=nbits, es=es, mode='bits') for bits in range(2**nbits) ]
+                qa = [ Posit(bits, nbits=nbits, es=es, mode='bits') for bits in range(2**nbits) ]
+                fa = [ None if p.rep.t == 'c' else p.to_fraction() for p in pa ]
+                for abits in range(2**nbits):
+                    for bbits in range(2**nbits):
+                        ref = refop(pa[abits], pa[bbits])
+                        out = op(qa[abits], qa[bbits])
+                        test_info = { 'nbits': nbits, 'es': es, 'abits': abits, 'bbits': bbits }
+
+                        if isinstance(ref, PCPosit):
+                            self.assertEqual(out.bits, coder.encode_posit_binary(ref.rep), test_info)
+                            self.assertTrue(verify.is_correct_result(check, abits, bbits, out.bits, nbits, es), test_info)
+                        else:
+                            self.assertEqual(out, ref, test_info)
+                            if fa[abits] is None or fa[bbits] is None:
+                                self.assertFalse(out, test_info)
+                            else:
+                                self.assertEqual(out, check(fa[abits], fa[bbits]), test_info)
+
+
+    def test_add_exhaustive_small(self):
+        self.run_posit_2op_exhaustive('+', nbits_range=range(2,6))
+
+    def test_sub_exhaustive_small(self):
+        self.run_posit_2op_exhaustive('-', nbits_range=range(2,6))
+
+    def test_mul_exhaustive_small(self):
+        self.run_posit_2op_exhaustive('*', nbits_range=range(2,6))
+
+    def test_truediv_exhaustive_small(self):
+        self.run_posit_2op_exhaustive('/', nbits_range=range(2,6))
+
+    def test_cmp_exhaustive_small(self):
+        self.run_posit_2op_exhaustive('<', nbits_range=range(2,6))
+        self.run_posit_2op_exhaustive('==', nbits_range=range(2,6))
+
+
+    @unittest.skipUnless(os.environ.get('SGPOSIT_LONG_TESTS') == '1', 'Long test.')
+    def test_add_exhaustive(self):
+        self.run_posit_2op_exhaustive('+')
+
+    @unittest.skipUnless(os.environ.get('SGPOSIT_LONG_TESTS') == '1', 'Long test.')
+    def test_sub_exhaustive(self):
+        self.run_posit_2op_exhaustive('-')
+
+    @unittest.skipUnless(os.environ.get('SGPOSIT_LONG_TESTS') == '1', 'Long test.')
+    def test_mul_exhaustive(self):
+        self.run_posit_2op_exhaustive('*')
+
+    @unittest.skipUnless(os.environ.get('SGPOSIT_LONG_TESTS') == '1', 'Long test.')
+    def test_truediv_exhaustive(self):
+        self.run_posit_2op_exhaustive('/')
+
+    @unittest.skipUnless(os.environ.get('SGPOSIT_LONG_TESTS') == '1', 'Long test.')
+    def test_cmp_exhaustive(self):
+        self.run_posit_2op_exhaustive('<')
+        self.run_posit_2op_exhaustive('==')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,452 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import unittest
+
+import numpy as np
+
+from sgposit            import coder
+from sgposit            import npquire
+from sgposit            import posit
+from sgposit.pcposit    import PCPosit
+from sgposit.positarray import PositArray, dtype_for_nbits
+from sgposit.quire      import Quire
+
+
+class TestPositArray(unittest.TestCase):
+
+    def setUp(self):
+        self.posit_n6e2_1_bits = 0x10
+        self.posit_n6e2_1o2_bits = 0x0E
+        self.posit_n6e2_1o4_bits = 0x0C
+        self.posit_n6e2_3o2_bits = 0x11
+        self.posit_n6e2_m1o2_bits = 0x32
+        self.posit_n6e2_m3o16_bits = 0x35
+        self.posit_n6e2_cinf_bits = 0x20
+
+
+    def tearDown(self):
+        pass
+
+
+    def all_pairs(self, nbits, es):
+        n = 2**nbits
+        a = PositArray(np.repeat(np.arange(n), n), nbits=nbits, es=es)
+        b = PositArray(np.tile(np.arange(n), n), nbits=nbits, es=es)
+        return (a, b)
+
+
+    def run_array_op(self, op_str=None, nbits=None, es=None):
+        (a, b) = self.all_pairs(nbits, es)
+
+        if op_str == '+':
+            (c, refop) = (a + b, PCPosit.__add__)
+        elif op_str == '-':
+            (c, refop) = (a - b, PCPosit.__sub__)
+        elif op_str == '*':
+            (c, refop) = (a * b, PCPosit.__mul__)
+        elif op_str == '/':
+            (c, refop) = (a / b, PCPosit.__truediv__)
+        else:
+            raise NotImplementedError("op={}".format(op_str))
+
+        self.assertEqual(c.bits.dtype, dtype_for_nbits(nbits))
+        for (pa, pb, pc) in zip(a.tolist(), b.tolist(), c.tolist()):
+            self.assertEqual(coder.encode_posit_binary(pc.rep), coder.encode_posit_binary(refop(pa, pb).rep))
+
+
+    def test_table_ops(self):
+        for op_str in ['+', '-', '*', '/']:
+            self.run_array_op(op_str, 5, 1)
+
+
+    def test_scalar_kernel_ops(self):
+        nbits = 10
+        es = 1
+        rng = np.random.RandomState(7)
+        a = PositArray(rng.randint(0, 2**nbits, 500), nbits=nbits, es=es)
+        b = PositArray(rng.randint(0, 2**nbits, 500), nbits=nbits, es=es)
+
+        for (op, refop) in [(PositArray.__add__, PCPosit.__add__), (PositArray.__sub__, PCPosit.__sub__),
+                            (PositArray.__mul__, PCPosit.__mul__), (PositArray.__truediv__, PCPosit.__truediv__)]:
+            c = op(a, b)
+            self.assertEqual(c.bits.dtype, np.uint16)
+            for (pa, pb, pc) in zip(a.tolist(), b.tolist(), c.tolist()):
+                self.assertEqual(coder.encode_posit_binary(pc.rep), coder.encode_posit_binary(refop(pa, pb).rep))
+
+
+    def test_neg(self):
+        for nbits in [6, 8, 16, 32, 64]:
+            bits = [0, 1, 2**(nbits-1), 2**nbits - 1, 0x11]
+            a = PositArray(bits, nbits=nbits, es=2)
+            c = -a
+            self.assertEqual(c.bits.tolist(), [ (-v) & (2**nbits - 1) for v in bits ])
+
+
+    def test_cmp(self):
+        nbits = 6
+        es = 2
+        (a, b) = self.all_pairs(nbits, es)
+
+        for (op, refop) in [(PositArray.__eq__, PCPosit.__eq__), (PositArray.__ne__, PCPosit.__ne__),
+                            (PositArray.__lt__, PCPosit.__lt__), (PositArray.__le__, PCPosit.__le__),
+                            (PositArray.__gt__, PCPosit.__gt__), (PositArray.__ge__, PCPosit.__ge__)]:
+            out = op(a, b)
+            self.assertEqual(out.dtype, np.bool_)
+            self.assertEqual(out.tolist(), [ refop(pa, pb) for (pa, pb) in zip(a.tolist(), b.tolist()) ])
+
+
+    def test_cmp_wide(self):
+        bits = [0, 1, 2**63 - 1, 2**63, 2**63 + 1, 2**64 - 1]
+        a = PositArray(bits, nbits=64, es=3)
+        self.assertEqual((a < a[1]).tolist(), [True, False, False, False, True, True])
+        self.assertEqual((a == a).tolist(), [True, True, True, False, True, True])
+
+
+    def test_scalar_operand(self):
+        a = PositArray([self.posit_n6e2_1_bits, self.posit_n6e2_3o2_bits, self.posit_n6e2_cinf_bits], nbits=6, es=2)
+        p = PCPosit(self.posit_n6e2_m3o16_bits, mode='bits', nbits=6, es=2)
+
+        c = a * p
+        self.assertEqual([ str(v) for v in c.tolist() ], [ str(v*p) for v in a.tolist() ])
+
+        c = a.__rsub__(p)
+        self.assertEqual([ str(v) for v in c.tolist() ], [ str(p-v) for v in a.tolist() ])
+
+
+    def test_out(self):
+        a = PositArray([self.posit_n6e2_1_bits, self.posit_n6e2_3o2_bits], nbits=6, es=2)
+        out = PositArray.zeros(2, nbits=6, es=2)
+        buf = out.bits
+
+        c = a.add(a, out=out)
+        self.assertIs(c, out)
+        self.assertIs(c.bits, buf)
+        self.assertEqual([ str(v) for v in c.tolist() ], ['2', '3'])
+
+        self.assertRaises(ValueError, a.add, a, out=PositArray.zeros(3, nbits=6, es=2))
+        self.assertRaises(NotImplementedError, a.add, a, out=PositArray.zeros(2, nbits=6, es=1))
+
+
+    def test_slicing(self):
+        a = PositArray(np.arange(16).reshape(4, 4), nbits=6, es=2)
+
+        row = a[1]
+        self.assertIsInstance(row, PositArray)
+        self.assertEqual(row.shape, (4,))
+
+        row[0] = PCPosit(self.posit_n6e2_1_bits, mode='bits', nbits=6, es=2)
+        self.assertEqual(int(a.bits[1, 0]), self.posit_n6e2_1_bits)
+
+        v = a[2, 3]
+        self.assertIsInstance(v, PCPosit)
+        self.assertEqual(coder.encode_posit_binary(v.rep), 11)
+
+        a[0, :] = a[3, :]
+        self.assertEqual(a.bits[0].tolist(), [12, 13, 14, 15])
+
+
+    def test_from_posits(self):
+        posits = [ [ PCPosit(bits, mode='bits', nbits=12, es=1) for bits in [0, 1, 2] ],
+                   [ PCPosit(bits, mode='bits', nbits=12, es=1) for bits in [3, 4, 5] ] ]
+        a = PositArray.from_posits(posits)
+
+        self.assertEqual((a.nbits, a.es, a.shape), (12, 1, (2, 3)))
+        self.assertEqual(a.bits.tolist(), [[0, 1, 2], [3, 4, 5]])
+        self.assertEqual([ [ str(v) for v in row ] for row in a.tolist() ],
+                         [ [ str(v) for v in row ] for row in posits ])
+
+
+    def test_convert(self):
+        a = PositArray([[self.posit_n6e2_1_bits, self.posit_n6e2_3o2_bits], [self.posit_n6e2_cinf_bits, 0]], nbits=6, es=2)
+        b = a.convert(16, 1)
+        self.assertEqual((b.nbits, b.es, b.shape, b.bits.dtype), (16, 1, (2, 2), np.uint16))
+        self.assertEqual(b.bits.tolist(), [[0x4000, 0x4800], [0x8000, 0]])
+        self.assertEqual(b.convert(6, 2).bits.tolist(), a.bits.tolist())
+
+
+    def test_sort(self):
+        rng = np.random.RandomState(4)
+        for (nbits, es) in [(6, 2), (16, 1), (32, 2), (64, 3)]:
+            bits = rng.randint(0, 2**min(nbits, 62), size=(3, 200)).astype(np.uint64) << np.uint64(max(0, nbits - 62))
+            bits[0, :3] = [1 << (nbits-1), 0, 1 << (nbits-1)]
+            a = PositArray(bits, nbits=nbits, es=es)
+            keys = [ [ PCPosit(int(v), mode='bits', nbits=nbits, es=es).order_key() for v in row ] for row in bits ]
+
+            order = a.argsort(kind='stable')
+            self.assertEqual(order.tolist(), np.argsort(np.array(keys, dtype=object), axis=-1, kind='stable').tolist())
+
+            b = a.copy()
+            b.sort()
+            self.assertEqual(b.bits.tolist(), np.take_along_axis(a.bits, order, axis=-1).tolist())
+            f = b.to_float64()
+            self.assertTrue(np.isnan(f[0, 0]))
+            for frow in f:
+                nnan = np.count_nonzero(np.isnan(frow))
+                self.assertTrue(np.all(np.isnan(frow[:nnan])))
+                self.assertTrue(np.all(np.diff(frow[nnan:]) >= 0))
+
+            u = a.unique()
+            self.assertEqual(u.bits.tolist(), sorted(set(bits.flatten().tolist()), key=lambda v: PCPosit(v, mode='bits', nbits=nbits, es=es).order_key()))
+
+            row = b[1]
+            i = row.searchsorted(row[50])
+            self.assertEqual(row.bits[i], row.bits[50])
+            self.assertTrue(i == 0 or row.bits[i-1] != row.bits[50])
+            self.assertEqual(row.searchsorted(row[50:53], side='right').tolist(), [ 1 + max(j for j in range(200) if row.bits[j] == row.bits[k]) for k in range(50, 53) ])
+
+
+    def test_min_max(self):
+        a = PositArray([[self.posit_n6e2_1_bits, self.posit_n6e2_m3o16_bits, self.posit_n6e2_3o2_bits],
+                        [self.posit_n6e2_1_bits, self.posit_n6e2_cinf_bits, 0]], nbits=6, es=2)
+        self.assertEqual(a[0].min().rep, PCPosit(self.posit_n6e2_m3o16_bits, mode='bits', nbits=6, es=2).rep)
+        self.assertEqual(a[0].max().rep, PCPosit(self.posit_n6e2_3o2_bits, mode='bits', nbits=6, es=2).rep)
+        self.assertEqual(a.max().rep.t, 'c')
+        self.assertEqual(a.min(axis=1).bits.tolist(), [self.posit_n6e2_m3o16_bits, self.posit_n6e2_cinf_bits])
+        self.assertEqual(a.max(axis=0).bits.tolist(), [self.posit_n6e2_1_bits, self.posit_n6e2_cinf_bits, self.posit_n6e2_3o2_bits])
+
+        (u, counts) = a.unique(return_counts=True)
+        self.assertEqual(u.bits.tolist(), [self.posit_n6e2_cinf_bits, self.posit_n6e2_m3o16_bits, 0, self.posit_n6e2_1_bits, self.posit_n6e2_3o2_bits])
+        self.assertEqual(counts.tolist(), [1, 1, 1, 2, 1])
+
+
+    def test_sqrt(self):
+        a = PositArray([[self.posit_n6e2_1o4_bits, self.posit_n6e2_cinf_bits], [self.posit_n6e2_m1o2_bits, 0]], nbits=6, es=2)
+        self.assertEqual(a.sqrt().bits.tolist(), [[self.posit_n6e2_1o2_bits, self.posit_n6e2_cinf_bits], [self.posit_n6e2_cinf_bits, 0]])
+
+        # Table, int64 isqrt and scalar kernel paths agree with the scalar square root.
+        rng = np.random.RandomState(20)
+        for (nbits, es) in [(12, 1), (16, 2), (32, 0), (32, 2), (40, 8), (64, 3)]:
+            bits = rng.randint(0, 2**min(nbits, 62), size=300).astype(np.uint64) << np.uint64(max(0, nbits - 62))
+            a = PositArray(bits, nbits=nbits, es=es)
+            self.assertEqual(a.sqrt().bits.tolist(), [ posit.sqrt_posit_binary(int(v), nbits, es) for v in bits ])
+
+        out = PositArray.zeros((2, 2), nbits=6, es=2)
+        a = PositArray([[self.posit_n6e2_1o4_bits, 0], [0, 0]], nbits=6, es=2)
+        self.assertIs(a.sqrt(out=out), out)
+        self.assertEqual(out.bits[0, 0], self.posit_n6e2_1o2_bits)
+
+
+    # Reference c + a @ b from a scalar quire of PCPosits per element.
+    def quire_matmul(self, a, b, c=None):
+        out = np.zeros((a.shape[0], b.shape[1]), dtype=object)
+        for r in range(a.shape[0]):
+            for j in range(b.shape[1]):
+                q = Quire(a.nbits, a.es)
+                if c is not None:
+                    q.add(c[r, j])
+                for k in range(a.shape[1]):
+                    q.add_product(a[r, k], b[k, j])
+                out[r, j] = coder.encode_posit_binary(q.to_posit().rep)
+        return out.tolist()
+
+
+    def test_matmul(self):
+        rng = np.random.RandomState(22)
+        for (nbits, es) in [(6, 2), (8, 0), (16, 1), (32, 2), (40, 3)]:
+            for (rows, depth, cols) in [(3, 7, 4), (1, 40, 2), (2, 0, 3)]:
+                hi = 2**min(nbits, 62)
+                a = PositArray(rng.randint(0, hi, (rows, depth)).astype(np.uint64), nbits=nbits, es=es)
+                b = PositArray(rng.randint(0, hi, (depth, cols)).astype(np.uint64), nbits=nbits, es=es)
+                self.assertEqual(a.matmul(b).bits.tolist(), self.quire_matmul(a, b))
+
+        # Exact cancellation, and minpos^2 terms that a rounded sum would lose.
+        a = PositArray([[0x1F, 0x01, 0x21, 0x01]], nbits=6, es=2)
+        b = PositArray([[0x1F], [0x01], [0x1F], [0x01]], nbits=6, es=2)
+        self.assertEqual(a.__matmul__(b).bits.tolist(), [[0x01]])
+        self.assertEqual(self.quire_matmul(a, b), [[0x01]])
+
+        x = PositArray([self.posit_n6e2_1_bits, self.posit_n6e2_m1o2_bits], nbits=6, es=2)
+        m = PositArray([[self.posit_n6e2_1_bits, 0], [self.posit_n6e2_cinf_bits, 0]], nbits=6, es=2)
+        self.assertEqual(coder.encode_posit_binary(x.dot(x).rep), self.posit_n6e2_1_bits)
+        self.assertEqual(x.matmul(m).bits.tolist(), [self.posit_n6e2_cinf_bits, 0])
+        self.assertEqual(m.matmul(x).bits.tolist(), [self.posit_n6e2_1_bits, self.posit_n6e2_cinf_bits])
+
+        out = PositArray.zeros((2,), nbits=6, es=2)
+        self.assertIs(m.matmul(x, out=out), out)
+        self.assertRaises(ValueError, lambda: m.matmul(PositArray([1, 2, 3], nbits=6, es=2)))
+        self.assertRaises(TypeError, lambda: m.matmul(m.bits))
+        self.assertRaises(NotImplementedError, lambda: m.reshape(1, 2, 2).matmul(m))
+
+
+    def test_quire_large_es(self):
+        # Quire sums far wider than the limb path accumulate in Python ints.
+        rng = np.random.RandomState(25)
+        for (nbits, es) in [(16, 6), (24, 12), (32, 20)]:
+            a = PositArray(rng.randint(0, 2**nbits, (2, 3)).astype(np.uint64), nbits=nbits, es=es)
+            b = PositArray(rng.randint(0, 2**nbits, (3, 2)).astype(np.uint64), nbits=nbits, es=es)
+            self.assertEqual(a.matmul(b).bits.tolist(), self.quire_matmul(a, b))
+            self.assertEqual(np.sum(a, axis=1).bits.tolist(),
+                             [ coder.encode_posit_binary(PCPosit.fsum(row).rep) for row in a.tolist() ])
+
+            c = b.reshape(2, 3)
+            fused = npquire.fused_posit_array(a.bits, c.bits, a.bits, nbits, es)
+            self.assertEqual(fused.tolist(), [ [ coder.encode_posit_binary(p.fma(q, p).rep) for (p, q) in zip(u, v) ]
+                                               for (u, v) in zip(a.tolist(), c.tolist()) ])
+
+
+    def test_dot_posit_array(self):
+        rng = np.random.RandomState(26)
+        for (nbits, es) in [(8, 0), (16, 1), (32, 2), (16, 6), (48, 2)]:
+            hi = 2**min(nbits, 62)
+            a = PositArray(rng.randint(0, hi, (4, 3)).astype(np.uint64), nbits=nbits, es=es)
+            b = PositArray(rng.randint(0, hi, (4, 3)).astype(np.uint64), nbits=nbits, es=es)
+            a[1, 0] = 1 << (nbits-1)
+            dot = npquire.dot_posit_array(a.bits, b.bits, nbits, es)
+            self.assertEqual(dot.tolist(), [ coder.encode_posit_binary(PCPosit.fdp(u, v).rep)
+                                             for (u, v) in zip(np.transpose(a).tolist(), np.transpose(b).tolist()) ])
+
+
+    def test_gemv(self):
+        rng = np.random.RandomState(23)
+        for (nbits, es) in [(8, 0), (16, 1), (48, 2)]:
+            hi = 2**min(nbits, 62)
+            a = PositArray(rng.randint(0, hi, (5, 9)).astype(np.uint64), nbits=nbits, es=es)
+            x = PositArray(rng.randint(0, hi, 9).astype(np.uint64), nbits=nbits, es=es)
+            y = PositArray(rng.randint(0, hi, 5).astype(np.uint64), nbits=nbits, es=es)
+            self.assertEqual(a.gemv(x).bits.tolist(), [ v[0] for v in self.quire_matmul(a, x.reshape(9, 1)) ])
+            self.assertEqual(a.gemv(x, y).bits.tolist(), [ v[0] for v in self.quire_matmul(a, x.reshape(9, 1), y.reshape(5, 1)) ])
+
+        self.assertRaises(ValueError, lambda: a.gemv(x, x))
+        self.assertRaises(ValueError, lambda: x.gemv(x))
+        self.assertRaises(TypeError, lambda: a.gemv(x.bits))
+        self.assertRaises(TypeError, lambda: a.gemv(x, 0))
+
+
+    def test_array_ufunc(self):
+        rng = np.random.RandomState(24)
+        for (nbits, es) in [(6, 2), (12, 1), (40, 2)]:
+            a = PositArray(rng.randint(0, 2**nbits, (3, 5)).astype(np.uint64), nbits=nbits, es=es)
+            b = PositArray(rng.randint(0, 2**nbits, 5).astype(np.uint64), nbits=nbits, es=es)
+            self.assertEqual(np.add(a, b).bits.tolist(), (a + b).bits.tolist())
+            self.assertEqual(np.subtract(b, a).bits.tolist(), (b - a).bits.tolist())
+            self.assertEqual(np.multiply(a, b).bits.tolist(), (a * b).bits.tolist())
+            self.assertEqual(np.divide(a, b).bits.tolist(), (a / b).bits.tolist())
+            self.assertEqual(np.less(a, b).tolist(), (a < b).tolist())
+            self.assertEqual(np.not_equal(a, b).tolist(), (a != b).tolist())
+            self.assertEqual(np.sqrt(a).bits.tolist(), a.sqrt().bits.tolist())
+            self.assertEqual(np.negative(a).bits.tolist(), (-a).bits.tolist())
+
+            # Sums round once from the quire, products after every step.
+            self.assertEqual(np.add.reduce(a, axis=1).bits.tolist(), [ v[0] for v in self.quire_matmul(a, PositArray.from_posits([PCPosit(1.0, nbits=nbits, es=es)]*5).reshape(5, 1)) ])
+            prod = a[:, 0]
+            for j in range(1, 5):
+                prod = prod * a[:, j]
+            self.assertEqual(np.multiply.reduce(a, axis=1).bits.tolist(), prod.bits.tolist())
+            self.assertEqual(np.add.accumulate(a, axis=1).bits[:, -1].tolist(), np.add.reduce(a, axis=1).bits.tolist())
+            self.assertEqual(np.maximum.reduce(a, axis=0).bits.tolist(), a.max(axis=0).bits.tolist())
+            self.assertEqual(np.minimum.accumulate(a, axis=0).bits[-1].tolist(), a.min(axis=0).bits.tolist())
+
+        a = PositArray([[self.posit_n6e2_1_bits, self.posit_n6e2_m1o2_bits], [self.posit_n6e2_cinf_bits, self.posit_n6e2_1o4_bits]], nbits=6, es=2)
+        one = PCPosit(1.0, nbits=6, es=2)
+        self.assertEqual(np.maximum(a, one).bits.tolist(), [[self.posit_n6e2_1_bits]*2, [self.posit_n6e2_cinf_bits, self.posit_n6e2_1_bits]])
+        self.assertEqual(np.absolute(a).bits.tolist(), [[self.posit_n6e2_1_bits, self.posit_n6e2_1o2_bits], [self.posit_n6e2_cinf_bits, self.posit_n6e2_1o4_bits]])
+        self.assertEqual(np.isnan(a).tolist(), [[False, False], [True, False]])
+        self.assertEqual(np.subtract(one, a[0]).bits.tolist(), [0, self.posit_n6e2_3o2_bits])
+        self.assertEqual(coder.encode_posit_binary(np.add.reduce(a[0]).rep), self.posit_n6e2_1o2_bits)
+        self.assertEqual(np.add.reduce(a, axis=0, keepdims=True).bits.tolist(), [[self.posit_n6e2_cinf_bits, 64 - self.posit_n6e2_1o4_bits]])
+
+        out = PositArray.zeros((2, 2), nbits=6, es=2)
+        self.assertIs(np.multiply(a, a, out=out, where=[[True, False], [False, True]]), out)
+        self.assertEqual(out.bits.tolist(), [[self.posit_n6e2_1_bits, 0], [0, 0x08]])
+        row = out[0]
+        self.assertIs(np.add.reduce(a, axis=1, out=row), row)
+        self.assertEqual(out.bits[0].tolist(), [self.posit_n6e2_1o2_bits, self.posit_n6e2_cinf_bits])
+
+        self.assertRaises(NotImplementedError, lambda: np.bitwise_and(a, a))
+        self.assertRaises(NotImplementedError, lambda: np.floor(a))
+        self.assertRaises(NotImplementedError, lambda: np.add.outer(a, a))
+        self.assertRaises(NotImplementedError, lambda: np.add(a, a, dtype=np.float64))
+        self.assertEqual(np.add(a, 1).bits.tolist(), (a + PCPosit(1, nbits=6, es=2)).bits.tolist())
+        self.assertRaises(TypeError, lambda: np.add(a, a.bits))
+        self.assertRaises(TypeError, lambda: a.bits + a)
+
+
+    def test_array_function(self):
+        a = PositArray([[self.posit_n6e2_3o2_bits, self.posit_n6e2_m1o2_bits], [self.posit_n6e2_1_bits, self.posit_n6e2_1o4_bits]], nbits=6, es=2)
+        x = PositArray([self.posit_n6e2_1_bits, self.posit_n6e2_1o2_bits], nbits=6, es=2)
+
+        self.assertEqual(coder.encode_posit_binary(np.sum(a).rep), 0x12)
+        self.assertEqual(np.sum(a, axis=0).bits.tolist(), (a[0] + a[1]).bits.tolist())
+        self.assertEqual(np.cumsum(a).bits.tolist(), [self.posit_n6e2_3o2_bits, self.posit_n6e2_1_bits, 0x12, 0x12])
+        self.assertEqual(np.prod(a, axis=1).bits.tolist(), (a[:, 0] * a[:, 1]).bits.tolist())
+        self.assertEqual(np.cumprod(x).bits.tolist(), [self.posit_n6e2_1_bits, self.posit_n6e2_1o2_bits])
+        self.assertEqual(coder.encode_posit_binary(np.max(a).rep), self.posit_n6e2_3o2_bits)
+        self.assertEqual(np.min(a, axis=1).bits.tolist(), [self.posit_n6e2_m1o2_bits, self.posit_n6e2_1o4_bits])
+        self.assertEqual(np.dot(a, x).bits.tolist(), a.matmul(x).bits.tolist())
+        self.assertEqual(np.sort(a).bits.tolist(), [[self.posit_n6e2_m1o2_bits, self.posit_n6e2_3o2_bits], [self.posit_n6e2_1o4_bits, self.posit_n6e2_1_bits]])
+        self.assertEqual(np.argsort(a, axis=None).tolist(), [1, 3, 2, 0])
+        self.assertEqual(np.where([True, False], x, a[0]).bits.tolist(), [self.posit_n6e2_1_bits, self.posit_n6e2_m1o2_bits])
+        self.assertEqual(np.concatenate([x, a[0]]).shape, (4,))
+        self.assertEqual(np.stack([x, x]).shape, (2, 2))
+        self.assertEqual(np.transpose(a).bits.tolist(), a.bits.T.tolist())
+        self.assertEqual(np.shape(a), (2, 2))
+
+        self.assertRaises(NotImplementedError, np.mean, a)
+        self.assertRaises(NotImplementedError, lambda: np.sum(a, dtype=np.float64))
+        self.assertEqual(np.where([True, False], x, 0).bits.tolist(), [self.posit_n6e2_1_bits, 0])
+        self.assertRaises(TypeError, lambda: np.where([True, False], x, 'x'))
+
+
+    def test_to_float64(self):
+        a = PositArray([[self.posit_n6e2_1_bits, self.posit_n6e2_3o2_bits], [self.posit_n6e2_m3o16_bits, 0]], nbits=6, es=2)
+        self.assertEqual(a.to_float64().tolist(), [[1.0, 1.5], [-0.1875, 0.0]])
+        self.assertTrue(np.isnan(PositArray([self.posit_n6e2_cinf_bits], nbits=6, es=2).to_float64()[0]))
+
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, PositArray, [64], nbits=6, es=2)
+        self.assertRaises(ValueError, PositArray, [-1], nbits=6, es=2)
+        self.assertRaises(ValueError, PositArray, [1], nbits=65, es=2)
+        self.assertRaises(ValueError, PositArray, [1.5, 2**64 - 1], nbits=64, es=2)
+
+        a = PositArray([1], nbits=6, es=2)
+        b = PositArray([1], nbits=6, es=1)
+        self.assertRaises(NotImplementedError, lambda: a + b)
+        self.assertRaises(TypeError, lambda: a + 'x')
+        self.assertRaises(TypeError, lambda: a < None)
+        self.assertRaises(TypeError, lambda: a + a.bits)
+        self.assertFalse(a == None)
+        self.assertTrue(a != None)
+
+
+    def test_scalar_operands(self):
+        a = PositArray([self.posit_n6e2_1_bits, self.posit_n6e2_3o2_bits], nbits=6, es=2)
+        one = PCPosit(1, nbits=6, es=2)
+        half = PCPosit(0.5, nbits=6, es=2)
+
+        self.assertEqual((a + 1).bits.tolist(), (a + one).bits.tolist())
+        self.assertEqual((1 - a).bits.tolist(), (one - a).bits.tolist())
+        self.assertEqual((a * np.float32(0.5)).bits.tolist(), (a * half).bits.tolist())
+        self.assertEqual((np.int64(1) / a).bits.tolist(), (one / a).bits.tolist())
+        self.assertEqual((a == 1).tolist(), [True, False])
+        self.assertEqual((a > 1.25).tolist(), [False, True])
+        self.assertEqual(a.searchsorted(1.5), 1)
+
+        a[0] = 0.5
+        self.assertEqual(a.bits[0], self.posit_n6e2_1o2_bits)
+
+
+if __name__ == '__main__':
+    unittest.main()
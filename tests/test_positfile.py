@@ -0,0 +1,132 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from sgposit.positarray import PositArray
+from sgposit.positfile  import *
+
+
+class TestPositFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'a.posit')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def test_save_load(self):
+        rng = np.random.RandomState(1)
+        for (nbits, es, shape) in [(6, 2, (3, 4)), (16, 1, (5,)), (32, 2, (2, 3, 4)), (64, 3, (7, 1))]:
+            bits = rng.randint(0, 2**min(nbits, 62), size=shape).astype(np.uint64)
+            a = PositArray(bits, nbits=nbits, es=es)
+            save_posit_array(self.filename, a)
+
+            self.assertEqual(read_posit_header(self.filename), (nbits, es, shape))
+            self.assertEqual(os.path.getsize(self.filename), HEADER_SIZE + a.size * a.bits.itemsize)
+
+            b = load_posit_array(self.filename)
+            self.assertIsInstance(b, PositArray)
+            self.assertIsInstance(b.bits, np.memmap)
+            self.assertEqual((b.nbits, b.es, b.shape), (nbits, es, shape))
+            self.assertTrue(np.array_equal(b.bits, a.bits))
+            self.assertTrue(np.array_equal((b + b).bits, (a + a).bits))
+            del b
+
+
+    def test_load_modes(self):
+        save_posit_array(self.filename, PositArray([1, 2, 3], nbits=8, es=0))
+
+        a = load_posit_array(self.filename)
+        def assign():
+            a.bits[0] = 5
+        self.assertRaises(ValueError, assign)
+
+        c = load_posit_array(self.filename, mode='c')
+        c.bits[0] = 5
+        del c
+        self.assertEqual(load_posit_array(self.filename).bits.tolist(), [1, 2, 3])
+
+        w = load_posit_array(self.filename, mode='r+')
+        w.bits[0] = 5
+        w.bits.flush()
+        del w
+        self.assertEqual(load_posit_array(self.filename).bits.tolist(), [5, 2, 3])
+
+        self.assertRaises(ValueError, load_posit_array, self.filename, mode='w+')
+
+
+    def test_empty_and_scalar(self):
+        save_posit_array(self.filename, PositArray.zeros((0, 3), nbits=16, es=1))
+        self.assertEqual(load_posit_array(self.filename).shape, (0, 3))
+
+        save_posit_array(self.filename, PositArray(np.array(7, dtype=np.uint8), nbits=8, es=0))
+        self.assertEqual(load_posit_array(self.filename).bits.tolist(), 7)
+
+
+    def test_append(self):
+        with PositFileWriter(self.filename, nbits=16, es=1, shape=(3,)) as w:
+            self.assertEqual(read_posit_header(self.filename), (16, 1, (0, 3)))
+            w.append(np.arange(6).reshape(2, 3))
+            w.append(PositArray([6, 7, 8], nbits=16, es=1))
+            self.assertEqual(load_posit_array(self.filename).bits.tolist(), [[0, 1, 2], [3, 4, 5], [6, 7, 8]])
+            self.assertRaises(ValueError, w.append, np.arange(4))
+            self.assertRaises(NotImplementedError, w.append, PositArray([1, 2, 3], nbits=16, es=2))
+
+        with PositFileWriter(self.filename, shape=(3,), append=True) as w:
+            self.assertEqual((w.nbits, w.es), (16, 1))
+            w.append([[9, 10, 11]])
+
+        a = load_posit_array(self.filename)
+        self.assertEqual(a.shape, (4, 3))
+        self.assertEqual(a.bits[3].tolist(), [9, 10, 11])
+        del a
+
+        self.assertRaises(ValueError, PositFileWriter, self.filename, nbits=8, es=0, shape=(3,), append=True)
+        self.assertRaises(ValueError, PositFileWriter, self.filename, shape=(2,), append=True)
+
+
+    def test_invalid(self):
+        with open(self.filename, 'wb') as fp:
+            fp.write(b'NOTPOSIT' + b'\0' * (HEADER_SIZE - 8))
+        self.assertRaises(ValueError, load_posit_array, self.filename)
+
+        save_posit_array(self.filename, PositArray([1, 2, 3], nbits=8, es=0))
+        with open(self.filename, 'r+b') as fp:
+            fp.truncate(HEADER_SIZE + 2)
+        self.assertRaises(ValueError, load_posit_array, self.filename)
+
+        self.assertRaises(ValueError, save_posit_array, self.filename, PositArray.zeros((1,) * 9, nbits=8, es=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+from fractions import Fraction
+import random
+import unittest
+
+from sgposit         import coder
+from sgposit.pcposit import PCPosit
+from sgposit.posit   import Posit
+from sgposit.quire   import Quire
+
+
+class TestQuire(unittest.TestCase):
+
+    def setUp(self):
+        self.posit_n8e0_maxpos_bits = 0x7F
+        self.posit_n8e0_minpos_bits = 0x01
+        self.posit_n8e0_1_bits = 0x40
+        self.posit_n8e0_cinf_bits = 0x80
+
+
+    def tearDown(self):
+        pass
+
+
+    def to_fraction(self, p):
+        (x, m) = p._fixedpoint()
+        return x * Fraction(2)**m
+
+
+    # Round an exact dyadic value to the nearest posit with the reference rounding.
+    def round_fraction(self, v, nbits, es):
+        if v == 0:
+            return PCPosit('0', nbits=nbits, es=es)
+        m = -(v.denominator.bit_length() - 1)
+        return PCPosit._fixedpoint_to_posit(v.numerator, m, nbits=nbits, es=es)
+
+
+    def test_qsize(self):
+        self.assertEqual(Quire(8, 0).qsize, 32)
+        self.assertEqual(Quire(16, 1).qsize, 128)
+        self.assertEqual(Quire(32, 2).qsize, 512)
+        self.assertEqual(Quire(64, 3).qsize, 2048)
+
+
+    def test_exact_cancellation(self):
+        maxpos = PCPosit(self.posit_n8e0_maxpos_bits, mode='bits', nbits=8, es=0)
+        minpos = PCPosit(self.posit_n8e0_minpos_bits, mode='bits', nbits=8, es=0)
+        one = PCPosit(self.posit_n8e0_1_bits, mode='bits', nbits=8, es=0)
+
+        # Rounded after each step, minpos is lost.
+        naive = maxpos*maxpos + minpos*minpos - maxpos*maxpos
+        self.assertEqual(coder.encode_posit_binary(naive.rep), 0)
+
+        q = Quire(8, 0)
+        q.add_product(maxpos, maxpos).add_product(minpos, minpos).sub_product(maxpos, maxpos)
+        self.assertEqual(q.acc, 1)
+        self.assertEqual(coder.encode_posit_binary(q.to_posit().rep), self.posit_n8e0_minpos_bits)
+
+        q.clear().add(maxpos).add(one).sub(maxpos)
+        self.assertEqual(coder.encode_posit_binary(q.to_posit().rep), self.posit_n8e0_1_bits)
+
+
+    def test_dot_product_random(self):
+        rng = random.Random(17)
+        for (nbits, es) in [(8, 0), (8, 2), (16, 1), (32, 2)]:
+            for trial in range(20):
+                n = rng.randint(1, 40)
+                xs = [ PCPosit(rng.getrandbits(nbits), mode='bits', nbits=nbits, es=es) for i in range(n) ]
+                ys = [ PCPosit(rng.getrandbits(nbits), mode='bits', nbits=nbits, es=es) for i in range(n) ]
+                if any(p.rep.t == 'c' for p in xs + ys):
+                    continue
+
+                q = Quire(nbits, es)
+                for (x, y) in zip(xs, ys):
+                    q.add_product(x, y)
+
+                ref = self.round_fraction(sum(self.to_fraction(x)*self.to_fraction(y) for (x, y) in zip(xs, ys)), nbits, es)
+                self.assertEqual(coder.encode_posit_binary(q.to_posit().rep), coder.encode_posit_binary(ref.rep))
+
+
+    def test_operand_types(self):
+        one = PCPosit(self.posit_n8e0_1_bits, mode='bits', nbits=8, es=0)
+
+        q1 = Quire(8, 0).add_product(one, one)
+        q2 = Quire(8, 0).add_product(self.posit_n8e0_1_bits, self.posit_n8e0_1_bits)
+        q3 = Quire(8, 0).add_product(Posit(self.posit_n8e0_1_bits, mode='bits', nbits=8, es=0), one)
+        self.assertEqual(q1.acc, q2.acc)
+        self.assertEqual(q1.acc, q3.acc)
+
+        q = Quire(8, 0)
+        self.assertRaises(NotImplementedError, q.add, PCPosit(self.posit_n8e0_1_bits, mode='bits', nbits=8, es=1))
+        self.assertRaises(ValueError, q.add, 1 << 8)
+        self.assertRaises(ValueError, q.add, 1.0)
+
+
+    def test_merge(self):
+        rng = random.Random(3)
+        values = [ PCPosit(rng.getrandbits(7), mode='bits', nbits=8, es=1) for i in range(20) ]
+
+        q = Quire(8, 1)
+        q1 = Quire(8, 1)
+        q2 = Quire(8, 1)
+        for (i, v) in enumerate(values):
+            q.add_product(v, v)
+            (q1 if i % 2 else q2).add_product(v, v)
+
+        q1.merge(q2)
+        self.assertEqual(q1.acc, q.acc)
+        self.assertRaises(NotImplementedError, q1.merge, Quire(8, 0))
+
+
+    def test_nar(self):
+        one = PCPosit(self.posit_n8e0_1_bits, mode='bits', nbits=8, es=0)
+        q = Quire(8, 0).add(one).add_product(self.posit_n8e0_cinf_bits, one).add(one)
+        self.assertTrue(q.is_nar())
+        self.assertEqual(q.bits, 1 << (q.qsize-1))
+        self.assertEqual(q.to_posit().rep.t, 'c')
+
+        q.clear()
+        self.assertFalse(q.is_nar())
+        self.assertEqual(q.to_posit().rep.t, 'z')
+
+
+    def test_bits(self):
+        one = PCPosit(self.posit_n8e0_1_bits, mode='bits', nbits=8, es=0)
+        q = Quire(8, 0).sub(one)
+        self.assertEqual(q.bits, ((1 << 32) - 1) & -(1 << 12))
+
+
+if __name__ == '__main__':
+    unittest.main()
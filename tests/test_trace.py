@@ -0,0 +1,209 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from fractions import Fraction
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from sgposit            import coder
+from sgposit            import trace
+from sgposit.pcposit    import PCPosit
+from sgposit.positarray import PositArray
+
+
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.configs = [(6, 1), (7, 0), (12, 2), (16, 1), (32, 2), (40, 3)]
+        (fd, self.filename) = tempfile.mkstemp(suffix='.trace')
+        os.close(fd)
+
+
+    def tearDown(self):
+        os.remove(self.filename)
+        self.assertFalse(trace.is_enabled())
+
+
+    def bits_of(self, p):
+        return coder.encode_posit_binary(p.rep)
+
+
+    def array_of(self, values, nbits, es):
+        return PositArray.from_posits([ PCPosit(v, nbits=nbits, es=es) for v in values ])
+
+
+    def model(self, a, b, c):
+        d = (a*b - c) / (a + 1.5)
+        e = d.fma(b, c) + Fraction(1, 3)
+        return [(e*e + a).sqrt() - 2/b, (-d).fms(a, c)]
+
+
+    def record(self, values, nbits=16, es=1):
+        with trace.Tracer() as tracer:
+            inputs = [ tracer.input(PCPosit(v, nbits=nbits, es=es)) for v in values ]
+            for p in self.model(*inputs):
+                tracer.output(p)
+        return tracer.trace()
+
+
+    def rerun(self, values, nbits, es):
+        return [ self.bits_of(p) for p in self.model(*[ PCPosit(v, nbits=nbits, es=es) for v in values ]) ]
+
+
+    def test_record(self):
+        t = self.record([0.75, -2, 3])
+        self.assertEqual((t.nbits, t.es, t.ninputs, len(t.outputs)), (16, 1, 3, 2))
+        ops = [ trace.OPS[op] for op in t.ops ]
+        self.assertEqual(ops.count('fma'), 1)
+        self.assertEqual(ops.count('fms'), 1)
+        self.assertEqual(ops.count('sqrt'), 1)
+        self.assertEqual(ops.count('const'), 3)
+        self.assertEqual(sorted(t.outputs), sorted(set(t.outputs)))
+
+        # Operations outside the recording are not traced.
+        p = PCPosit(1, nbits=16, es=1) + 1
+        self.assertEqual(self.bits_of(p), self.bits_of(PCPosit(2, nbits=16, es=1)))
+
+
+    def test_replay_traced(self):
+        values = [0.75, -2, 3]
+        t = self.record(values)
+        out = trace.replay(t)
+        self.assertEqual([ int(v.bits) for v in out ], self.rerun(values, 16, 1))
+
+
+    def test_replay_configs(self):
+        rng = random.Random(25)
+        t = self.record([0.75, -2, 3])
+        for (nbits, es) in self.configs:
+            values = [ [ rng.choice([rng.uniform(-10, 10), rng.randint(-4, 4), 1e-9, 1e9]) for i in range(60) ] for j in range(3) ]
+            inputs = [ self.array_of(v, nbits, es) for v in values ]
+            out = trace.replay(t, inputs, nbits=nbits, es=es)
+            for (k, v) in enumerate(out):
+                self.assertEqual((v.nbits, v.es, v.shape), (nbits, es, (60,)))
+                expected = [ self.rerun([ values[j][i] for j in range(3) ], nbits, es)[k] for i in range(60) ]
+                self.assertEqual(v.bits.tolist(), expected)
+
+
+    def test_replay_broadcast(self):
+        t = self.record([0.75, -2, 3])
+        out = trace.replay(t, [self.array_of([0.5, -1], 6, 1).reshape(2, 1), 2, PCPosit(-0.25, nbits=6, es=1)], nbits=6, es=1)
+        self.assertEqual(out[0].shape, (2, 1))
+        self.assertEqual(out[0].bits[1, 0], self.rerun([-1, 2, -0.25], 6, 1)[0])
+
+
+    def test_nar(self):
+        t = self.record([0.75, -2, 3])
+        nar = 1 << 15
+        out = trace.replay(t, [PositArray([nar, 0], nbits=16, es=1), 1, 1])
+        self.assertEqual(out[0].bits.tolist()[0], nar)
+        self.assertEqual(out[0].bits.tolist()[1], self.rerun([0, 1, 1], 16, 1)[0])
+
+
+    def sequences(self, a, b):
+        return [PCPosit.fsum([a, a, b, 0.25]) * 1, PCPosit.fdp([a, b, 2], (b, a, a)) - a]
+
+
+    def test_replay_sequences(self):
+        with trace.Tracer() as tracer:
+            inputs = [ tracer.input(PCPosit(v, nbits=16, es=1)) for v in [0.5, -3] ]
+            for p in self.sequences(*inputs):
+                tracer.output(p)
+        t = tracer.trace()
+        ops = [ trace.OPS[op] for op in t.ops ]
+        self.assertEqual((ops.count('fsum'), ops.count('fdp')), (1, 1))
+
+        rng = random.Random(26)
+        for (nbits, es) in self.configs:
+            values = [ [ rng.choice([rng.uniform(-10, 10), rng.randint(-4, 4), 1e-9, 1e9]) for i in range(40) ] for j in range(2) ]
+            out = trace.replay(t, [ self.array_of(v, nbits, es) for v in values ], nbits=nbits, es=es)
+            for (k, v) in enumerate(out):
+                expected = [ self.bits_of(self.sequences(*[ PCPosit(values[j][i], nbits=nbits, es=es) for j in range(2) ])[k]) for i in range(40) ]
+                self.assertEqual(v.bits.tolist(), expected)
+
+        with trace.Tracer() as tracer:
+            x = tracer.input(PCPosit(1, nbits=16, es=1))
+            tracer.output(PCPosit.fsum([x, x]) * 1)
+        self.assertEqual(trace.replay(tracer.trace(), [self.array_of([1.0, 2.0], 16, 1)])[0].to_float64().tolist(), [2.0, 4.0])
+
+
+    def convert(self, x):
+        q = PCPosit(x, nbits=8, es=0)
+        return [PCPosit(q*q, nbits=x.nbits, es=x.es) + x, q]
+
+
+    def test_replay_convert(self):
+        with trace.Tracer() as tracer:
+            x = tracer.input(PCPosit(0.3, nbits=16, es=1))
+            tracer.output(PCPosit(x))
+            for p in self.convert(x):
+                tracer.output(p)
+        t = tracer.trace()
+        self.assertEqual(t.configs, [(16, 1), (8, 0)])
+        self.assertEqual([ trace.OPS[op] for op in t.ops ].count('convert'), 2)
+        self.assertEqual(t.outputs[0], 0)
+
+        trace.save_trace(self.filename, t)
+        u = trace.load_trace(self.filename)
+        self.assertEqual((u.configs, u.node_configs, u.operands), (t.configs, t.node_configs, t.operands))
+
+        values = [0.3, -1.7, 5, 1e-3, 200]
+        for (nbits, es) in [(16, 1), (32, 2), (6, 1)]:
+            out = trace.replay(u, [self.array_of(values, nbits, es)], nbits=nbits, es=es)
+            self.assertEqual((out[1].nbits, out[1].es, out[2].nbits, out[2].es), (nbits, es, 8, 0))
+            for k in (1, 2):
+                expected = [ self.bits_of(self.convert(PCPosit(v, nbits=nbits, es=es))[k-1]) for v in values ]
+                self.assertEqual(out[k].bits.tolist(), expected)
+
+
+    def test_save_load(self):
+        with trace.Tracer() as tracer:
+            x = tracer.input(PCPosit(0.5, nbits=16, es=1))
+            y = x * Fraction(-2**70 - 1, 3**50) + PCPosit('cinf', nbits=16, es=1)
+            z = tracer.output(x / 7)
+        t = tracer.trace()
+        self.assertEqual(t.outputs, [len(t) - 1])
+
+        trace.save_trace(self.filename, t)
+        u = trace.load_trace(self.filename)
+        self.assertEqual((u.nbits, u.es, u.ops, u.args, u.values, u.outputs), (t.nbits, t.es, t.ops, t.args, t.values, t.outputs))
+        self.assertEqual(int(trace.replay(u)[0].bits), self.bits_of(z))
+
+        with open(self.filename, 'wb') as fp:
+            fp.write(b'not a trace')
+        self.assertRaises(ValueError, trace.load_trace, self.filename)
+
+
+    def test_errors(self):
+        with trace.Tracer() as tracer:
+            x = PCPosit(1, nbits=16, es=1)
+            self.assertRaises(NotImplementedError, lambda: x + PCPosit(1, nbits=8, es=0))
+            self.assertRaises(ValueError, tracer.input, 1.5)
+        self.assertRaises(ValueError, trace.stop)
+
+        t = self.record([0.75, -2, 3])
+        self.assertRaises(ValueError, trace.replay, t, [1, 2])
+        self.assertRaises(NotImplementedError, trace.replay, t, [self.array_of([1], 8, 0), 1, 1])
@@ -0,0 +1,151 @@
+# MIT License
+#
+# Copyright (c) 2018 SpeedGo Computing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from sgposit import posit
+from sgposit import verify
+
+
+def _flip_lsb_op(op, abits, bbits, nbits, es):
+    cbits = verify.IMPLEMENTATIONS['posit'](op, abits, bbits, nbits, es)
+    if (abits*7 + bbits) % 97 == 0:
+        cbits ^= 1
+    return cbits
+
+
+class TestVerify(unittest.TestCase):
+
+    _multiprocess_can_split_ = True
+
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.checkpoint = os.path.join(self.tmpdir, 'verify.ckpt')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def test_is_correctly_rounded(self):
+        # posit<6,2>: 1 = 0x10, 3/2 = 0x11, 2 = 0x12, minpos = 0x01.
+        self.assertTrue(verify.is_correctly_rounded(0x10, (5, -2, 1), 6, 2))      # 5/4 ties to even 1.
+        self.assertFalse(verify.is_correctly_rounded(0x11, (5, -2, 1), 6, 2))
+        self.assertTrue(verify.is_correctly_rounded(0x12, (7, -2, 1), 6, 2))      # 7/4 ties to even 2.
+        self.assertTrue(verify.is_correctly_rounded(0x11, (13, -3, 1), 6, 2))
+        self.assertTrue(verify.is_correctly_rounded(0x01, (1, -1000, 1), 6, 2))   # Never round to 0.
+        self.assertFalse(verify.is_correctly_rounded(0x00, (1, -1000, 1), 6, 2))
+        self.assertTrue(verify.is_correctly_rounded(0x3F, (-1, -1000, 1), 6, 2))
+        self.assertTrue(verify.is_correctly_rounded(0x1F, (1, 1000, 1), 6, 2))    # Saturate at maxpos.
+        self.assertTrue(verify.is_correctly_rounded(0x21, (-1, 1000, 1), 6, 2))
+        self.assertTrue(verify.is_correctly_rounded(0x00, (0, 0, 1), 6, 2))
+        self.assertFalse(verify.is_correctly_rounded(0x20, (1, 0, 1), 6, 2))
+
+
+    def test_verify_small(self):
+        configs = [ (nbits, es) for nbits in range(2, 7) for es in range(0, 3) ]
+        for impl in ['posit', 'pcposit']:
+            summary = verify.verify(configs, impl=impl, processes=1)
+            self.assertEqual(summary['count'], 4 * 3 * sum(4**nbits for nbits in range(2, 7)))
+            self.assertEqual(summary['nmismatches'], 0, summary['mismatches'])
+
+
+    def test_verify_detects_mismatches(self):
+        summary = verify.verify([(6, 1)], impl=_flip_lsb_op, processes=1, shard_rows=64)
+        nflips = sum(1 for a in range(64) for b in range(64) if (a*7 + b) % 97 == 0)
+        self.assertEqual(summary['nmismatches'], 4 * nflips)
+        for (op, nbits, es, abits, bbits, cbits) in summary['mismatches']:
+            self.assertEqual((nbits, es), (6, 1))
+            self.assertEqual(cbits ^ 1, verify.IMPLEMENTATIONS['posit'](op, abits, bbits, nbits, es))
+
+
+    def test_process_pool(self):
+        summary = verify.verify([(5, 1)], ops=['div'], processes=2, shard_rows=4)
+        self.assertEqual(summary['nshards'], 8)
+        self.assertEqual(summary['count'], 4**5)
+        self.assertEqual(summary['nmismatches'], 0)
+
+
+    def test_checkpoint_resume(self):
+        calls = []
+        progress = lambda result, ndone, ntotal: calls.append(result['shard'])
+
+        summary = verify.verify([(4, 0)], impl=_flip_lsb_op, processes=1, shard_rows=4, checkpoint=self.checkpoint, progress=progress)
+        self.assertEqual(len(calls), 16)
+
+        # Drop the last shard as if interrupted mid write.
+        with open(self.checkpoint) as fp:
+            lines = fp.readlines()
+        with open(self.checkpoint, 'w') as fp:
+            fp.writelines(lines[:-1])
+            fp.write(lines[-1][:10])
+
+        del calls[:]
+        resumed = verify.verify([(4, 0)], impl=_flip_lsb_op, processes=1, shard_rows=4, checkpoint=self.checkpoint, progress=progress)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(resumed['nresumed'], 15)
+        self.assertEqual(resumed['count'], summary['count'])
+        self.assertEqual(resumed['nmismatches'], summary['nmismatches'])
+
+
+    def test_checkpoint_other_impl(self):
+        verify.verify([(4, 0)], impl=_flip_lsb_op, processes=1, shard_rows=4, checkpoint=self.checkpoint)
+
+        # Another implementation reruns every shard instead of reusing the results.
+        summary = verify.verify([(4, 0)], impl='posit', processes=1, shard_rows=4, checkpoint=self.checkpoint)
+        self.assertEqual(summary['nresumed'], 0)
+        self.assertEqual(summary['nmismatches'], 0)
+
+        self.assertEqual(len(verify.load_checkpoint(self.checkpoint, 'posit')), 16)
+        self.assertEqual(len(verify.load_checkpoint(self.checkpoint, _flip_lsb_op)), 16)
+        self.assertEqual(len(verify.load_checkpoint(self.checkpoint, 'pcposit')), 0)
+
+        resumed = verify.verify([(4, 0)], impl=_flip_lsb_op, processes=1, shard_rows=4, checkpoint=self.checkpoint)
+        self.assertEqual(resumed['nresumed'], 16)
+        self.assertGreater(resumed['nmismatches'], 0)
+
+        # Results of another checker version are rerun too.
+        with open(self.checkpoint) as fp:
+            lines = [ line.replace('"checker": {}'.format(verify.CHECKER_VERSION), '"checker": 0') for line in fp ]
+        with open(self.checkpoint, 'w') as fp:
+            fp.writelines(lines)
+        self.assertEqual(len(verify.load_checkpoint(self.checkpoint, 'posit')), 0)
+
+
+    def test_invalid_op(self):
+        self.assertRaises(ValueError, verify.make_shards, [(4, 0)], ops=['pow'])
+
+
+    @unittest.skipUnless(os.environ.get('SGPOSIT_LONG_TESTS') == '1', 'Long test.')
+    def test_verify_posit10(self):
+        summary = verify.verify([ (10, es) for es in range(0, 3) ])
+        self.assertEqual(summary['nmismatches'], 0, summary['mismatches'])
+
+
+if __name__ == '__main__':
+    unittest.main()